@@ -2,6 +2,7 @@
 Django settings for plateforme_rdv project.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -42,6 +43,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'rdv_app.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -68,12 +70,67 @@ WSGI_APPLICATION = 'plateforme_rdv.wsgi.application'
 
 
 # Database
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite par défaut (développement). En production, PostgreSQL:
+#   RDV_DB_ENGINE=postgresql RDV_DB_NAME=... RDV_DB_USER=... RDV_DB_PASSWORD=... RDV_DB_HOST=... RDV_DB_PORT=...
+# Les connexions sont persistantes (RDV_DB_CONN_MAX_AGE secondes, vérifiées avant
+# réutilisation) et chaque requête est interrompue après RDV_DB_STATEMENT_TIMEOUT ms.
+# Derrière PgBouncer en mode transaction: RDV_DB_CONN_MAX_AGE=0 et RDV_DB_PGBOUNCER=1
+# (pas de curseurs côté serveur).
+DB_ENGINE = os.environ.get('RDV_DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('RDV_DB_NAME', 'plateforme_rdv'),
+            'USER': os.environ.get('RDV_DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('RDV_DB_PASSWORD', ''),
+            'HOST': os.environ.get('RDV_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('RDV_DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('RDV_DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('RDV_DB_PGBOUNCER') == '1',
+            'OPTIONS': {
+                'connect_timeout': int(os.environ.get('RDV_DB_CONNECT_TIMEOUT', 5)),
+                'options': f"-c statement_timeout={int(os.environ.get('RDV_DB_STATEMENT_TIMEOUT', 30000))}",
+                'application_name': 'plateforme_rdv',
+            },
+        }
     }
-}
+elif DB_ENGINE == 'sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('RDV_DB_NAME', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.environ.get('RDV_DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+else:
+    raise ValueError(f"RDV_DB_ENGINE inconnu: {DB_ENGINE} (sqlite3 ou postgresql)")
+
+# Exports et rapports (CSV, Parquet/Arrow, PDF) lisent tout l'historique: leurs requêtes ont
+# leur propre limite (rdv_app.utils.requetes_longues), 0 = aucune.
+RDV_DB_EXPORT_STATEMENT_TIMEOUT = int(os.environ.get('RDV_DB_EXPORT_STATEMENT_TIMEOUT', 30 * 60 * 1000))
+
+# Réplique en lecture (optionnelle): RDV_DB_REPLICA_HOST/PORT (PostgreSQL) ou
+# RDV_DB_REPLICA_NAME (autre fichier SQLite, pour essayer en local). Seules les vues
+# marquées @lecture_replica lisent dessus, en GET; après une écriture, l'utilisateur
+# reste sur le primaire RDV_REPLICA_STICKY secondes (rdv_app.routers). Cette marque est
+# gardée en cache: avec LocMem elle n'existe que dans le process qui a reçu l'écriture, les
+# autres process ne voient que le cookie (clients navigateur). CACHES partagé en production.
+if os.environ.get('RDV_DB_REPLICA_HOST') or os.environ.get('RDV_DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ.get('RDV_DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if DB_ENGINE == 'postgresql':
+        DATABASES['replica']['HOST'] = os.environ.get('RDV_DB_REPLICA_HOST', DATABASES['default']['HOST'])
+        DATABASES['replica']['PORT'] = os.environ.get('RDV_DB_REPLICA_PORT', DATABASES['default']['PORT'])
+    DATABASE_ROUTERS = ['rdv_app.routers.ReplicaRouter']
+
+RDV_REPLICA_STICKY = int(os.environ.get('RDV_REPLICA_STICKY', 5))
 
 
 # Password validation
@@ -141,7 +198,7 @@ CORS_ALLOW_HEADERS = [
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rdv_app.authentification.JWTCacheAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -178,6 +235,142 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Authentification JWT (rdv_app.authentification): utilisateur et profils gardés en cache, le jeton
+# porte rôle et ids de profil. Invalidation par signaux; avec un cache local (LocMem) elle ne porte
+# que sur le process courant, le délai borne alors la péremption (ex: compte désactivé).
+RDV_AUTH_CACHE_TIMEOUT = int(os.environ.get('RDV_AUTH_CACHE_TIMEOUT', 60))
+
+
+# Écriture des logs d'audit (rdv_app.log_writer)
+# En mode 'async', log_action met les entrées en file et un thread de fond
+# les écrit par lots. Le mode 'sync' écrit immédiatement: RDV_LOG_WRITER_MODE=sync pour les
+# tests et scripts qui relisent les logs juste après les avoir écrits.
+RDV_LOG_WRITER = {
+    'MODE': os.environ.get('RDV_LOG_WRITER_MODE', 'async'),
+    'BATCH_SIZE': 100,
+    'FLUSH_INTERVAL_MS': 200,
+    'QUEUE_SIZE': 10000,
+    'OVERFLOW': 'sync',  # file pleine: 'sync' (écriture directe), 'block' ou 'drop'
+}
+
+
+# Rétention des logs d'audit (manage.py archiver_logs)
+# Les logs plus vieux que JOURS sont déplacés dans des fichiers gzip JSONL
+# partitionnés par jour, puis supprimés de la table par lots de BATCH_SIZE.
+RDV_LOG_RETENTION = {
+    'JOURS': 90,
+    'BATCH_SIZE': 1000,
+    'ARCHIVE_DIR': BASE_DIR / 'archives' / 'logs',
+}
+
+
+# Notifications (rappels)
+# Backends fournis: rdv_app.notifications.ConsoleBackend, EmailBackend,
+# FichierBackend et MemoireBackend (tests et benchmarks).
+# Pour les backends à pool (EmailBackend, FichierBackend, MemoireBackend),
+# OPTIONS fixe le nombre de connexions parallèles et la taille des lots
+# envoyés par connexion, par exemple {'concurrence': 4, 'taille_lot': 100}.
+RDV_NOTIFICATIONS = {
+    'BACKEND': 'rdv_app.notifications.ConsoleBackend',
+    'OPTIONS': {},
+}
+
+
+# Politique de rappels: type de rappel (Rappel.TYPE_CHOICES) -> délai avant le RDV
+# Appliquée à chaque création, report ou annulation de rendez-vous
+# (rdv_app.rappels.synchroniser_rappels) et par manage.py rebuild_rappels.
+RDV_POLITIQUE_RAPPELS = {
+    '24h': timedelta(hours=24),
+    '48h': timedelta(hours=48),
+}
+
+
+# Rapports PDF générés en arrière-plan (rdv_app.rapports), fichiers dans MEDIA_ROOT/rapports/
+RDV_RAPPORTS_WORKERS = int(os.environ.get('RDV_RAPPORTS_WORKERS', 2))
+# Rapport en attente ou en cours sans nouvelle depuis ce délai: worker redémarré, relancé à la demande suivante
+RDV_RAPPORTS_EXPIRATION = timedelta(minutes=15)
+
+
+# SQLite: pragmas appliqués à chaque nouvelle connexion (rdv_app.sqlite, signal connection_created).
+# WAL: les lectures ne bloquent plus l'écriture et inversement; synchronous=normal est sûr
+# en WAL (fsync aux checkpoints). RDV_SQLITE_PRAGMAS = {} pour garder les réglages SQLite.
+RDV_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,       # ms d'attente du verrou d'écriture avant "database is locked"
+    'cache_size': -20000,       # négatif = en KiB, soit ~20 Mo par connexion
+    'mmap_size': 134217728,     # 128 Mo lus via mmap
+    'temp_store': 'memory',
+}
+
+
+# Flux iCalendar (rdv_app.calendrier): mis en cache, invalidés par les signaux des rendez-vous.
+# Avec plusieurs process, le cache doit être partagé (CACHES) pour que l'invalidation porte partout.
+RDV_CALENDRIER = {
+    'DUREE_RDV': timedelta(minutes=30),
+    'JOURS_PASSES': 90,       # historique inclus dans le flux
+    'CACHE_TIMEOUT': 3600,    # âge maximal d'un flux en cache (secondes)
+}
+
+
+# Événements en direct (rdv_app.evenements, /api/evenements/): flux SSE servis en ASGI uniquement,
+# en WSGI chaque connexion ouverte immobiliserait un worker. BusMemoire suffit avec un seul process
+# uvicorn; avec plusieurs workers, 'rdv_app.evenements.BusPostgres' (LISTEN/NOTIFY) les relie.
+RDV_EVENEMENTS = {
+    'BACKEND': os.environ.get('RDV_EVENEMENTS_BACKEND', 'rdv_app.evenements.BusMemoire'),
+    'TAILLE_HISTORIQUE': 1000,  # événements gardés pour la reprise par Last-Event-ID
+    'TAILLE_FILE': 100,         # événements en attente par connexion avant resynchronisation
+    'HEARTBEAT': 15,            # secondes entre deux pings
+}
+
+
+# Autocomplétion (rdv_app.autocompletion, /api/autocomplete/): index des noms en mémoire dans chaque
+# process (~300 octets par profil), construit à la première requête puis mis à jour depuis un journal
+# des modifications en cache. Avec plusieurs process, CACHES doit être partagé (Redis, Memcached):
+# avec LocMem, un process ne voit les profils écrits par les autres qu'après AGE_MAX secondes.
+RDV_AUTOCOMPLETION = {
+    'LIMITE': 10,               # suggestions par défaut
+    'LIMITE_MAX': 50,
+    'MAX_PARCOURS': 5000,       # candidats examinés au plus par requête (borne la latence)
+    'JOURNAL_TIMEOUT': 86400,   # au-delà, un process en retard reconstruit son index
+    'AGE_MAX': 300,             # secondes avant reconstruction en arrière-plan (None: jamais)
+}
+
+
+# Fragments en cache (rdv_app.fragments): tableaux de bord, planning de la semaine et détail praticien,
+# par rôle et par version du praticien/patient concerné. Les signaux incrémentent ces versions à chaque
+# réservation, modification ou annulation: seuls les fragments concernés sont recalculés, sur le primaire
+# (jamais sur la réplique, qui peut être en retard sur la nouvelle version).
+# Avec plusieurs process, CACHES doit être partagé. TIMEOUT = 0 désactive ce cache.
+RDV_FRAGMENTS = {
+    'TIMEOUT': 300,     # âge maximal d'un fragment (les listes "à venir" glissent avec l'heure)
+}
+
+
+# Listes HTML paginées (rdv_app.pagination): par numéro de page pour les praticiens, par curseur
+# (?curseur=, sans OFFSET) pour les rendez-vous, patients, annulations et rappels. ?taille= ajuste la page.
+RDV_PAGINATION = {
+    'TAILLE_PAGE': 50,
+    'TAILLE_MAX': 200,
+}
+
+
+# Import CSV de comptes (rdv_app.import_csv, manage.py importer_comptes, POST /api/patients/import/).
+# Sans colonne password, les comptes sont créés sans mot de passe utilisable (à définir ensuite):
+# un hachage PBKDF2 coûte ~0,4 s par compte, d'où un pool de processus en mode 'csv'.
+RDV_IMPORT = {
+    'TAILLE_LOT': 1000,     # comptes insérés par transaction (bulk_create)
+    'WORKERS': None,        # processus de hachage, None = nombre de cœurs
+}
+
+
+# Démarrage à froid (manage.py mesure_demarrage --verifier): les dépendances lourdes et optionnelles
+# (PDF, exports analytiques) s'importent à la première utilisation, jamais au chargement des workers.
+RDV_BUDGET_DEMARRAGE = {
+    'IMPORT_MS': 1000,      # temps d'import cumulé de l'application WSGI (python -X importtime)
+    'MODULES_DIFFERES': ['reportlab', 'pyarrow', 'pandas'],
+}
+
 
 # Logging Configuration
 LOGGING = {
@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import (
     User, Praticien, HorairePraticien, Indisponibilite,
-    Patient, RendezVous, Annulation, Rappel, Log
+    Patient, RendezVous, Annulation, Rappel, Log, Rapport
 )
 
 
@@ -67,7 +67,7 @@ class AnnulationAdmin(admin.ModelAdmin):
 
 @admin.register(Rappel)
 class RappelAdmin(admin.ModelAdmin):
-    list_display = ['rdv', 'type_rappel', 'date_envoi_prevue', 'envoye', 'date_envoi_effectif']
+    list_display = ['rdv', 'type_rappel', 'date_envoi_prevue', 'envoye', 'date_envoi_effectif', 'echec']
     list_filter = ['type_rappel', 'envoye', 'date_envoi_prevue']
 
 
@@ -79,3 +79,9 @@ class LogAdmin(admin.ModelAdmin):
     date_hierarchy = 'date'
     readonly_fields = ['date', 'user', 'action', 'details', 'table_cible', 'cible_id', 'ip_address']
 
+
+@admin.register(Rapport)
+class RapportAdmin(admin.ModelAdmin):
+    list_display = ['id', 'statut', 'progression', 'nb_lignes', 'demandeur', 'date_creation', 'date_fin']
+    list_filter = ['statut', 'date_creation']
+    readonly_fields = ['cle', 'parametres', 'statut', 'progression', 'nb_lignes', 'fichier', 'erreur', 'demandeur', 'date_creation', 'date_fin']
@@ -1,9 +1,12 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework.routers import DefaultRouter
+from . import async_views
 from .api_views import (
     AuthViewSet, PraticienViewSet, PatientViewSet,
     RendezVousViewSet, AnnulationViewSet, RappelViewSet, 
-    LogViewSet, statistiques_view
+    LogViewSet, RapportViewSet, statistiques_view, heatmap_view,
+    export_analytique_view, calendrier_view, recherche_view,
+    autocomplete_view
 )
 
 # Router pour les ViewSets
@@ -14,6 +17,7 @@ router.register(r'rendez-vous', RendezVousViewSet, basename='rendezvous')
 router.register(r'annulations', AnnulationViewSet, basename='annulation')
 router.register(r'rappels', RappelViewSet, basename='rappel')
 router.register(r'logs', LogViewSet, basename='log')
+router.register(r'rapports', RapportViewSet, basename='rapport')
 
 urlpatterns = [
     # Authentification
@@ -22,8 +26,27 @@ urlpatterns = [
     path('auth/logout/', AuthViewSet.as_view({'post': 'logout'}), name='api-logout'),
     path('auth/user/', AuthViewSet.as_view({'get': 'user'}), name='api-user'),
     
+    # Recherche de patients et praticiens (classée, paginée)
+    path('recherche/', recherche_view, name='api-recherche'),
+    path('autocomplete/', autocomplete_view, name='api-autocomplete'),
+    
     # Statistiques
     path('statistiques/', statistiques_view, name='api-statistiques'),
+    path('statistiques/heatmap/', heatmap_view, name='api-heatmap'),
+    path('statistiques/export/', export_analytique_view, name='api-export-analytique'),
+    
+    # Lectures asynchrones (déploiement ASGI)
+    path('async/praticiens/<int:praticien_id>/creneaux/', async_views.creneaux_view, name='api-async-creneaux'),
+    path('async/rendez-vous/calendrier/', async_views.calendrier_view, name='api-async-calendrier'),
+    path('async/dashboard/', async_views.dashboard_view, name='api-async-dashboard'),
+    path('async/statistiques/', async_views.statistiques_view, name='api-async-statistiques'),
+
+    # Mises à jour en direct des plannings (SSE, déploiement ASGI)
+    path('evenements/', async_views.evenements_view, {'type_portee': 'admin'}, name='api-evenements-admin'),
+    re_path(r'^evenements/(?P<type_portee>praticien|patient)/(?P<objet_id>\d+)/$', async_views.evenements_view, name='api-evenements'),
+    
+    # Flux iCalendar (abonnement par jeton)
+    re_path(r'^calendrier/(?P<type_flux>praticien|patient)/(?P<jeton>[\w-]+)\.ics$', calendrier_view, name='api-calendrier'),
     
     # Routes du router
     path('', include(router.urls)),
@@ -1,24 +1,82 @@
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from django.contrib.auth import authenticate
-from django.db.models import Q, Count
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.db.models import Count
 from django.utils import timezone
 from datetime import datetime, timedelta, date
+from itertools import islice
+import io
+import tempfile
 
 from .models import (
     User, Praticien, Patient, RendezVous, Annulation, 
-    Rappel, Log, HorairePraticien, Indisponibilite
+    Rappel, Log, HorairePraticien, Indisponibilite, Rapport
 )
 from .serializers import (
     UserSerializer, PraticienSerializer, PatientSerializer,
     RendezVousSerializer, AnnulationSerializer, RappelSerializer,
     LogSerializer, HorairePraticienSerializer, IndisponibiliteSerializer,
-    PatientRegistrationSerializer, PraticienCreateSerializer, PatientCreateSerializer
+    PatientRegistrationSerializer, PraticienCreateSerializer, PatientCreateSerializer,
+    RapportSerializer
 )
-from .utils import log_action
+from .authentification import ajouter_claims
+from .utils import log_action, check_permission, calculer_heatmap
+from .log_archive import rechercher_archives
+from .log_search import LIMITE_MAX, CurseurInvalide, rechercher_logs
+from .rapports import demander_rapport
+from .export_analytique import FORMATS, exporter_rendez_vous
+from .calendrier import get_flux
+from .autocompletion import get_autocompletion
+from .import_csv import Import, ecrire_rapport_csv
+from .recherche import filtrer as filtrer_recherche, rechercher
+from .routers import lecture_replica
+
+
+def importer_comptes_csv(request, type_compte):
+    """Import CSV de comptes (multipart: fichier, mots_de_passe, simulation), réservé aux admins
+
+    Réponse: comptes créés et erreurs par ligne, en JSON ou en CSV avec ?rapport=csv.
+    """
+    if not check_permission(request.user, ['admin']):
+        return Response(
+            {'message': 'Accès non autorisé'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    fichier = request.FILES.get('fichier')
+    if fichier is None:
+        return Response({'message': 'Fichier CSV requis (champ "fichier")'}, status=status.HTTP_400_BAD_REQUEST)
+
+    simulation = str(request.data.get('simulation', '')).lower() in ('1', 'true', 'oui')
+    try:
+        import_comptes = Import(
+            type_compte,
+            mots_de_passe=request.data.get('mots_de_passe', 'a_definir'),
+            simulation=simulation,
+        )
+        resultat = import_comptes.executer(io.TextIOWrapper(fichier.file, encoding='utf-8-sig', newline=''))
+    except (ValueError, UnicodeDecodeError) as e:
+        return Response({'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not simulation:
+        log_action(
+            request, 'Import CSV',
+            f"{resultat['crees']} {type_compte}s importés depuis {fichier.name}, {len(resultat['erreurs'])} lignes rejetées",
+            type_compte.capitalize(),
+        )
+    if request.query_params.get('rapport') == 'csv':
+        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="import_{type_compte}s_erreurs.csv"'
+        ecrire_rapport_csv(resultat['erreurs'], response)
+        return response
+    return Response(resultat, status=status.HTTP_200_OK if simulation else status.HTTP_201_CREATED)
 
 
 class AuthViewSet(viewsets.ViewSet):
@@ -33,7 +91,7 @@ class AuthViewSet(viewsets.ViewSet):
         
         user = authenticate(username=username, password=password)
         if user:
-            refresh = RefreshToken.for_user(user)
+            refresh = ajouter_claims(RefreshToken.for_user(user), user)
             
             # Ajouter les informations du profil selon le rôle
             user_data = UserSerializer(user).data
@@ -100,6 +158,7 @@ class AuthViewSet(viewsets.ViewSet):
         return Response(user_data)
 
 
+@lecture_replica
 class PraticienViewSet(viewsets.ModelViewSet):
     """ViewSet pour les praticiens"""
     queryset = Praticien.objects.all().select_related('user')
@@ -125,11 +184,8 @@ class PraticienViewSet(viewsets.ModelViewSet):
         
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(specialite__icontains=search)
-            )
+            # Index plein texte (préfixes, sans accents), voir rdv_app.recherche
+            queryset = filtrer_recherche(queryset, search)
         
         return queryset
     
@@ -142,6 +198,11 @@ class PraticienViewSet(viewsets.ModelViewSet):
             return Response(PraticienSerializer(praticien).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], url_path='import')
+    def importer(self, request):
+        """Import CSV de praticiens (admin)"""
+        return importer_comptes_csv(request, 'praticien')
+    
     @action(detail=True, methods=['get'])
     def horaires(self, request, pk=None):
         """Récupérer les horaires d'un praticien"""
@@ -161,6 +222,20 @@ class PraticienViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=True, methods=['get', 'post'])
+    def calendrier(self, request, pk=None):
+        """URL d'abonnement iCalendar (POST: nouveau jeton, l'ancienne URL cesse de fonctionner)"""
+        praticien = self.get_object()
+        if not (check_permission(request.user, ['admin']) or getattr(request.user, 'praticien_profile', None) == praticien):
+            return Response(
+                {'message': 'Accès non autorisé'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        jeton = praticien.get_jeton_calendrier(regenerer=request.method == 'POST')
+        if request.method == 'POST':
+            log_action(request, 'Jeton calendrier', 'Nouveau jeton de flux iCalendar', 'Praticien', praticien.id)
+        return Response({'url': request.build_absolute_uri(f'/api/calendrier/praticien/{jeton}.ics')})
+    
     @action(detail=True, methods=['get'])
     def indisponibilites(self, request, pk=None):
         """Récupérer les indisponibilités d'un praticien"""
@@ -181,6 +256,7 @@ class PraticienViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@lecture_replica
 class PatientViewSet(viewsets.ModelViewSet):
     """ViewSet pour les patients"""
     queryset = Patient.objects.all().select_related('user')
@@ -198,11 +274,8 @@ class PatientViewSet(viewsets.ModelViewSet):
         # Filtre de recherche
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(telephone__icontains=search)
-            )
+            # Index plein texte (préfixes, sans accents), voir rdv_app.recherche
+            queryset = filtrer_recherche(queryset, search)
         
         return queryset
     
@@ -214,8 +287,28 @@ class PatientViewSet(viewsets.ModelViewSet):
             log_action(request, 'Création patient', f'Patient créé: {patient.user.get_full_name()}', 'Patient', patient.id)
             return Response(PatientSerializer(patient).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def importer(self, request):
+        """Import CSV de patients (admin)"""
+        return importer_comptes_csv(request, 'patient')
+    
+    @action(detail=True, methods=['get', 'post'])
+    def calendrier(self, request, pk=None):
+        """URL d'abonnement iCalendar (POST: nouveau jeton, l'ancienne URL cesse de fonctionner)"""
+        patient = self.get_object()
+        if not (check_permission(request.user, ['admin']) or getattr(request.user, 'patient_profile', None) == patient):
+            return Response(
+                {'message': 'Accès non autorisé'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        jeton = patient.get_jeton_calendrier(regenerer=request.method == 'POST')
+        if request.method == 'POST':
+            log_action(request, 'Jeton calendrier', 'Nouveau jeton de flux iCalendar', 'Patient', patient.id)
+        return Response({'url': request.build_absolute_uri(f'/api/calendrier/patient/{jeton}.ics')})
 
 
+@lecture_replica
 class RendezVousViewSet(viewsets.ModelViewSet):
     """ViewSet pour les rendez-vous"""
     queryset = RendezVous.objects.all().select_related('patient__user', 'praticien__user')
@@ -328,6 +421,7 @@ class AnnulationViewSet(viewsets.ModelViewSet):
         })
 
 
+@lecture_replica
 class RappelViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet pour les rappels (lecture seule)"""
     queryset = Rappel.objects.all().select_related('rdv__patient__user', 'rdv__praticien__user')
@@ -344,6 +438,7 @@ class RappelViewSet(viewsets.ReadOnlyModelViewSet):
         return queryset
 
 
+@lecture_replica
 class LogViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet pour les logs (lecture seule)"""
     queryset = Log.objects.all().select_related('user')
@@ -358,10 +453,197 @@ class LogViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(action__icontains=action)
         
         # Limiter aux 100 derniers logs par défaut
-        limit = self.request.query_params.get('limit', 100)
-        return queryset[:int(limit)]
+        return queryset[:self.get_limit()]
+    
+    def get_limit(self):
+        """?limit= entre 1 et LIMITE_MAX (100 par défaut); ValueError si invalide"""
+        limit = int(self.request.query_params.get('limit', 100))
+        if limit < 1:
+            raise ValueError(limit)
+        return min(limit, LIMITE_MAX)
+    
+    def list(self, request, *args, **kwargs):
+        """Liste des logs, ou recherche plein texte si ?search= est fourni"""
+        try:
+            limit = self.get_limit()
+        except ValueError:
+            return Response(
+                {'message': f'Limite invalide (entier entre 1 et {LIMITE_MAX})'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        search = request.query_params.get('search')
+        if not search:
+            return super().list(request, *args, **kwargs)
+        
+        # Résultats triés par pertinence, pagination par curseur
+        try:
+            logs, curseur_suivant = rechercher_logs(
+                search,
+                limit=limit,
+                curseur=request.query_params.get('curseur'),
+            )
+        except CurseurInvalide:
+            return Response({'message': 'Curseur invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'results': self.get_serializer(logs, many=True).data,
+            'curseur_suivant': curseur_suivant,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def archives(self, request):
+        """Rechercher dans les logs archivés (par dates et action)"""
+        if not check_permission(request.user, ['admin']):
+            return Response(
+                {'message': 'Accès non autorisé'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # rechercher_archives est un générateur: valider avant d'itérer, sinon l'erreur devient une 500
+        try:
+            date_debut, date_fin = (
+                date.fromisoformat(valeur) if valeur else None
+                for valeur in (request.query_params.get('date_debut'), request.query_params.get('date_fin'))
+            )
+            limit = int(request.query_params.get('limit', 100))
+        except ValueError:
+            return Response(
+                {'message': 'Paramètres invalides (dates AAAA-MM-JJ, limit entier)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if limit < 1:
+            return Response({'message': 'Limite invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entrees = rechercher_archives(
+            date_debut=date_debut,
+            date_fin=date_fin,
+            action=request.query_params.get('action'),
+        )
+        return Response(list(islice(entrees, limit)))
 
 
+class RapportViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet pour les rapports PDF générés en arrière-plan"""
+    queryset = Rapport.objects.all()
+    serializer_class = RapportSerializer
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not check_permission(self.request.user, ['admin']):
+            return queryset.none()
+        return queryset
+    
+    def create(self, request, *args, **kwargs):
+        """Demander un rapport (réutilise un rapport identique déjà généré)"""
+        if not check_permission(request.user, ['admin']):
+            return Response(
+                {'message': 'Accès non autorisé'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        # Dates validées ici: une valeur invalide ferait échouer la requête de demander_rapport (500)
+        try:
+            parametres = {
+                cle: date.fromisoformat(request.data[cle]).isoformat() if request.data.get(cle) else None
+                for cle in ('date_debut', 'date_fin')
+            }
+        except (TypeError, ValueError):
+            return Response(
+                {'message': 'Dates invalides (AAAA-MM-JJ)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        rapport = demander_rapport(parametres, request.user)
+        log_action(request, 'Export PDF', f'Rapport #{rapport.id} demandé', 'Rapport', rapport.id)
+        return Response(RapportSerializer(rapport).data, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def telecharger(self, request, pk=None):
+        """Télécharger le PDF d'un rapport terminé"""
+        rapport = self.get_object()
+        if rapport.statut != 'termine' or not rapport.fichier:
+            return Response(
+                {'message': 'Rapport pas encore disponible', 'statut': rapport.statut, 'progression': rapport.progression},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(
+            rapport.fichier.open('rb'),
+            as_attachment=True,
+            filename=f'rapport_rdv_{rapport.date_creation.strftime("%Y%m%d")}.pdf',
+        )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocomplete_view(request):
+    """Suggestions pendant la saisie (?q, ?type=praticien|patient, ?limite), servies depuis
+    l'index en mémoire du process: aucune requête SQL une fois l'index construit"""
+    type_profil = request.query_params.get('type', 'praticien')
+    roles = {'praticien': ['admin', 'praticien', 'patient'], 'patient': ['admin', 'praticien']}
+    if type_profil not in roles:
+        return Response({'message': 'Type invalide (patient ou praticien)'}, status=status.HTTP_400_BAD_REQUEST)
+    if not check_permission(request.user, roles[type_profil]):
+        return Response(
+            {'message': 'Accès non autorisé'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    try:
+        limite = int(request.query_params.get('limite', 0)) or None
+    except ValueError:
+        limite = -1
+    if limite is not None and limite < 1:
+        return Response({'message': 'Limite invalide (entier positif)'}, status=status.HTTP_400_BAD_REQUEST)
+
+    suggestions = get_autocompletion().chercher(type_profil, request.query_params.get('q', ''), limite)
+    resultats = []
+    for profil_id, libelle in suggestions:
+        resultat = {'id': profil_id, 'libelle': ' '.join(libelle[:3])}
+        if type_profil == 'praticien':
+            resultat['specialite'] = libelle[3]
+        resultats.append(resultat)
+    return Response(resultats)
+
+
+@lecture_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recherche_view(request):
+    """Recherche classée par pertinence (?q, ?type=patient|praticien, ?page, ?page_size)
+
+    Chaque mot est un préfixe ("mar dup" trouve Marie Dupont), sans tenir compte des accents.
+    """
+    type_profil = request.query_params.get('type', 'patient')
+    modeles = {
+        'patient': (Patient, PatientSerializer, ['admin', 'praticien']),
+        'praticien': (Praticien, PraticienSerializer, ['admin', 'praticien', 'patient']),
+    }
+    if type_profil not in modeles:
+        return Response({'message': 'Type invalide (patient ou praticien)'}, status=status.HTTP_400_BAD_REQUEST)
+    modele, serializer_class, roles = modeles[type_profil]
+    if not check_permission(request.user, roles):
+        return Response(
+            {'message': 'Accès non autorisé'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    try:
+        page = max(int(request.query_params.get('page', 1)), 1)
+        page_size = min(max(int(request.query_params.get('page_size', 20)), 1), 100)
+    except ValueError:
+        return Response({'message': 'Pagination invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    ids, total = rechercher(modele, request.query_params.get('q', ''), limite=page_size, decalage=(page - 1) * page_size)
+    profils = modele.objects.select_related('user').in_bulk(ids)
+    url = request.build_absolute_uri()
+    return Response({
+        'count': total,
+        'next': replace_query_param(url, 'page', page + 1) if page * page_size < total else None,
+        'previous': (
+            None if page == 1 else
+            remove_query_param(url, 'page') if page == 2 else replace_query_param(url, 'page', page - 1)
+        ),
+        'results': serializer_class([profils[i] for i in ids if i in profils], many=True).data,
+    })
+
+
+@lecture_replica
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def statistiques_view(request):
@@ -408,3 +690,119 @@ def statistiques_view(request):
         'rdv_par_specialite': rdv_par_specialite,
         'rdv_mois': rdv_mois,
     })
+
+
+@lecture_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def heatmap_view(request):
+    """Heatmaps de la demande par jour de semaine et demi-heure"""
+    if not check_permission(request.user, ['admin']):
+        return Response(
+            {'message': 'Accès non autorisé'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    specialite = request.query_params.get('specialite')
+    try:
+        praticien_id = request.query_params.get('praticien_id')
+        praticien_id = int(praticien_id) if praticien_id else None
+        date_debut, date_fin = (
+            date.fromisoformat(valeur) if valeur else None
+            for valeur in (request.query_params.get('date_debut'), request.query_params.get('date_fin'))
+        )
+    except ValueError:
+        return Response(
+            {'message': 'Paramètres invalides (praticien_id entier, dates AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    heatmap = calculer_heatmap(
+        specialite=specialite,
+        praticien_id=praticien_id,
+        date_debut=date_debut,
+        date_fin=date_fin,
+    )
+    
+    return Response({
+        'specialite': specialite,
+        'jours': [label for _, label in HorairePraticien.JOURS_SEMAINE],
+        'creneaux': [f'{h:02d}:{m:02d}' for h in range(24) for m in (0, 30)],
+        **heatmap,
+    })
+
+
+@lecture_replica
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_analytique_view(request):
+    """Export columnaire (Parquet ou Arrow) de l'historique des rendez-vous"""
+    if not check_permission(request.user, ['admin']):
+        return Response(
+            {'message': 'Accès non autorisé'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    # `format` est réservé par DRF pour la négociation de contenu
+    format_export = request.query_params.get('type', 'parquet')
+    if format_export not in FORMATS:
+        return Response(
+            {'message': f"Format non supporté, choix: {', '.join(FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        date_debut, date_fin = (
+            date.fromisoformat(valeur) if valeur else None
+            for valeur in (request.query_params.get('date_debut'), request.query_params.get('date_fin'))
+        )
+    except ValueError:
+        return Response(
+            {'message': 'Dates invalides (AAAA-MM-JJ)'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    fichier = tempfile.TemporaryFile()
+    try:
+        total = exporter_rendez_vous(
+            fichier,
+            format_export=format_export,
+            date_debut=date_debut,
+            date_fin=date_fin,
+        )
+    except ImproperlyConfigured as e:
+        fichier.close()
+        return Response({'message': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+    
+    log_action(request, 'Export analytique', f'{total} rendez-vous ({format_export})', 'RendezVous')
+    fichier.seek(0)
+    extension, content_type = FORMATS[format_export]
+    return FileResponse(
+        fichier,
+        as_attachment=True,
+        filename=f'rendez_vous_{timezone.now().strftime("%Y%m%d")}.{extension}',
+        content_type=content_type,
+    )
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def calendrier_view(request, type_flux, jeton):
+    """Flux iCalendar d'un praticien ou d'un patient, authentifié par son jeton"""
+    modele = Praticien if type_flux == 'praticien' else Patient
+    objet = modele.objects.select_related('user').filter(jeton_calendrier=jeton).first()
+    if objet is None:
+        raise Http404
+    
+    flux = get_flux(type_flux, objet)
+    # If-None-Match / If-Modified-Since: 304 sans corps
+    response = get_conditional_response(
+        request, etag=flux['etag'], last_modified=int(flux['modifie'].timestamp())
+    )
+    if response is None:
+        response = HttpResponse(flux['contenu'], content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="{type_flux}.ics"'
+    response['ETag'] = flux['etag']
+    response['Last-Modified'] = http_date(flux['modifie'].timestamp())
+    patch_cache_control(response, private=True, max_age=300)
+    return response
@@ -5,4 +5,6 @@ class RdvAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'rdv_app'
     verbose_name = 'Gestion des Rendez-vous'
-
+    
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,297 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentification import aget_utilisateur, verifier
+from .evenements import get_bus, get_config as get_config_evenements
+from .models import Praticien, Patient, RendezVous, Annulation
+from .routers import lecture_replica
+from .utils import calculer_creneaux, check_permission, requetes_creneaux
+
+# Vues de lecture pour le déploiement ASGI: ORM asynchrone, requêtes indépendantes
+# lancées ensemble (asyncio.gather), aucun thread bloqué pendant l'attente de la base.
+_jwt = JWTAuthentication()
+
+
+async def authentifier(request, jeton_url=False):
+    """Utilisateur du jeton JWT (en-tête Authorization) ou de la session, sinon None
+
+    `jeton_url` accepte aussi ?token= pour les clients qui ne peuvent pas
+    envoyer d'en-têtes (EventSource).
+    """
+    entete = _jwt.get_header(request)
+    brut = None
+    if entete is not None:
+        brut = _jwt.get_raw_token(entete)
+        if brut is None:
+            return None
+    elif jeton_url and request.GET.get('token'):
+        brut = request.GET['token'].encode()
+    if brut is not None:
+        try:
+            jeton = _jwt.get_validated_token(brut)
+        except (InvalidToken, TokenError):
+            return None
+        try:
+            return verifier(await aget_utilisateur(jeton[jwt_settings.USER_ID_CLAIM]), jeton)
+        except (AuthenticationFailed, KeyError):
+            return None
+
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+def vue_async(roles=None, jeton_url=False):
+    """GET authentifié (JWT ou session), réservé à `roles` si précisé"""
+    def decorateur(vue):
+        @wraps(vue)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return JsonResponse({'message': 'Méthode non autorisée'}, status=405)
+            user = await authentifier(request, jeton_url)
+            if user is None:
+                return JsonResponse({'message': 'Authentification requise'}, status=401)
+            if roles is not None and not check_permission(user, roles):
+                return JsonResponse({'message': 'Accès non autorisé'}, status=403)
+            request.user = user
+            return await vue(request, *args, **kwargs)
+        return lecture_replica(wrapper)
+    return decorateur
+
+
+async def _liste(queryset):
+    return [ligne async for ligne in queryset]
+
+
+@vue_async()
+async def creneaux_view(request, praticien_id):
+    """Créneaux libres d'un praticien pour une date (?date=AAAA-MM-JJ, défaut: aujourd'hui)"""
+    try:
+        date_cible = date.fromisoformat(request.GET.get('date', '')) if request.GET.get('date') else date.today()
+    except ValueError:
+        return JsonResponse({'message': 'Date invalide (AAAA-MM-JJ)'}, status=400)
+
+    horaires, indisponibilites, rdv_pris = requetes_creneaux(praticien_id, date_cible)
+    horaires, indisponible, rdv_pris = await asyncio.gather(
+        _liste(horaires), indisponibilites.aexists(), _liste(rdv_pris),
+    )
+    creneaux = [] if indisponible else calculer_creneaux(date_cible, horaires, set(rdv_pris))
+    return JsonResponse({
+        'praticien_id': praticien_id,
+        'date': date_cible.isoformat(),
+        'creneaux': [timezone.localtime(creneau).strftime('%H:%M') for creneau in creneaux],
+    })
+
+
+@vue_async()
+async def calendrier_view(request):
+    """Rendez-vous d'un mois (?month, ?year, ?praticien_id, ?patient_id)"""
+    today = date.today()
+    try:
+        month = int(request.GET.get('month', today.month))
+        year = int(request.GET.get('year', today.year))
+        debut = timezone.make_aware(datetime(year, month, 1))
+    except ValueError:
+        return JsonResponse({'message': 'Mois invalide'}, status=400)
+    fin = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+
+    rdv_list = RendezVous.objects.filter(date_heure__gte=debut, date_heure__lt=fin)
+    if request.GET.get('praticien_id'):
+        rdv_list = rdv_list.filter(praticien_id=request.GET['praticien_id'])
+    if request.GET.get('patient_id'):
+        rdv_list = rdv_list.filter(patient_id=request.GET['patient_id'])
+
+    statuts = dict(RendezVous.STATUT_CHOICES)
+    resultats = [
+        {
+            'id': rdv['id'],
+            'date_heure': rdv['date_heure'].isoformat(),
+            'motif': rdv['motif'],
+            'statut': rdv['statut'],
+            'statut_display': statuts.get(rdv['statut'], rdv['statut']),
+            'patient': {
+                'id': rdv['patient_id'],
+                'nom': f"{rdv['patient__user__first_name']} {rdv['patient__user__last_name']}",
+            },
+            'praticien': {
+                'id': rdv['praticien_id'],
+                'nom': f"{rdv['praticien__user__first_name']} {rdv['praticien__user__last_name']}",
+                'specialite': rdv['praticien__specialite'],
+            },
+        }
+        async for rdv in rdv_list.order_by('date_heure').values(
+            'id', 'date_heure', 'motif', 'statut', 'patient_id', 'praticien_id',
+            'patient__user__first_name', 'patient__user__last_name',
+            'praticien__user__first_name', 'praticien__user__last_name', 'praticien__specialite',
+        )
+    ]
+    return JsonResponse(resultats, safe=False)
+
+
+@vue_async()
+async def dashboard_view(request):
+    """Compteurs du tableau de bord selon le rôle"""
+    user = request.user
+    maintenant = timezone.now()
+    debut_jour = timezone.localtime(maintenant).replace(hour=0, minute=0, second=0, microsecond=0)
+    actifs = ['en_attente', 'confirme']
+
+    if check_permission(user, ['admin']):
+        total_rdv, rdv_aujourdhui, total_patients, total_praticiens, annulations_attente = await asyncio.gather(
+            RendezVous.objects.acount(),
+            RendezVous.objects.filter(
+                date_heure__gte=debut_jour, date_heure__lt=debut_jour + timedelta(days=1), statut__in=actifs
+            ).acount(),
+            Patient.objects.acount(),
+            Praticien.objects.filter(actif=True).acount(),
+            Annulation.objects.filter(statut='en_attente').acount(),
+        )
+        return JsonResponse({
+            'total_rdv': total_rdv,
+            'rdv_aujourdhui': rdv_aujourdhui,
+            'total_patients': total_patients,
+            'total_praticiens': total_praticiens,
+            'annulations_attente': annulations_attente,
+        })
+
+    if user.role == 'praticien':
+        filtre = {'praticien__user_id': user.id}
+    elif user.role == 'patient':
+        filtre = {'patient__user_id': user.id}
+    else:
+        return JsonResponse({'message': 'Accès non autorisé'}, status=403)
+
+    rdv_list = RendezVous.objects.filter(**filtre)
+    rdv_aujourdhui, rdv_semaine, rdv_futurs, rdv_passes = await asyncio.gather(
+        rdv_list.filter(
+            date_heure__gte=debut_jour, date_heure__lt=debut_jour + timedelta(days=1), statut__in=actifs
+        ).acount(),
+        rdv_list.filter(
+            date_heure__gte=maintenant, date_heure__lte=maintenant + timedelta(days=7), statut__in=actifs
+        ).acount(),
+        rdv_list.filter(date_heure__gte=maintenant, statut__in=actifs).acount(),
+        rdv_list.filter(date_heure__lt=maintenant).acount(),
+    )
+    return JsonResponse({
+        'rdv_aujourdhui': rdv_aujourdhui,
+        'rdv_semaine': rdv_semaine,
+        'rdv_futurs': rdv_futurs,
+        'rdv_passes': rdv_passes,
+    })
+
+
+@vue_async()
+async def statistiques_view(request):
+    """Statistiques (mêmes champs que /api/statistiques/)"""
+    today = date.today()
+    first_day = timezone.make_aware(datetime(today.year, today.month, 1))
+    last_day = timezone.make_aware(datetime(today.year + today.month // 12, today.month % 12 + 1, 1))
+
+    par_statut, rdv_par_praticien, rdv_par_specialite, rdv_mois = await asyncio.gather(
+        _liste(RendezVous.objects.order_by().values('statut').annotate(nb=Count('id'))),
+        _liste(Praticien.objects.annotate(
+            nb_rdv=Count('rendez_vous')
+        ).values('id', 'user__first_name', 'user__last_name', 'specialite', 'nb_rdv').order_by('-nb_rdv')[:10]),
+        _liste(Praticien.objects.values('specialite').annotate(
+            nb_rdv=Count('rendez_vous')
+        ).order_by('-nb_rdv')),
+        RendezVous.objects.filter(date_heure__gte=first_day, date_heure__lt=last_day).acount(),
+    )
+    par_statut = {ligne['statut']: ligne['nb'] for ligne in par_statut}
+    total_rdv = sum(par_statut.values())
+    rdv_annules = par_statut.get('annule', 0)
+
+    return JsonResponse({
+        'total_rdv': total_rdv,
+        'rdv_confirmes': par_statut.get('confirme', 0),
+        'rdv_annules': rdv_annules,
+        'rdv_absences': par_statut.get('absence', 0),
+        'taux_annulation': round((rdv_annules / total_rdv * 100) if total_rdv > 0 else 0, 2),
+        'rdv_par_praticien': rdv_par_praticien,
+        'rdv_par_specialite': rdv_par_specialite,
+        'rdv_mois': rdv_mois,
+    })
+
+
+async def _portee_autorisee(user, type_portee, objet_id):
+    if check_permission(user, ['admin']):
+        return True
+    if type_portee == 'praticien':
+        return await Praticien.objects.filter(id=objet_id, user_id=user.id).aexists()
+    if type_portee == 'patient':
+        return await Patient.objects.filter(id=objet_id, user_id=user.id).aexists()
+    return False
+
+
+def _dernier_id(request):
+    valeur = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(valeur) if valeur else None
+    except ValueError:
+        return None
+
+
+@vue_async(jeton_url=True)
+async def evenements_view(request, type_portee, objet_id=None):
+    """Flux SSE des changements de rendez-vous d'un praticien, d'un patient ou de tous (admin)"""
+    if not isinstance(request, ASGIRequest):
+        # En WSGI le flux (sans fin) immobiliserait un worker par client connecté
+        return JsonResponse({'message': 'Événements en direct disponibles en ASGI uniquement'}, status=501)
+    if not await _portee_autorisee(request.user, type_portee, objet_id):
+        return JsonResponse({'message': 'Accès non autorisé'}, status=403)
+
+    portee = type_portee if objet_id is None else f'{type_portee}:{objet_id}'
+    config = get_config_evenements()
+    bus = get_bus()
+    dernier_id = _dernier_id(request)
+
+    async def flux():
+        # Abonnement avant la lecture de l'historique: aucun trou entre les deux
+        abonnement = bus.abonner(portee)
+        try:
+            yield f"retry: {config['HEARTBEAT'] * 1000}\n\n"
+            # Événements rejoués depuis l'historique, qui peuvent aussi être dans la file
+            rejoues = set()
+            if dernier_id is not None:
+                manques = bus.depuis(portee, dernier_id)
+                if manques is None:
+                    yield 'event: resync\ndata: {}\n\n'
+                    manques = []
+                for evenement in manques:
+                    rejoues.add(evenement.id)
+                    yield evenement.format_sse()
+            while True:
+                if abonnement.deborde:
+                    # Client trop lent: file vidée, il recharge son planning
+                    while not abonnement.file.empty():
+                        abonnement.file.get_nowait()
+                    abonnement.deborde = False
+                    yield 'event: resync\ndata: {}\n\n'
+                try:
+                    evenement = await asyncio.wait_for(abonnement.file.get(), config['HEARTBEAT'])
+                except asyncio.TimeoutError:
+                    # Commentaire SSE: garde la connexion ouverte à travers les proxys
+                    yield ': ping\n\n'
+                    continue
+                if rejoues:
+                    if evenement.id in rejoues:
+                        continue
+                    if evenement.id > max(rejoues):
+                        # La file a dépassé l'historique rejoué: plus de doublon possible
+                        rejoues.clear()
+                yield evenement.format_sse()
+        finally:
+            bus.desabonner(abonnement)
+
+    response = StreamingHttpResponse(flux(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import User
+
+
+def get_timeout():
+    """Durée de vie (secondes) d'un utilisateur en cache; 0 désactive le cache"""
+    return getattr(settings, 'RDV_AUTH_CACHE_TIMEOUT', 60)
+
+
+def _cle(user_id):
+    return f'auth:utilisateur:{user_id}'
+
+
+def ajouter_claims(token, user):
+    """Rôle et profils dans le jeton (copiés dans l'access token issu du refresh)"""
+    token['role'] = user.role
+    profil = getattr(user, 'praticien_profile', None)
+    token['praticien_id'] = profil.id if profil is not None else None
+    profil = getattr(user, 'patient_profile', None)
+    token['patient_id'] = profil.id if profil is not None else None
+    return token
+
+
+def _queryset():
+    # Profils chargés avec l'utilisateur: les vérifications de rôle ne refont pas de requête
+    queryset = User.objects.select_related('praticien_profile', 'patient_profile')
+    if not jwt_settings.CHECK_REVOKE_TOKEN:
+        # Le hash du mot de passe ne va pas dans le cache
+        queryset = queryset.defer('password')
+    return queryset
+
+
+def get_utilisateur(user_id):
+    """Utilisateur (avec profils) depuis le cache, ou la base au premier appel"""
+    timeout = get_timeout()
+    user = cache.get(_cle(user_id)) if timeout else None
+    if user is None:
+        user = _queryset().filter(**{jwt_settings.USER_ID_FIELD: user_id}).first()
+        if user is not None and timeout:
+            cache.set(_cle(user_id), user, timeout)
+    return user
+
+
+async def aget_utilisateur(user_id):
+    timeout = get_timeout()
+    user = await cache.aget(_cle(user_id)) if timeout else None
+    if user is None:
+        user = await _queryset().filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+        if user is not None and timeout:
+            await cache.aset(_cle(user_id), user, timeout)
+    return user
+
+
+def invalider(user_id):
+    cache.delete(_cle(user_id))
+
+
+def verifier(user, validated_token):
+    """Mêmes contrôles que simplejwt, plus la cohérence du rôle avec les claims du jeton"""
+    if user is None:
+        raise AuthenticationFailed('Utilisateur introuvable', code='user_not_found')
+    if not user.is_active:
+        raise AuthenticationFailed('Utilisateur inactif', code='user_inactive')
+    if 'role' in validated_token and validated_token['role'] != user.role:
+        # Rôle changé depuis l'émission: les claims ne sont plus fiables
+        raise AuthenticationFailed('Rôle modifié, reconnexion nécessaire', code='role_changed')
+    if jwt_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+        jwt_settings.REVOKE_TOKEN_CLAIM
+    ) != get_md5_hash_password(user.password):
+        raise AuthenticationFailed('Mot de passe modifié', code='password_changed')
+    return user
+
+
+class JWTCacheAuthentication(JWTAuthentication):
+    """JWTAuthentication sans requête par appel: utilisateur et profils en cache
+    (RDV_AUTH_CACHE_TIMEOUT), invalidés par les signaux User, Praticien et Patient"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Jeton sans identifiant utilisateur')
+        return verifier(get_utilisateur(user_id), validated_token)
@@ -0,0 +1,255 @@
+import bisect
+import logging
+import sys
+import threading
+import time
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Patient, Praticien
+from .recherche import normaliser
+
+logger = logging.getLogger('rdv_app')
+
+TYPES = {
+    'praticien': Praticien,
+    'patient': Patient,
+}
+# Journal des modifications partagé par les process (via CACHES): chaque process applique
+# les entrées qu'il n'a pas encore vues, sans relire la base
+CLE_VERSION = 'autocompletion:version'
+TOUT_RECONSTRUIRE = '*'
+
+
+def get_config():
+    config = {
+        'LIMITE': 10,
+        'LIMITE_MAX': 50,
+        'MAX_PARCOURS': 5000,       # candidats examinés au plus par requête
+        'JOURNAL_TIMEOUT': 86400,
+        'AGE_MAX': 300,
+    }
+    config.update(getattr(settings, 'RDV_AUTOCOMPLETION', {}))
+    return config
+
+
+def _cle_journal(version):
+    return f'autocompletion:journal:{version}'
+
+
+def entree_profil(type_profil, profil, user=None):
+    """(libellé..., mots indexés) d'un profil, None s'il ne doit pas être proposé"""
+    user = user or profil.user
+    if type_profil == 'praticien':
+        if not profil.actif:
+            return None
+        libelle = (profil.civilite, user.first_name, user.last_name, profil.specialite)
+    else:
+        libelle = (profil.civilite, user.first_name, user.last_name)
+    mots = tuple(sorted(set(normaliser(' '.join(libelle[1:])).split())))
+    return tuple(sys.intern(partie) for partie in libelle), tuple(sys.intern(mot) for mot in mots)
+
+
+class IndexPrefixes:
+    """Index en mémoire des noms (et spécialités) pour la saisie semi-automatique
+
+    Deux tableaux parallèles triés par mot normalisé: un préfixe correspond à
+    une tranche contiguë trouvée par bisection. Mis à jour profil par profil
+    depuis le journal; la base n'est lue qu'à la construction. Une reconstruction
+    remplace les tableaux d'un coup: les recherches continuent sur les anciens.
+    """
+
+    def __init__(self, type_profil):
+        self.type_profil = type_profil
+        self.modele = TYPES[type_profil]
+        self.mots = []              # mots triés
+        self.ids = array('q')       # id du profil de chaque mot
+        self.profils = {}           # id -> (libellé, mots)
+        self.construit = False
+        self.construit_le = None    # time.monotonic() de la dernière construction
+        self.perime = False         # à reconstruire (journal perdu)
+        self.reconstruction = None  # thread de reconstruction en cours
+        self._pendant = None        # modifications reçues pendant une construction
+        self._lock = threading.Lock()
+
+    def construire(self):
+        with self._lock:
+            self._pendant = []
+        queryset = self.modele.objects.select_related('user')
+        if self.type_profil == 'praticien':
+            queryset = queryset.filter(actif=True)
+        profils = {}
+        paires = []
+        for profil in queryset.iterator(chunk_size=5000):
+            entree = entree_profil(self.type_profil, profil)
+            profils[profil.id] = entree
+            paires.extend((mot, profil.id) for mot in entree[1])
+        paires.sort()
+        with self._lock:
+            self.profils = profils
+            self.mots = [mot for mot, _ in paires]
+            self.ids = array('q', (profil_id for _, profil_id in paires))
+            # Modifications publiées pendant la lecture: peut-être absentes de ce qui a été lu
+            for profil_id, entree in self._pendant:
+                self._appliquer(profil_id, entree)
+            self._pendant = None
+            self.construit = True
+            self.construit_le = time.monotonic()
+        logger.info("Index d'autocomplétion %s: %s profils", self.type_profil, len(profils))
+
+    def appliquer(self, profil_id, entree):
+        """Remplace (ou retire si entree est None) les mots d'un profil"""
+        with self._lock:
+            if self._pendant is not None:
+                self._pendant.append((profil_id, entree))
+            if self.construit:
+                self._appliquer(profil_id, entree)
+
+    def _appliquer(self, profil_id, entree):
+        ancienne = self.profils.pop(profil_id, None)
+        if ancienne is not None:
+            for mot in ancienne[1]:
+                i = bisect.bisect_left(self.mots, mot)
+                while i < len(self.mots) and self.mots[i] == mot:
+                    if self.ids[i] == profil_id:
+                        del self.mots[i]
+                        del self.ids[i]
+                        break
+                    i += 1
+        if entree is None:
+            return
+        self.profils[profil_id] = entree
+        for mot in entree[1]:
+            i = bisect.bisect_left(self.mots, mot)
+            while i < len(self.mots) and self.mots[i] == mot and self.ids[i] < profil_id:
+                i += 1
+            self.mots.insert(i, mot)
+            self.ids.insert(i, profil_id)
+
+    def _tranche(self, prefixe):
+        return (bisect.bisect_left(self.mots, prefixe),
+                bisect.bisect_left(self.mots, prefixe + '\uffff'))
+
+    def chercher(self, q, limite, max_parcours):
+        """Profils dont chaque mot de `q` commence un mot du nom, dans l'ordre alphabétique des mots"""
+        prefixes = normaliser(q).split()
+        if not prefixes:
+            return []
+        with self._lock:
+            # Parcours de la tranche la plus étroite, les autres préfixes sont vérifiés sur le profil
+            debut, fin = min((self._tranche(prefixe) for prefixe in prefixes), key=lambda t: t[1] - t[0])
+            vus = set()
+            resultats = []
+            for i in range(debut, min(fin, debut + max_parcours)):
+                profil_id = self.ids[i]
+                if profil_id in vus:
+                    continue
+                vus.add(profil_id)
+                libelle, mots = self.profils[profil_id]
+                if all(any(mot.startswith(prefixe) for mot in mots) for prefixe in prefixes):
+                    resultats.append((profil_id, libelle))
+                    if len(resultats) >= limite:
+                        break
+        return resultats
+
+
+class Autocompletion:
+    """Index par type de profil, tenus à jour depuis le journal en cache"""
+
+    def __init__(self):
+        self.index = {type_profil: IndexPrefixes(type_profil) for type_profil in TYPES}
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def synchroniser(self):
+        """Applique les modifications publiées depuis le dernier appel (une lecture de cache)"""
+        version = cache.get(CLE_VERSION, 0)
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            if version < self.version:
+                # Cache vidé ou redémarré: journal perdu
+                self.reconstruire(version)
+                return
+            cles = [_cle_journal(v) for v in range(self.version + 1, version + 1)]
+            journal = cache.get_many(cles)
+            if len(journal) < len(cles) or any(journal[cle][0] == TOUT_RECONSTRUIRE for cle in cles):
+                self.reconstruire(version)
+                return
+            for cle in cles:
+                type_profil, profil_id, entree = journal[cle]
+                self.index[type_profil].appliquer(profil_id, entree)
+            self.version = version
+
+    def reconstruire(self, version):
+        # Index reconstruits en arrière-plan à leur prochaine utilisation
+        for index in self.index.values():
+            index.perime = True
+        self.version = version
+
+    def chercher(self, type_profil, q, limite=None):
+        config = get_config()
+        limite = max(1, min(limite or config['LIMITE'], config['LIMITE_MAX']))
+        self.synchroniser()
+        index = self.index[type_profil]
+        if not index.construit:
+            # Première utilisation dans le process: rien à servir en attendant
+            with self._lock:
+                if not index.construit:
+                    index.construire()
+        elif index.perime or (
+            # Sans cache partagé (LocMem), le journal ne voit que les écritures du process:
+            # l'âge maximal borne le retard sur les autres
+            config['AGE_MAX'] and time.monotonic() - index.construit_le >= config['AGE_MAX']
+        ):
+            self._reconstruire_en_fond(index)
+        return index.chercher(q, limite, config['MAX_PARCOURS'])
+
+    def _reconstruire_en_fond(self, index):
+        with self._lock:
+            if index.reconstruction is not None and index.reconstruction.is_alive():
+                return
+            index.perime = False
+            index.reconstruction = threading.Thread(
+                target=self._construire, args=(index,), name='rdv-autocompletion', daemon=True,
+            )
+            index.reconstruction.start()
+
+    @staticmethod
+    def _construire(index):
+        try:
+            index.construire()
+        except Exception as e:
+            index.perime = True
+            logger.error("Reconstruction de l'index d'autocomplétion %s impossible: %s", index.type_profil, e)
+        finally:
+            connection.close()
+
+
+_autocompletion = Autocompletion()
+
+
+def get_autocompletion():
+    return _autocompletion
+
+
+def _publier(message):
+    cache.add(CLE_VERSION, 0, None)
+    version = cache.incr(CLE_VERSION)
+    cache.set(_cle_journal(version), message, get_config()['JOURNAL_TIMEOUT'])
+
+
+def publier_profil(type_profil, profil, user=None, supprime=False):
+    """Profil créé, modifié ou supprimé (appelé par les signaux)"""
+    entree = None if supprime else entree_profil(type_profil, profil, user)
+    _publier((type_profil, profil.pk, entree))
+
+
+def tout_reconstruire():
+    """Après des écritures sans signaux (bulk_create de l'import CSV)"""
+    _publier((TOUT_RECONSTRUIRE, None, None))
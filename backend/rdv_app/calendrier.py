@@ -0,0 +1,158 @@
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Praticien, RendezVous
+
+STATUTS_ICS = {
+    'en_attente': 'TENTATIVE',
+    'confirme': 'CONFIRMED',
+}
+
+
+def get_config():
+    config = {
+        'DUREE_RDV': timedelta(minutes=30),
+        'JOURS_PASSES': 90,
+        'CACHE_TIMEOUT': 3600,
+    }
+    config.update(getattr(settings, 'RDV_CALENDRIER', {}))
+    return config
+
+
+def _cle(type_flux, objet_id):
+    return f'ics:{type_flux}:{objet_id}'
+
+
+def invalider(praticien_id=None, patient_id=None):
+    """Oublie les flux en cache (appelé par les signaux des rendez-vous)"""
+    cles = []
+    if praticien_id:
+        cles.append(_cle('praticien', praticien_id))
+    if patient_id:
+        cles.append(_cle('patient', patient_id))
+    if cles:
+        cache.delete_many(cles)
+
+
+def _echapper(texte):
+    return (texte.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _plier(ligne):
+    # RFC 5545: lignes de 75 octets au plus, suite préfixée d'une espace
+    donnees = ligne.encode('utf-8')
+    if len(donnees) <= 75:
+        return ligne
+    morceaux = []
+    debut = 0
+    limite = 75
+    while debut < len(donnees):
+        fin = min(debut + limite, len(donnees))
+        while fin < len(donnees) and (donnees[fin] & 0xC0) == 0x80:
+            fin -= 1  # ne pas couper un caractère UTF-8
+        morceaux.append(donnees[debut:fin].decode('utf-8'))
+        debut = fin
+        limite = 74
+    return '\r\n '.join(morceaux)
+
+
+def _date_ics(valeur):
+    return valeur.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def generer_ics(nom, evenements, maintenant=None):
+    """Calendrier iCalendar: evenements = (uid, debut, fin, modifie, statut, resume, description)"""
+    maintenant = maintenant or timezone.now()
+    lignes = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Plateforme RDV//Agenda//FR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_echapper(nom)}',
+        'X-PUBLISHED-TTL:PT1H',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+    ]
+    for uid, debut, fin, modifie, statut, resume, description in evenements:
+        lignes += [
+            'BEGIN:VEVENT',
+            f'UID:{uid}',
+            f'DTSTAMP:{_date_ics(modifie or maintenant)}',
+            f'DTSTART:{_date_ics(debut)}',
+            f'DTEND:{_date_ics(fin)}',
+            f'STATUS:{statut}',
+            f'SUMMARY:{_echapper(resume)}',
+            f'DESCRIPTION:{_echapper(description)}',
+            'END:VEVENT',
+        ]
+    lignes.append('END:VCALENDAR')
+    return ('\r\n'.join(_plier(ligne) for ligne in lignes) + '\r\n').encode('utf-8')
+
+
+def _construire(type_flux, objet):
+    config = get_config()
+    maintenant = timezone.now()
+    rdv_list = RendezVous.objects.filter(
+        statut__in=list(STATUTS_ICS),
+        date_heure__gte=maintenant - timedelta(days=config['JOURS_PASSES']),
+    ).order_by('date_heure')
+
+    if type_flux == 'praticien':
+        rdv_list = rdv_list.filter(praticien=objet)
+        nom = f'Planning - {objet.get_civilite_display()} {objet.user.get_full_name()}'
+        lignes = rdv_list.values_list(
+            'id', 'date_heure', 'date_modification', 'statut', 'motif',
+            'patient__user__first_name', 'patient__user__last_name',
+        )
+        evenements = (
+            (rdv_id, date_heure, date_modification, statut,
+             f'RDV - {prenom} {nom_patient}'.strip(), motif)
+            for rdv_id, date_heure, date_modification, statut, motif, prenom, nom_patient in lignes
+        )
+    else:
+        rdv_list = rdv_list.filter(patient=objet)
+        nom = f'Mes rendez-vous - {objet.user.get_full_name()}'
+        lignes = rdv_list.values_list(
+            'id', 'date_heure', 'date_modification', 'statut', 'motif',
+            'praticien__civilite', 'praticien__user__first_name',
+            'praticien__user__last_name', 'praticien__specialite',
+        )
+        civilites = dict(Praticien.CIVILITE_CHOICES)
+        evenements = (
+            (rdv_id, date_heure, date_modification, statut,
+             f'RDV - {civilites.get(civilite, civilite)} {prenom} {nom_praticien}'.strip(),
+             f'{specialite}\n{motif}')
+            for rdv_id, date_heure, date_modification, statut, motif,
+                civilite, prenom, nom_praticien, specialite in lignes
+        )
+
+    contenu = generer_ics(nom, (
+        (f'rdv-{rdv_id}@plateforme-rdv', date_heure, date_heure + config['DUREE_RDV'],
+         date_modification, STATUTS_ICS[statut], resume, description)
+        for rdv_id, date_heure, date_modification, statut, resume, description in evenements
+    ), maintenant)
+    return {
+        'contenu': contenu,
+        'etag': '"%s"' % hashlib.sha256(contenu).hexdigest()[:32],
+        'modifie': maintenant.replace(microsecond=0),
+    }
+
+
+def get_flux(type_flux, objet):
+    """Flux iCalendar d'un praticien ou d'un patient (contenu, etag, date de génération)
+
+    Servi depuis le cache jusqu'à la prochaine modification d'un de ses
+    rendez-vous; CACHE_TIMEOUT borne l'âge d'un flux (fenêtre glissante,
+    changement de nom).
+    """
+    cle = _cle(type_flux, objet.id)
+    flux = cache.get(cle)
+    if flux is None:
+        flux = _construire(type_flux, objet)
+        cache.set(cle, flux, get_config()['CACHE_TIMEOUT'])
+    return flux
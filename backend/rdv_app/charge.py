@@ -0,0 +1,346 @@
+import asyncio
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import HorairePraticien, Patient, RendezVous, User
+from .recherche import texte_recherche
+
+# Tests de charge par scénarios (manage.py charge_scenarios): un utilisateur virtuel enchaîne les étapes
+# d'un scénario sur sa propre connexion keep-alive, chaque étape est chronométrée sous son nom.
+# Un scénario est une coroutine `scenario(uv)`; un module (--module) peut en fournir d'autres via SCENARIOS.
+MOTIF = 'Test de charge'
+PREFIXE = 'charge_patient_'
+MOT_DE_PASSE = 'charge123'
+
+# Comptes des scénarios intégrés: patients créés par preparer(), praticiens et admin de create_sample_data
+PRATICIENS = [('dr_martin', 'praticien123'), ('dr_dupont', 'praticien123'), ('dr_bernard', 'praticien123')]
+ADMIN = ('admin', 'admin123')
+
+
+class Client:
+    """Connexion HTTP/1.1 keep-alive minimale (asyncio), suffisante pour mesurer un serveur local"""
+
+    def __init__(self, hote, port, entetes):
+        self.hote = hote
+        self.port = port
+        self.entetes = entetes
+        self.lecteur = None
+        self.ecrivain = None
+
+    async def requete(self, methode, chemin, corps=None):
+        if self.ecrivain is None:
+            self.lecteur, self.ecrivain = await asyncio.open_connection(self.hote, self.port)
+        donnees = json.dumps(corps).encode() if corps is not None else b''
+        entetes = {**self.entetes, 'Content-Length': str(len(donnees))}
+        if corps is not None:
+            entetes['Content-Type'] = 'application/json'
+        self.ecrivain.write(
+            f'{methode} {chemin} HTTP/1.1\r\n'.encode()
+            + ''.join(f'{nom}: {valeur}\r\n' for nom, valeur in entetes.items()).encode()
+            + b'\r\n' + donnees
+        )
+        await self.ecrivain.drain()
+
+        ligne = await self.lecteur.readline()
+        if not ligne:
+            raise ConnectionError('connexion fermée par le serveur')
+        statut = int(ligne.split()[1])
+        longueur, morceaux, fermer = 0, False, False
+        while True:
+            ligne = await self.lecteur.readline()
+            if ligne in (b'\r\n', b''):
+                break
+            nom, _, valeur = ligne.decode('latin-1').partition(':')
+            nom, valeur = nom.strip().lower(), valeur.strip().lower()
+            if nom == 'content-length':
+                longueur = int(valeur)
+            elif nom == 'transfer-encoding' and 'chunked' in valeur:
+                morceaux = True
+            elif nom == 'connection' and valeur == 'close':
+                fermer = True
+
+        if morceaux:
+            contenu = b''
+            while True:
+                taille = int((await self.lecteur.readline()).split(b';')[0], 16)
+                if taille == 0:
+                    await self.lecteur.readline()
+                    break
+                contenu += await self.lecteur.readexactly(taille + 2)
+        else:
+            contenu = await self.lecteur.readexactly(longueur)
+        if fermer:
+            self.fermer()
+        return statut, contenu
+
+    def fermer(self):
+        if self.ecrivain is not None:
+            self.ecrivain.close()
+        self.lecteur = self.ecrivain = None
+
+
+def percentile(valeurs, p):
+    if not valeurs:
+        return 0
+    return valeurs[min(len(valeurs) - 1, int(len(valeurs) * p))]
+
+
+class EtapeEchouee(Exception):
+    """Réponse inattendue: le reste de l'itération du scénario est abandonné"""
+
+    def __init__(self, etape, statut):
+        super().__init__(f'{etape}: {statut}')
+        self.statut = statut
+
+
+class Statistiques:
+    """Latences (réussites) et erreurs par étape"""
+
+    def __init__(self):
+        self.latences = {}
+        self.erreurs = {}
+        self.statuts = {}
+        self.iterations = {}
+
+    def ajouter(self, etape, duree, statut, ok):
+        self.latences.setdefault(etape, [])
+        self.erreurs.setdefault(etape, 0)
+        if ok:
+            self.latences[etape].append(duree)
+        else:
+            self.erreurs[etape] += 1
+            statuts = self.statuts.setdefault(etape, {})
+            statuts[str(statut)] = statuts.get(str(statut), 0) + 1
+
+    def resultats(self, duree):
+        etapes = {}
+        for etape, latences in self.latences.items():
+            valeurs = sorted(latences)
+            erreurs = self.erreurs[etape]
+            total = len(valeurs) + erreurs
+            etapes[etape] = {
+                'requetes': total,
+                'erreurs': erreurs,
+                'taux_erreur': erreurs / total if total else 0,
+                'statuts_erreur': self.statuts.get(etape, {}),
+                'debit': len(valeurs) / duree,
+                'p50_ms': percentile(valeurs, 0.5) * 1000,
+                'p90_ms': percentile(valeurs, 0.9) * 1000,
+                'p95_ms': percentile(valeurs, 0.95) * 1000,
+                'p99_ms': percentile(valeurs, 0.99) * 1000,
+                'max_ms': (valeurs[-1] if valeurs else 0) * 1000,
+            }
+        requetes = sum(etape['requetes'] for etape in etapes.values())
+        erreurs = sum(etape['erreurs'] for etape in etapes.values())
+        return {
+            'duree': duree,
+            'requetes': requetes,
+            'erreurs': erreurs,
+            'taux_erreur': erreurs / requetes if requetes else 0,
+            'debit': (requetes - erreurs) / duree,
+            'iterations': self.iterations,
+            'etapes': etapes,
+        }
+
+
+class UtilisateurVirtuel:
+    """Client HTTP d'un utilisateur simulé: session (jeton), pauses et mesure des étapes"""
+
+    def __init__(self, numero, hote, port, entetes, statistiques, pause=0, graine=None):
+        self.numero = numero
+        self.client = Client(hote, port, dict(entetes))
+        self.statistiques = statistiques
+        self.pause_moyenne = pause
+        self.aleatoire = random.Random(None if graine is None else graine + numero)
+        self.utilisateur = None     # réponse de /api/auth/login/ (profil, rôle)
+
+    async def etape(self, nom, methode, chemin, corps=None, attendu=(200, 201)):
+        """Requête chronométrée sous `nom`; retourne le JSON de la réponse"""
+        debut = time.perf_counter()
+        try:
+            statut, contenu = await self.client.requete(methode, chemin, corps)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+            self.client.fermer()
+            statut, contenu = 0, b''
+        ok = statut in attendu
+        self.statistiques.ajouter(nom, time.perf_counter() - debut, statut, ok)
+        if not ok:
+            raise EtapeEchouee(nom, statut)
+        return json.loads(contenu) if contenu else None
+
+    async def connecter(self, username, password):
+        """Connexion au premier passage (étape 'connexion'), le jeton sert ensuite à toute la session"""
+        if self.utilisateur is not None:
+            return self.utilisateur
+        self.client.entetes.pop('Authorization', None)
+        reponse = await self.etape('connexion', 'POST', '/api/auth/login/', {
+            'username': username, 'password': password,
+        })
+        self.client.entetes['Authorization'] = f"Bearer {reponse['token']}"
+        self.utilisateur = reponse['user']
+        return self.utilisateur
+
+    async def pause(self):
+        """Temps de réflexion entre deux étapes (loi exponentielle autour de la moyenne)"""
+        if self.pause_moyenne:
+            await asyncio.sleep(self.aleatoire.expovariate(1 / self.pause_moyenne))
+
+    def fermer(self):
+        self.client.fermer()
+
+
+def _jour_ouvre(aleatoire, jours=60):
+    jour = date.today() + timedelta(days=aleatoire.randint(1, jours))
+    while jour.weekday() >= 5:
+        jour += timedelta(days=1)
+    return jour
+
+
+async def scenario_patient(uv):
+    """Connexion -> recherche d'un praticien -> créneaux -> réservation -> mes rendez-vous"""
+    utilisateur = await uv.connecter(f'{PREFIXE}{uv.numero}', MOT_DE_PASSE)
+    await uv.pause()
+    q = uv.aleatoire.choice(['mar', 'dup', 'ber', 'card', 'ped', 'gen'])
+    suggestions = await uv.etape('recherche_praticien', 'GET', f'/api/autocomplete/?type=praticien&q={q}')
+    if not suggestions:
+        return
+    praticien_id = uv.aleatoire.choice(suggestions)['id']
+    await uv.pause()
+    jour = _jour_ouvre(uv.aleatoire)
+    reponse = await uv.etape('creneaux', 'GET', f'/api/async/praticiens/{praticien_id}/creneaux/?date={jour}')
+    await uv.pause()
+    if reponse['creneaux']:
+        await uv.etape('reservation', 'POST', '/api/rendez-vous/', {
+            'praticien_id': praticien_id,
+            'patient_id': utilisateur['patient_profile']['id'],
+            'date_heure': f"{jour}T{uv.aleatoire.choice(reponse['creneaux'])}:00",
+            'motif': MOTIF,
+        })
+        await uv.pause()
+    await uv.etape('mes_rendez_vous', 'GET', f"/api/rendez-vous/?patient_id={utilisateur['patient_profile']['id']}")
+
+
+async def scenario_praticien(uv):
+    """Connexion -> rendez-vous en attente -> confirmation -> planning du mois"""
+    username, password = PRATICIENS[uv.numero % len(PRATICIENS)]
+    utilisateur = await uv.connecter(username, password)
+    praticien_id = utilisateur['praticien_profile']['id']
+    await uv.pause()
+    reponse = await uv.etape(
+        'rdv_en_attente', 'GET', f'/api/rendez-vous/?praticien_id={praticien_id}&statut=en_attente'
+    )
+    if reponse['results']:
+        await uv.pause()
+        rdv = uv.aleatoire.choice(reponse['results'])
+        await uv.etape('confirmation', 'POST', f"/api/rendez-vous/{rdv['id']}/confirmer/")
+    await uv.pause()
+    await uv.etape('planning', 'GET', f'/api/async/rendez-vous/calendrier/?praticien_id={praticien_id}')
+
+
+async def scenario_admin(uv):
+    """Connexion -> statistiques -> tableau de bord -> carte de chaleur"""
+    await uv.connecter(*ADMIN)
+    await uv.pause()
+    await uv.etape('statistiques', 'GET', '/api/statistiques/')
+    await uv.pause()
+    await uv.etape('tableau_de_bord', 'GET', '/api/async/dashboard/')
+    await uv.pause()
+    await uv.etape('heatmap', 'GET', '/api/statistiques/heatmap/')
+
+
+SCENARIOS = {
+    'patient': scenario_patient,
+    'praticien': scenario_praticien,
+    'admin': scenario_admin,
+}
+
+
+async def executer(scenarios, hote, port, entetes, utilisateurs, duree, montee=0, pause=0, graine=None):
+    """`scenarios`: [(nom, poids, coroutine)]; chaque utilisateur virtuel garde son scénario
+
+    Les utilisateurs démarrent répartis sur `montee` secondes puis bouclent jusqu'à la fin.
+    """
+    statistiques = Statistiques()
+    noms = [nom for nom, _, _ in scenarios]
+    poids = [poids for _, poids, _ in scenarios]
+    fonctions = {nom: fonction for nom, _, fonction in scenarios}
+    tirage = random.Random(graine)
+    attributions = tirage.choices(noms, weights=poids, k=utilisateurs)
+    debut = time.perf_counter()
+    fin = debut + duree
+
+    async def utilisateur_virtuel(numero, nom):
+        await asyncio.sleep(montee * numero / max(utilisateurs, 1))
+        uv = UtilisateurVirtuel(numero, hote, port, entetes, statistiques, pause, graine)
+        try:
+            while time.perf_counter() < fin:
+                try:
+                    await fonctions[nom](uv)
+                except EtapeEchouee as e:
+                    if e.statut == 401:
+                        uv.utilisateur = None  # jeton expiré: nouvelle connexion
+                    await asyncio.sleep(0.1)  # pas de rafale d'échecs contre un serveur saturé
+                    continue
+                statistiques.iterations[nom] = statistiques.iterations.get(nom, 0) + 1
+        finally:
+            uv.fermer()
+
+    await asyncio.gather(*(utilisateur_virtuel(i, nom) for i, nom in enumerate(attributions)))
+    resultats = statistiques.resultats(time.perf_counter() - debut)
+    resultats['utilisateurs'] = {nom: attributions.count(nom) for nom in noms}
+    return resultats
+
+
+def preparer(patients):
+    """Jeu de données synthétique: `patients` comptes charge_patient_<n> (mot de passe charge123)
+
+    Les praticiens, leurs horaires et l'admin viennent de create_sample_data.
+    """
+    manquants = [u for u, _ in PRATICIENS + [ADMIN] if not User.objects.filter(username=u).exists()]
+    if manquants or not HorairePraticien.objects.exists():
+        raise ValueError(f"Données de base absentes ({', '.join(manquants) or 'horaires'}): "
+                         "lancer manage.py create_sample_data")
+    existants = set(User.objects.filter(username__startswith=PREFIXE).values_list('username', flat=True))
+    mot_de_passe = make_password(MOT_DE_PASSE)
+    users = [
+        User(username=f'{PREFIXE}{i}', email=f'{PREFIXE}{i}@example.com', first_name='Charge',
+             last_name=f'Patient{i}', role='patient', password=mot_de_passe)
+        for i in range(patients) if f'{PREFIXE}{i}' not in existants
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=1000)
+        profils = [
+            Patient(user=user, telephone='0600000000', adresse='-', date_naissance='1980-01-01')
+            for user in users
+        ]
+        for profil in profils:
+            profil.recherche = texte_recherche(profil)
+        Patient.objects.bulk_create(profils, batch_size=1000)
+    return len(users)
+
+
+def nettoyer():
+    """Supprime les rendez-vous pris pendant les tests et les comptes charge_patient_*"""
+    rdv, _ = RendezVous.objects.filter(motif=MOTIF).delete()
+    comptes, _ = User.objects.filter(username__startswith=PREFIXE).delete()
+    return rdv, comptes
+
+
+def comparer(precedent, actuel):
+    """Écarts par étape entre deux résultats JSON (p50, p95, débit, taux d'erreur)"""
+    ecarts = {}
+    for etape, mesure in actuel['etapes'].items():
+        avant = precedent.get('etapes', {}).get(etape)
+        if avant is None:
+            continue
+        ecarts[etape] = {
+            cle: {'avant': avant[cle], 'apres': mesure[cle],
+                  'variation': (mesure[cle] - avant[cle]) / avant[cle] if avant[cle] else None}
+            for cle in ('p50_ms', 'p95_ms', 'debit', 'taux_erreur')
+        }
+    return ecarts
@@ -0,0 +1,220 @@
+import asyncio
+import collections
+import json
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('rdv_app')
+
+CANAL_POSTGRES = 'rdv_evenements'
+
+
+def get_config():
+    config = {
+        'BACKEND': 'rdv_app.evenements.BusMemoire',
+        'TAILLE_HISTORIQUE': 1000,
+        'TAILLE_FILE': 100,
+        'HEARTBEAT': 15,
+    }
+    config.update(getattr(settings, 'RDV_EVENEMENTS', {}))
+    return config
+
+
+class Evenement:
+    """Changement d'un rendez-vous, diffusé aux portées concernées"""
+    __slots__ = ['id', 'type', 'portees', 'donnees']
+
+    def __init__(self, id, type, portees, donnees):
+        self.id = id
+        self.type = type
+        self.portees = portees
+        self.donnees = donnees
+
+    def vers_json(self):
+        return json.dumps({'id': self.id, 'type': self.type, 'portees': self.portees, 'donnees': self.donnees})
+
+    @classmethod
+    def depuis_json(cls, texte):
+        valeurs = json.loads(texte)
+        return cls(valeurs['id'], valeurs['type'], valeurs['portees'], valeurs['donnees'])
+
+    def format_sse(self):
+        return f'id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.donnees)}\n\n'
+
+
+class Abonnement:
+    """File bornée d'un client SSE; au-delà, le client est marqué en retard et doit resynchroniser"""
+
+    def __init__(self, portee, taille_file):
+        self.portee = portee
+        self.loop = asyncio.get_running_loop()
+        self.file = asyncio.Queue(maxsize=taille_file)
+        self.deborde = False
+
+    def _deposer(self, evenement):
+        try:
+            self.file.put_nowait(evenement)
+        except asyncio.QueueFull:
+            self.deborde = True
+
+    def deposer(self, evenement):
+        # Appelé depuis n'importe quel thread (signaux, écouteur PostgreSQL)
+        self.loop.call_soon_threadsafe(self._deposer, evenement)
+
+
+class BusMemoire:
+    """Pub/sub dans le process: historique borné (reprise par Last-Event-ID) et abonnés par portée"""
+
+    def __init__(self, taille_historique=1000, taille_file=100):
+        self.taille_file = taille_file
+        self.historique = collections.deque(maxlen=taille_historique)
+        self.abonnes = collections.defaultdict(set)
+        self._dernier_id = 0
+        self._lock = threading.Lock()
+        self.demarrage = self.nouvel_id()
+
+    def nouvel_id(self):
+        # Appelé sous self._lock (ou à la construction): strictement croissant dans le process,
+        # proche des microsecondes pour rester comparable après un redémarrage
+        self._dernier_id = max(self._dernier_id + 1, int(time.time() * 1_000_000))
+        return self._dernier_id
+
+    def publier(self, type_evenement, portees, donnees):
+        self.diffuser(Evenement(None, type_evenement, portees, donnees))
+
+    def diffuser(self, evenement):
+        """Numérote l'événement à sa réception et le remet aux abonnés, dans l'ordre des ids"""
+        with self._lock:
+            evenement.id = self.nouvel_id()
+            self.historique.append(evenement)
+            for portee in evenement.portees:
+                for abonne in self.abonnes.get(portee, ()):
+                    abonne.deposer(evenement)
+
+    def abonner(self, portee):
+        abonnement = Abonnement(portee, self.taille_file)
+        with self._lock:
+            self.abonnes[portee].add(abonnement)
+        return abonnement
+
+    def desabonner(self, abonnement):
+        with self._lock:
+            abonnes = self.abonnes.get(abonnement.portee)
+            if abonnes is not None:
+                abonnes.discard(abonnement)
+                if not abonnes:
+                    del self.abonnes[abonnement.portee]
+
+    def depuis(self, portee, dernier_id):
+        """Événements manqués depuis `dernier_id`, ou None si l'historique ne remonte plus assez loin"""
+        with self._lock:
+            # Historique plein: les plus anciens sont perdus; sinon il couvre tout depuis le démarrage
+            premier = self.historique[0].id if len(self.historique) == self.historique.maxlen else self.demarrage
+            if dernier_id < premier:
+                return None
+            return [e for e in self.historique if e.id > dernier_id and portee in e.portees]
+
+
+class BusPostgres(BusMemoire):
+    """Bus partagé entre process via LISTEN/NOTIFY de PostgreSQL
+
+    La publication passe par pg_notify (livrée au commit); un thread par
+    process écoute le canal et diffuse aux abonnés locaux. Les ids sont
+    attribués à la réception, dans l'ordre des commits: jamais d'horloges de
+    process différents à comparer.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._ecouteur = None
+        self._ecoute = threading.Event()
+
+    def _ecoute_demarree(self):
+        # Les notifications d'avant LISTEN (ou d'une coupure) sont perdues: l'historique
+        # ne couvre qu'à partir d'ici, les reprises plus anciennes resynchronisent
+        with self._lock:
+            self.demarrage = self.nouvel_id()
+            self.historique.clear()
+        self._ecoute.set()
+
+    def publier(self, type_evenement, portees, donnees):
+        evenement = Evenement(None, type_evenement, portees, donnees)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [CANAL_POSTGRES, evenement.vers_json()])
+
+    def abonner(self, portee):
+        self._demarrer()
+        return super().abonner(portee)
+
+    def depuis(self, portee, dernier_id):
+        if not self._ecoute.is_set():
+            # Écoute pas encore établie: rien ne garantit l'historique
+            return None
+        return super().depuis(portee, dernier_id)
+
+    def _demarrer(self):
+        with self._lock:
+            if self._ecouteur is not None and self._ecouteur.is_alive():
+                return
+            self._ecouteur = threading.Thread(target=self._ecouter, name='rdv-evenements', daemon=True)
+            self._ecouteur.start()
+
+    def _ecouter(self):
+        import psycopg
+
+        while True:
+            try:
+                parametres = connection.get_connection_params()
+                for cle in ('cursor_factory', 'context', 'server_side_binding'):
+                    parametres.pop(cle, None)
+                with psycopg.connect(**parametres, autocommit=True) as cnx:
+                    cnx.execute(f'LISTEN {CANAL_POSTGRES}')
+                    self._ecoute_demarree()
+                    for notification in cnx.notifies():
+                        self.diffuser(Evenement.depuis_json(notification.payload))
+            except Exception as e:
+                self._ecoute.clear()
+                logger.error("Écoute des événements interrompue: %s", e)
+                time.sleep(1)
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_bus():
+    """Bus d'événements configuré dans RDV_EVENEMENTS (un par process)"""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                config = get_config()
+                _bus = import_string(config['BACKEND'])(
+                    taille_historique=config['TAILLE_HISTORIQUE'],
+                    taille_file=config['TAILLE_FILE'],
+                )
+    return _bus
+
+
+def portees_rdv(praticien_id, patient_id):
+    return [f'praticien:{praticien_id}', f'patient:{patient_id}', 'admin']
+
+
+def publier_rdv(type_evenement, rdv):
+    """Publie le changement d'un rendez-vous pour son praticien, son patient et les admins"""
+    try:
+        get_bus().publier(type_evenement, portees_rdv(rdv.praticien_id, rdv.patient_id), {
+            'rdv_id': rdv.id,
+            'praticien_id': rdv.praticien_id,
+            'patient_id': rdv.patient_id,
+            'date_heure': rdv.date_heure.isoformat() if rdv.date_heure else None,
+            'statut': rdv.statut,
+        })
+    except Exception as e:
+        # Les écrans se resynchronisent à la reconnexion: ne jamais bloquer une écriture
+        logger.error("Publication de l'événement %s impossible: %s", type_evenement, e)
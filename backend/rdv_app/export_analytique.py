@@ -0,0 +1,135 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import RendezVous
+from .utils import requetes_longues
+
+FORMATS = {
+    'parquet': ('parquet', 'application/vnd.apache.parquet'),
+    'arrow': ('arrow', 'application/vnd.apache.arrow.file'),
+}
+
+TAILLE_GROUPE = 50000
+
+# Tranches d'âge au moment du rendez-vous (borne basse incluse)
+TRANCHES_AGE = [(75, '75+'), (60, '60-74'), (45, '45-59'), (30, '30-44'), (18, '18-29'), (0, '0-17')]
+
+# Pas d'identifiant de patient: même opaque, un id stable relie toutes les visites d'une
+# personne (données pseudonymisées, pas anonymes); le patient n'est décrit que par des catégories
+CHAMPS = [
+    'id', 'date_heure', 'date_creation', 'statut',
+    'praticien_id', 'praticien__specialite',
+    'patient__civilite', 'patient__date_naissance',
+]
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImproperlyConfigured("L'export analytique nécessite pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def get_schema(dictionnaires=True):
+    """Schéma des colonnes exportées (pas de nom, d'adresse ni de contact)
+
+    Les colonnes texte répétitives sont encodées en dictionnaire; le format
+    fichier Arrow n'accepte qu'un dictionnaire par colonne pour tout le fichier,
+    il les reçoit donc en texte simple (compressées en zstd).
+    """
+    pa = _pyarrow()
+    chaine = pa.dictionary(pa.int16(), pa.string()) if dictionnaires else pa.string()
+    return pa.schema([
+        ('id', pa.int64()),
+        ('date_heure', pa.timestamp('us', tz='UTC')),
+        ('date_creation', pa.timestamp('us', tz='UTC')),
+        ('jour_semaine', pa.int8()),
+        ('heure', pa.int8()),
+        ('delai_reservation_jours', pa.int32()),
+        ('statut', chaine),
+        ('praticien_id', pa.int64()),
+        ('specialite', chaine),
+        ('patient_civilite', chaine),
+        ('patient_tranche_age', chaine),
+    ])
+
+
+def tranche_age(date_naissance, date_rdv):
+    age = date_rdv.year - date_naissance.year - (
+        (date_rdv.month, date_rdv.day) < (date_naissance.month, date_naissance.day)
+    )
+    for borne, libelle in TRANCHES_AGE:
+        if age >= borne:
+            return libelle
+    return TRANCHES_AGE[-1][1]
+
+
+def _groupe(schema, lignes):
+    pa = _pyarrow()
+    colonnes = {nom: [] for nom in schema.names}
+    for (rdv_id, date_heure, date_creation, statut, praticien_id, specialite,
+         civilite, date_naissance) in lignes:
+        locale = timezone.localtime(date_heure)
+        colonnes['id'].append(rdv_id)
+        colonnes['date_heure'].append(date_heure.astimezone(dt_timezone.utc))
+        colonnes['date_creation'].append(date_creation.astimezone(dt_timezone.utc))
+        colonnes['jour_semaine'].append(locale.isoweekday())
+        colonnes['heure'].append(locale.hour)
+        colonnes['delai_reservation_jours'].append((date_heure - date_creation).days)
+        colonnes['statut'].append(statut)
+        colonnes['praticien_id'].append(praticien_id)
+        colonnes['specialite'].append(specialite)
+        colonnes['patient_civilite'].append(civilite)
+        colonnes['patient_tranche_age'].append(tranche_age(date_naissance, locale.date()))
+    return pa.Table.from_pydict(colonnes, schema=schema)
+
+
+def exporter_rendez_vous(destination, format_export='parquet', date_debut=None, date_fin=None,
+                         taille_groupe=TAILLE_GROUPE):
+    """Écrit l'historique des rendez-vous en Parquet ou Arrow IPC
+
+    Les lignes sont lues par un curseur serveur (iterator) et écrites par
+    groupes de `taille_groupe`: la mémoire reste bornée quelle que soit la
+    période exportée. `date_debut`/`date_fin` (date) incluses, jours entiers.
+    Retourne le nombre de lignes écrites.
+    """
+    if format_export not in FORMATS:
+        raise ValueError(f"Format non supporté: {format_export}")
+    pa = _pyarrow()
+    schema = get_schema(dictionnaires=format_export == 'parquet')
+
+    rdv_list = RendezVous.objects.all()
+    if date_debut:
+        rdv_list = rdv_list.filter(date_heure__gte=timezone.make_aware(datetime.combine(date_debut, time.min)))
+    if date_fin:
+        rdv_list = rdv_list.filter(
+            date_heure__lt=timezone.make_aware(datetime.combine(date_fin + timedelta(days=1), time.min))
+        )
+    requete = rdv_list.order_by('id').values_list(*CHAMPS)
+
+    if format_export == 'parquet':
+        writer = pa.parquet.ParquetWriter(destination, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(destination, schema, options=pa.ipc.IpcWriteOptions(compression='zstd'))
+
+    total = 0
+    try:
+        groupe = []
+        with requetes_longues(requete.db):
+            for ligne in requete.iterator(chunk_size=min(taille_groupe, 10000)):
+                groupe.append(ligne)
+                if len(groupe) >= taille_groupe:
+                    writer.write_table(_groupe(schema, groupe))
+                    total += len(groupe)
+                    groupe = []
+        if groupe or not total:
+            writer.write_table(_groupe(schema, groupe))
+            total += len(groupe)
+    finally:
+        writer.close()
+    return total
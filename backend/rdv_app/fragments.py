@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .routers import lecture_primaire
+
+# Compteurs de version par praticien, par patient et pour les vues globales (tableau de bord admin).
+# Une clé de fragment contient les versions dont il dépend: incrémenter une version rend ses
+# fragments introuvables (ils expirent ensuite), sans avoir à connaître leurs clés.
+GLOBAL = 'global'
+
+
+def get_config():
+    config = {
+        'TIMEOUT': 300,     # 0 désactive le cache des fragments
+    }
+    config.update(getattr(settings, 'RDV_FRAGMENTS', {}))
+    return config
+
+
+def _cle_version(portee, objet_id=None):
+    return f'version:{portee}' if objet_id is None else f'version:{portee}:{objet_id}'
+
+
+def versions(praticien_id=None, patient_id=None, globale=False):
+    """{'praticien': n, 'patient': n, 'global': n} pour les portées demandées (une lecture de cache)"""
+    cles = {}
+    if praticien_id:
+        cles['praticien'] = _cle_version('praticien', praticien_id)
+    if patient_id:
+        cles['patient'] = _cle_version('patient', patient_id)
+    if globale:
+        cles[GLOBAL] = _cle_version(GLOBAL)
+    trouvees = cache.get_many(cles.values())
+    resultat = {}
+    for portee, cle in cles.items():
+        if cle not in trouvees:
+            # Départ à l'horodatage: un compteur évincé puis recréé ne retombe pas sur d'anciennes clés
+            cache.add(cle, int(time.time() * 1000), None)
+            trouvees[cle] = cache.get(cle)
+        resultat[portee] = trouvees[cle]
+    return resultat
+
+
+def _incrementer(cle):
+    try:
+        cache.incr(cle)
+    except ValueError:
+        cache.add(cle, int(time.time() * 1000), None)
+
+
+def invalider(praticien_id=None, patient_id=None, globale=False):
+    """Périme les fragments d'un praticien, d'un patient et/ou globaux (appelé par les signaux)"""
+    if praticien_id:
+        _incrementer(_cle_version('praticien', praticien_id))
+    if patient_id:
+        _incrementer(_cle_version('patient', patient_id))
+    if globale:
+        _incrementer(_cle_version(GLOBAL))
+
+
+def fragment(nom, calcul, role, praticien_id=None, patient_id=None, globale=False, cles=()):
+    """Valeur de `calcul()` en cache, par rôle et par version des données dont elle dépend
+
+    `cles`: autres éléments de la clé (date affichée...). `calcul` retourne des données
+    évaluées (list(queryset)), un queryset en cache serait réexécuté à chaque rendu.
+    """
+    timeout = get_config()['TIMEOUT']
+    if not timeout:
+        return calcul()
+    ids = {'praticien': praticien_id, 'patient': patient_id, GLOBAL: ''}
+    parties = [f'{portee}{ids[portee]}v{version}' for portee, version in
+               sorted(versions(praticien_id, patient_id, globale).items())]
+    cle = ':'.join(['fragment', nom, role, *map(str, cles), *parties])
+    valeur = cache.get(cle)
+    if valeur is None:
+        # Calcul sur le primaire: une réplique en retard sur la version de la clé
+        # mettrait en cache des données déjà périmées, pour tout le TIMEOUT
+        with lecture_primaire():
+            valeur = calcul()
+        cache.set(cle, valeur, timeout)
+    return valeur
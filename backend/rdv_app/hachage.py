@@ -0,0 +1,13 @@
+from django.contrib.auth.hashers import make_password
+
+# Fonctions exécutées dans les processus de hachage de rdv_app.import_csv. Lancés en spawn, ils
+# importent ce module avant django.setup(): aucun import de modèle ici.
+
+
+def initialiser_processus():
+    import django
+    django.setup()
+
+
+def hacher(mots_de_passe):
+    return [make_password(mot_de_passe) for mot_de_passe in mots_de_passe]
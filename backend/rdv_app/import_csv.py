@@ -0,0 +1,195 @@
+import csv
+import logging
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+
+from .autocompletion import tout_reconstruire
+from .hachage import hacher, initialiser_processus
+from .models import Patient, Praticien, User
+from .recherche import texte_recherche
+from .serializers import PatientImportSerializer, PraticienImportSerializer
+
+logger = logging.getLogger('rdv_app')
+
+TYPES = {
+    'patient': (Patient, PatientImportSerializer),
+    'praticien': (Praticien, PraticienImportSerializer),
+}
+CHAMPS_USER = ['username', 'email', 'first_name', 'last_name']
+
+# 'a_definir': mot de passe inutilisable, à définir par l'utilisateur ou un admin (rapide);
+# 'csv': colonne password hachée (PBKDF2, ~0,4 s par compte et par cœur)
+MOTS_DE_PASSE = ['a_definir', 'csv']
+
+
+def get_config():
+    config = {
+        'TAILLE_LOT': 1000,
+        'WORKERS': None,    # processus de hachage, None = nombre de cœurs
+    }
+    config.update(getattr(settings, 'RDV_IMPORT', {}))
+    return config
+
+
+class Import:
+    """Import en flux d'un CSV de comptes: validation ligne à ligne, unicité contre les
+    usernames/emails préchargés, insertion par lots (bulk_create) et rapport d'erreurs"""
+
+    def __init__(self, type_compte, mots_de_passe='a_definir', taille_lot=None, workers=None, simulation=False):
+        if type_compte not in TYPES:
+            raise ValueError(f"Type inconnu: {type_compte} ({', '.join(TYPES)})")
+        if mots_de_passe not in MOTS_DE_PASSE:
+            raise ValueError(f"Mode de mot de passe inconnu: {mots_de_passe} ({', '.join(MOTS_DE_PASSE)})")
+        config = get_config()
+        self.type_compte = type_compte
+        self.modele, self.serializer_class = TYPES[type_compte]
+        self.mots_de_passe = mots_de_passe
+        self.taille_lot = taille_lot or config['TAILLE_LOT']
+        self.workers = workers or config['WORKERS'] or os.cpu_count()
+        self.simulation = simulation
+        # Une seule instance: instancier un serializer par ligne copie tous ses champs
+        self.serializer = self.serializer_class()
+        self.crees = 0
+        self.lues = 0
+        self.erreurs = []
+
+    def verifier_entete(self, colonnes):
+        requises = [nom for nom, champ in self.serializer.fields.items() if champ.required]
+        if self.mots_de_passe == 'csv':
+            requises.append('password')
+        manquantes = [nom for nom in requises if nom not in (colonnes or [])]
+        if manquantes:
+            raise ValueError(f"Colonnes manquantes: {', '.join(manquantes)}")
+
+    def executer(self, fichier):
+        """`fichier`: flux texte CSV (en-tête sur la première ligne)"""
+        lecteur = csv.DictReader(fichier)
+        self.verifier_entete(lecteur.fieldnames)
+
+        # Unicité vérifiée en mémoire: deux requêtes au lieu de deux par ligne
+        usernames = set(User.objects.values_list('username', flat=True).iterator(chunk_size=10000))
+        emails = set(User.objects.values_list('email', flat=True).iterator(chunk_size=10000))
+
+        pool = None
+        if self.mots_de_passe == 'csv' and not self.simulation:
+            # spawn et non fork: un fork depuis un serveur multithread (ou pendant que le log
+            # writer tient un verrou) copierait des verrous pris et des connexions ouvertes
+            pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=initialiser_processus,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        try:
+            lot = []
+            for ligne in lecteur:
+                self.lues += 1
+                donnees = self.valider(lecteur.line_num, ligne, usernames, emails)
+                if donnees is None:
+                    continue
+                usernames.add(donnees['username'])
+                emails.add(donnees['email'])
+                lot.append((lecteur.line_num, donnees))
+                if len(lot) >= self.taille_lot:
+                    self.inserer(lot, pool)
+                    lot = []
+            if lot:
+                self.inserer(lot, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if self.crees and not self.simulation:
+            # bulk_create n'envoie pas les signaux qui tiennent l'autocomplétion à jour
+            tout_reconstruire()
+        return self.rapport()
+
+    def valider(self, numero, ligne, usernames, emails):
+        if None in ligne:
+            self.erreurs.append({'ligne': numero, 'champ': '', 'message': 'Trop de colonnes'})
+            return None
+        try:
+            donnees = self.serializer.run_validation({cle: valeur for cle, valeur in ligne.items() if valeur != ''})
+        except ValidationError as e:
+            for champ, messages in e.detail.items():
+                self.erreurs.append({'ligne': numero, 'champ': champ, 'message': ' '.join(map(str, messages))})
+            return None
+        if donnees['username'] in usernames:
+            self.erreurs.append({'ligne': numero, 'champ': 'username', 'message': "Ce nom d'utilisateur existe déjà"})
+            return None
+        if donnees['email'] in emails:
+            self.erreurs.append({'ligne': numero, 'champ': 'email', 'message': 'Cet email existe déjà'})
+            return None
+        return donnees
+
+    def inserer(self, lot, pool):
+        """`lot`: liste de (numéro de ligne, données validées)"""
+        if self.simulation:
+            self.crees += len(lot)
+            return
+        numeros = [numero for numero, _ in lot]
+        lot = [donnees for _, donnees in lot]
+
+        if pool is not None:
+            # Hachage réparti sur les processus, par paquets pour limiter les échanges
+            paquets = [
+                [donnees.get('password') or None for donnees in lot[i:i + 50]]
+                for i in range(0, len(lot), 50)
+            ]
+            hashes = [h for paquet in pool.map(hacher, paquets) for h in paquet]
+        else:
+            # Mot de passe inutilisable ("!...", comme make_password(None) mais sans tirer
+            # 40 caractères un par un): à définir avant la première connexion
+            hashes = [UNUSABLE_PASSWORD_PREFIX + secrets.token_urlsafe(30) for _ in lot]
+
+        users = []
+        for donnees, hash_mdp in zip(lot, hashes):
+            users.append(User(
+                **{champ: donnees[champ] for champ in CHAMPS_USER},
+                role=self.type_compte,
+                password=hash_mdp,
+            ))
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create(users, batch_size=self.taille_lot)
+                profils = [
+                    self.modele(user=user, **{
+                        champ: valeur for champ, valeur in donnees.items()
+                        if champ not in CHAMPS_USER and champ != 'password'
+                    })
+                    for user, donnees in zip(users, lot)
+                ]
+                for profil in profils:
+                    # bulk_create n'envoie pas pre_save: colonne de recherche calculée ici
+                    profil.recherche = texte_recherche(profil)
+                self.modele.objects.bulk_create(profils, batch_size=self.taille_lot)
+        except IntegrityError as e:
+            # Compte créé entre le préchargement des usernames/emails et l'insertion:
+            # le lot est annulé et signalé, les suivants continuent
+            logger.warning("Import %s: lot des lignes %s à %s refusé (%s)", self.type_compte, numeros[0], numeros[-1], e)
+            self.erreurs.extend(
+                {'ligne': numero, 'champ': '', 'message': f'Lot refusé par la base: {e}'}
+                for numero in numeros
+            )
+            return
+        self.crees += len(lot)
+        logger.debug("Import %s: %s comptes créés", self.type_compte, self.crees)
+
+    def rapport(self):
+        return {
+            'type': self.type_compte,
+            'simulation': self.simulation,
+            'lues': self.lues,
+            'crees': self.crees,
+            'erreurs': self.erreurs,
+        }
+
+
+def ecrire_rapport_csv(erreurs, fichier):
+    ecrivain = csv.DictWriter(fichier, fieldnames=['ligne', 'champ', 'message'])
+    ecrivain.writeheader()
+    ecrivain.writerows(erreurs)
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Log
+
+DEFAULTS = {
+    'JOURS': 90,          # âge au-delà duquel les logs sont archivés
+    'BATCH_SIZE': 1000,   # logs déplacés par transaction
+    'ARCHIVE_DIR': None,  # par défaut: BASE_DIR / 'archives' / 'logs'
+}
+
+CHAMPS = ['id', 'date', 'user_id', 'user__username', 'action', 'details', 'table_cible', 'cible_id', 'ip_address']
+
+
+def get_config():
+    """Configuration RDV_LOG_RETENTION fusionnée avec les valeurs par défaut"""
+    config = {**DEFAULTS, **getattr(settings, 'RDV_LOG_RETENTION', {})}
+    if not config['ARCHIVE_DIR']:
+        config['ARCHIVE_DIR'] = Path(settings.BASE_DIR) / 'archives' / 'logs'
+    config['ARCHIVE_DIR'] = Path(config['ARCHIVE_DIR'])
+    return config
+
+
+def chemin_partition(archive_dir, jour):
+    """Fichier d'archive d'un jour: <dir>/AAAA/MM/logs-AAAA-MM-JJ.jsonl.gz"""
+    return Path(archive_dir) / f'{jour:%Y}' / f'{jour:%m}' / f'logs-{jour:%Y-%m-%d}.jsonl.gz'
+
+
+def _serialiser(entree):
+    entree = dict(entree)
+    entree['user'] = entree.pop('user__username')
+    entree['date'] = entree['date'].isoformat()
+    return entree
+
+
+def archiver_logs(jours=None, batch_size=None, archive_dir=None):
+    """Déplace les logs plus vieux que `jours` vers les archives gzip, par lots"""
+    config = get_config()
+    jours = config['JOURS'] if jours is None else jours
+    batch_size = batch_size or config['BATCH_SIZE']
+    archive_dir = Path(archive_dir or config['ARCHIVE_DIR'])
+    limite = timezone.now() - timedelta(days=jours)
+
+    total = 0
+    dernier_id = 0
+    while True:
+        lot = list(
+            Log.objects.filter(date__lt=limite, id__gt=dernier_id)
+            .order_by('id')
+            .values(*CHAMPS)[:batch_size]
+        )
+        if not lot:
+            break
+        dernier_id = lot[-1]['id']
+
+        # Regrouper par jour (heure locale) pour écrire une partition par fichier
+        partitions = {}
+        for entree in lot:
+            jour = timezone.localtime(entree['date']).date()
+            partitions.setdefault(jour, []).append(_serialiser(entree))
+
+        # Écrire et synchroniser les archives avant de supprimer de la table
+        for jour, entrees in partitions.items():
+            chemin = chemin_partition(archive_dir, jour)
+            chemin.parent.mkdir(parents=True, exist_ok=True)
+            with open(chemin, 'ab') as fichier:
+                with gzip.GzipFile(fileobj=fichier, mode='ab') as gz:
+                    for entree in entrees:
+                        gz.write(json.dumps(entree, ensure_ascii=False).encode('utf-8') + b'\n')
+                fichier.flush()
+                os.fsync(fichier.fileno())
+
+        # Transaction courte par lot: la table n'est jamais verrouillée longtemps
+        with transaction.atomic():
+            Log.objects.filter(id__in=[entree['id'] for entree in lot]).delete()
+        total += len(lot)
+
+    return total
+
+
+def _jours(date_debut, date_fin):
+    jour = date_debut
+    while jour <= date_fin:
+        yield jour
+        jour += timedelta(days=1)
+
+
+def _as_date(valeur):
+    if valeur is None:
+        return None
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    return date.fromisoformat(str(valeur)[:10])
+
+
+def rechercher_archives(date_debut=None, date_fin=None, action=None, archive_dir=None):
+    """Parcourt les archives (du plus récent au plus ancien) filtrées par dates et action"""
+    archive_dir = Path(archive_dir or get_config()['ARCHIVE_DIR'])
+    date_debut = _as_date(date_debut)
+    date_fin = _as_date(date_fin)
+
+    if date_debut is None or date_fin is None:
+        # Bornes manquantes: se limiter aux partitions existantes
+        existants = sorted(archive_dir.glob('*/*/logs-*.jsonl.gz'))
+        if not existants:
+            return
+        date_debut = date_debut or date.fromisoformat(existants[0].name[5:15])
+        date_fin = date_fin or date.fromisoformat(existants[-1].name[5:15])
+
+    action = action.lower() if action else None
+    for jour in reversed(list(_jours(date_debut, date_fin))):
+        chemin = chemin_partition(archive_dir, jour)
+        if not chemin.exists():
+            continue
+        with gzip.open(chemin, 'rt', encoding='utf-8') as gz:
+            entrees = [json.loads(ligne) for ligne in gz if ligne.strip()]
+        vus = set()
+        for entree in sorted(entrees, key=lambda e: e['date'], reverse=True):
+            # Un lot réécrit après une interruption peut être présent deux fois
+            if entree['id'] in vus:
+                continue
+            vus.add(entree['id'])
+            if action and action not in entree['action'].lower():
+                continue
+            yield entree
@@ -0,0 +1,134 @@
+import math
+
+from django.db import connection
+from django.db.models import Max, Q
+
+from .models import Log
+from .recherche import normaliser
+
+FTS_TABLE = 'rdv_app_log_fts'
+LIMITE_MAX = 1000
+
+# Score propre à chaque log (nombre d'occurrences des mots cherchés, ou ts_rank), jamais
+# bm25: ses statistiques de corpus changent à chaque log écrit, et les pages suivantes
+# reprendraient après un score qui n'a plus la même place (doublons, lignes sautées).
+SCORE_SQLITE = ' + '.join(
+    f"length(highlight({FTS_TABLE}, {colonne}, char(1), '')) - length(coalesce({nom}, ''))"
+    for colonne, nom in enumerate(['action', 'details', 'table_cible', 'user_nom'])
+)
+
+
+def _mots(recherche):
+    # Minuscules sans accents, comme les index (remove_diacritics / rdv_app_sans_accents)
+    return normaliser(recherche).split()
+
+
+class CurseurInvalide(ValueError):
+    pass
+
+
+def _decoder_curseur(curseur):
+    if not curseur:
+        return None
+    try:
+        borne, score, log_id = curseur.split(':')
+        curseur = int(borne), float(score), int(log_id)
+    except ValueError:
+        raise CurseurInvalide(curseur)
+    if not math.isfinite(curseur[1]):
+        raise CurseurInvalide(curseur)
+    return curseur
+
+
+def _rechercher_sqlite(mots, limit, borne, curseur):
+    # Chaque mot est une recherche par préfixe, les mots sont combinés en ET
+    requete = ' '.join('"{}"*'.format(mot.replace('"', '""')) for mot in mots)
+    sql = f'''
+        SELECT rowid, score FROM (
+            SELECT rowid, ({SCORE_SQLITE}) AS score
+            FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid <= %s
+        )
+    '''
+    params = [requete, borne]
+    if curseur:
+        sql += ' WHERE score < %s OR (score = %s AND rowid < %s)'
+        params += [curseur[1], curseur[1], curseur[2]]
+    sql += ' ORDER BY score DESC, rowid DESC LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _rechercher_postgresql(mots, limit, borne, curseur):
+    requete = ' & '.join(f'{mot}:*' for mot in mots)
+    sql = f'''
+        SELECT log_id, score FROM (
+            SELECT log_id, ts_rank(document, q)::float8 AS score
+            FROM {FTS_TABLE}, to_tsquery('simple', %s) q
+            WHERE document @@ q AND log_id <= %s
+        ) resultats
+    '''
+    params = [requete, borne]
+    if curseur:
+        # ts_rank: plus grand = plus pertinent
+        sql += ' WHERE score < %s OR (score = %s AND log_id < %s)'
+        params += [curseur[1], curseur[1], curseur[2]]
+    sql += ' ORDER BY score DESC, log_id DESC LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _rechercher_sans_index(mots, limit, borne, curseur):
+    # Autres bases: filtre icontains, tri par id décroissant
+    logs = Log.objects.filter(id__lte=borne)
+    for mot in mots:
+        logs = logs.filter(
+            Q(action__icontains=mot) |
+            Q(details__icontains=mot) |
+            Q(table_cible__icontains=mot) |
+            Q(user__first_name__icontains=mot) |
+            Q(user__last_name__icontains=mot) |
+            Q(user__username__icontains=mot)
+        )
+    if curseur:
+        logs = logs.filter(id__lt=curseur[2])
+    return [(log_id, 0.0) for log_id in logs.order_by('-id').values_list('id', flat=True)[:limit]]
+
+
+def rechercher_logs(recherche, limit=100, curseur=None):
+    """Recherche plein texte dans les logs, triée par pertinence
+
+    Retourne (logs, curseur_suivant). Le curseur ("borne:score:id") permet de
+    demander la page suivante sans OFFSET; la borne (plus grand id au moment de
+    la première page) écarte les logs écrits depuis, les pages restent cohérentes.
+    `limit` entre 1 et LIMITE_MAX; CurseurInvalide si le curseur est illisible.
+    """
+    if not 1 <= limit <= LIMITE_MAX:
+        raise ValueError(f'limit hors de 1..{LIMITE_MAX}: {limit}')
+    mots = _mots(recherche)
+    if not mots:
+        return [], None
+
+    curseur = _decoder_curseur(curseur)
+    if curseur:
+        borne = curseur[0]
+    else:
+        borne = Log.objects.aggregate(borne=Max('id'))['borne'] or 0
+    if connection.vendor == 'sqlite':
+        lignes = _rechercher_sqlite(mots, limit, borne, curseur)
+    elif connection.vendor == 'postgresql':
+        lignes = _rechercher_postgresql(mots, limit, borne, curseur)
+    else:
+        lignes = _rechercher_sans_index(mots, limit, borne, curseur)
+
+    logs_par_id = Log.objects.select_related('user').in_bulk([log_id for log_id, _ in lignes])
+    logs = [logs_par_id[log_id] for log_id, _ in lignes if log_id in logs_par_id]
+
+    curseur_suivant = None
+    if len(lignes) == limit:
+        dernier_id, dernier_score = lignes[-1]
+        curseur_suivant = f'{borne}:{float(dernier_score)!r}:{dernier_id}'
+    return logs, curseur_suivant
@@ -0,0 +1,173 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, close_old_connections, connection, transaction
+
+logger = logging.getLogger('rdv_app')
+
+DEFAULTS = {
+    'MODE': 'async',            # 'async' ou 'sync' (tests, scripts)
+    'BATCH_SIZE': 100,          # flush tous les N logs...
+    'FLUSH_INTERVAL_MS': 200,   # ... ou toutes les M millisecondes
+    'QUEUE_SIZE': 10000,        # taille max de la file en mémoire
+    'OVERFLOW': 'sync',         # file pleine: 'sync', 'block' ou 'drop'
+}
+
+
+def get_config():
+    """Configuration RDV_LOG_WRITER fusionnée avec les valeurs par défaut"""
+    return {**DEFAULTS, **getattr(settings, 'RDV_LOG_WRITER', {})}
+
+
+class LogWriter:
+    """Écriture des logs par lots dans un thread de fond (bulk_create)"""
+
+    def __init__(self, batch_size=100, flush_interval_ms=200, queue_size=10000, overflow='sync'):
+        if overflow not in ('sync', 'block', 'drop'):
+            raise ValueError(f"Politique de débordement inconnue: {overflow}")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.overflow = overflow
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def write(self, log):
+        """Met un Log (non sauvegardé) en file d'attente"""
+        self._ensure_started()
+        try:
+            if self.overflow == 'block':
+                self.queue.put(log)
+            else:
+                self.queue.put_nowait(log)
+        except queue.Full:
+            if self.overflow == 'drop':
+                self.dropped += 1
+            else:
+                self._save([log])
+
+    def flush(self):
+        """Écrit immédiatement tout ce qui est en attente (thread appelant)"""
+        batch = self._drain(self.queue.qsize())
+        while batch:
+            self._save(batch)
+            batch = self._drain(self.batch_size)
+
+    def stop(self):
+        """Arrête le thread et vide la file (appelé à l'arrêt du process)"""
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _ensure_started(self):
+        # Redémarrer le thread après un fork (workers gunicorn/uwsgi)
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='rdv-log-writer', daemon=True)
+            self._thread.start()
+
+    def _drain(self, limit):
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    batch = [self.queue.get(timeout=self.flush_interval)]
+                except queue.Empty:
+                    continue
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                # Connexion expirée (CONN_MAX_AGE) ou coupée (redémarrage de la base): reconnexion
+                close_old_connections()
+                self._save(batch, reconnecter=True)
+            self.flush()
+        finally:
+            connection.close()
+
+    def _save(self, batch, reconnecter=False):
+        from .models import Log
+        try:
+            self._inserer(Log, batch)
+        except OperationalError as e:
+            if not reconnecter:
+                logger.error("Erreur lors de l'enregistrement de %d logs: %s", len(batch), e)
+                return
+            # Un seul nouvel essai sur une connexion neuve (thread de fond uniquement:
+            # l'appelant de flush() peut être dans une transaction)
+            connection.close()
+            try:
+                self._inserer(Log, batch)
+            except Exception as e:
+                logger.error("Erreur lors de l'enregistrement de %d logs: %s", len(batch), e)
+        except Exception as e:
+            logger.error("Erreur lors de l'enregistrement de %d logs: %s", len(batch), e)
+
+    def _inserer(self, Log, batch):
+        try:
+            with transaction.atomic():
+                Log.objects.bulk_create(batch, batch_size=self.batch_size)
+        except IntegrityError:
+            # Une ligne invalide (utilisateur supprimé entre-temps...) ne fait pas perdre le lot
+            for log in batch:
+                try:
+                    with transaction.atomic():
+                        Log.objects.bulk_create([log])
+                except IntegrityError as e:
+                    logger.error("Log ignoré (%s %s): %s", log.action, log.table_cible, e)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """LogWriter du process, ou None en mode synchrone"""
+    global _writer
+    config = get_config()
+    if config['MODE'] == 'sync':
+        return None
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = LogWriter(
+                    batch_size=config['BATCH_SIZE'],
+                    flush_interval_ms=config['FLUSH_INTERVAL_MS'],
+                    queue_size=config['QUEUE_SIZE'],
+                    overflow=config['OVERFLOW'],
+                )
+                atexit.register(_writer.stop)
+    return _writer
+
+
+def flush_logs():
+    """Force l'écriture des logs en attente"""
+    if _writer is not None:
+        _writer.flush()
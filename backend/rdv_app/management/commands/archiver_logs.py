@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from rdv_app.log_archive import archiver_logs, get_config, rechercher_archives
+
+
+class Command(BaseCommand):
+    help = 'Archive les logs anciens (gzip JSONL par jour) et les retire de la table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jours', type=int, help='Âge minimum des logs à archiver (défaut: RDV_LOG_RETENTION)')
+        parser.add_argument('--batch-size', type=int, help='Nombre de logs déplacés par transaction')
+        parser.add_argument('--archive-dir', help="Répertoire des archives")
+        parser.add_argument('--rechercher', action='store_true', help='Rechercher dans les archives au lieu d\'archiver')
+        parser.add_argument('--date-debut', help='Recherche: date de début (AAAA-MM-JJ)')
+        parser.add_argument('--date-fin', help='Recherche: date de fin (AAAA-MM-JJ)')
+        parser.add_argument('--action', help='Recherche: filtre sur l\'action')
+
+    def handle(self, *args, **options):
+        if options['rechercher']:
+            for entree in rechercher_archives(
+                date_debut=options['date_debut'],
+                date_fin=options['date_fin'],
+                action=options['action'],
+                archive_dir=options['archive_dir'],
+            ):
+                self.stdout.write(f"{entree['date']} - {entree['action']} - {entree['user'] or 'Système'} - {entree['details']}")
+            return
+
+        config = get_config()
+        total = archiver_logs(
+            jours=options['jours'],
+            batch_size=options['batch_size'],
+            archive_dir=options['archive_dir'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} logs archivés dans {options['archive_dir'] or config['ARCHIVE_DIR']}"
+        ))
@@ -0,0 +1,146 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rdv_app.sqlite import appliquer_pragmas, get_pragmas
+
+
+class Command(BaseCommand):
+    help = ("Mesure le débit et les erreurs de verrou SQLite (lectures, réservations, logs concurrents) "
+            "sans puis avec RDV_SQLITE_PRAGMAS, sur une copie de la base")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=16)
+        parser.add_argument('--duree', type=float, default=5, help='Durée de chaque scénario (secondes)')
+        parser.add_argument('--ecritures', type=float, default=0.3,
+                            help='Proportion de réservations (chacune suivie d\'un log)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('La base configurée n\'est pas SQLite')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM rdv_app_patient')
+            self.patients = [ligne[0] for ligne in cursor.fetchall()]
+            cursor.execute('SELECT id FROM rdv_app_praticien')
+            self.praticiens = [ligne[0] for ligne in cursor.fetchall()]
+        if not self.patients or not self.praticiens:
+            raise CommandError('Il faut au moins un patient et un praticien (manage.py create_sample_data)')
+
+        scenarios = [
+            ('Réglages SQLite par défaut', {'journal_mode': 'delete'}),
+            ('RDV_SQLITE_PRAGMAS', get_pragmas()),
+        ]
+        for nom, pragmas in scenarios:
+            with tempfile.TemporaryDirectory() as dossier:
+                chemin = os.path.join(dossier, 'bench.sqlite3')
+                # Copie cohérente de la base (API de sauvegarde SQLite)
+                copie = sqlite3.connect(chemin)
+                connection.connection.backup(copie)
+                # Le mode de journal est stocké dans le fichier: le fixer avant les threads
+                appliquer_pragmas(copie.cursor(), {'journal_mode': pragmas.get('journal_mode', 'delete')})
+                copie.close()
+                resultats = self.executer(chemin, pragmas, options)
+            self.afficher(nom, pragmas, resultats, options['duree'])
+
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark terminé'))
+
+    def executer(self, chemin, pragmas, options):
+        resultats = {'lectures': 0, 'reservations': 0, 'logs': 0, 'verrous': 0, 'latences': []}
+        verrou = threading.Lock()
+        fin = time.perf_counter() + options['duree']
+        depart = timezone.now() + timedelta(days=3650)
+
+        def travailleur(numero):
+            cnx = sqlite3.connect(chemin, isolation_level=None, check_same_thread=False)
+            appliquer_pragmas(cnx.cursor(), {nom: valeur for nom, valeur in pragmas.items() if nom != 'journal_mode'})
+            rnd = random.Random(numero)
+            local = {'lectures': 0, 'reservations': 0, 'logs': 0, 'verrous': 0, 'latences': []}
+            n = 0
+            while time.perf_counter() < fin:
+                n += 1
+                debut = time.perf_counter()
+                try:
+                    if rnd.random() < options['ecritures']:
+                        self.reserver(cnx, rnd, depart + timedelta(minutes=numero * 1000000 + n))
+                        local['reservations'] += 1
+                        self.journaliser(cnx)
+                        local['logs'] += 1
+                    else:
+                        self.lire(cnx, rnd)
+                        local['lectures'] += 1
+                except sqlite3.OperationalError as e:
+                    if cnx.in_transaction:
+                        cnx.execute('ROLLBACK')
+                    if 'locked' not in str(e) and 'busy' not in str(e):
+                        raise
+                    local['verrous'] += 1
+                local['latences'].append(time.perf_counter() - debut)
+            cnx.close()
+            with verrou:
+                for cle in ('lectures', 'reservations', 'logs', 'verrous'):
+                    resultats[cle] += local[cle]
+                resultats['latences'] += local['latences']
+
+        threads = [threading.Thread(target=travailleur, args=(i,)) for i in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return resultats
+
+    def lire(self, cnx, rnd):
+        # Planning d'un praticien (comme praticien_planning)
+        cnx.execute(
+            'SELECT r.id, r.date_heure, r.statut, u.first_name, u.last_name '
+            'FROM rdv_app_rendezvous r '
+            'JOIN rdv_app_patient p ON p.id = r.patient_id '
+            'JOIN rdv_app_user u ON u.id = p.user_id '
+            'WHERE r.praticien_id = ? ORDER BY r.date_heure DESC LIMIT 50',
+            (rnd.choice(self.praticiens),),
+        ).fetchall()
+
+    def reserver(self, cnx, rnd, date_heure):
+        # Même séquence qu'une réservation par l'API: INSERT du RDV en autocommit,
+        # puis synchroniser_rappels (lecture des rappels existants, écriture en transaction)
+        maintenant = timezone.now().isoformat()
+        rdv_id = cnx.execute(
+            'INSERT INTO rdv_app_rendezvous (patient_id, praticien_id, date_heure, motif, statut, notes, '
+            'date_creation, date_modification) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            (rnd.choice(self.patients), rnd.choice(self.praticiens), date_heure.isoformat(), 'benchmark',
+             'en_attente', '', maintenant, maintenant),
+        ).lastrowid
+        cnx.execute(
+            'SELECT id, type_rappel, date_envoi_prevue, envoye FROM rdv_app_rappel WHERE rdv_id = ?', (rdv_id,)
+        ).fetchall()
+        cnx.execute('BEGIN')
+        cnx.executemany(
+            'INSERT INTO rdv_app_rappel (rdv_id, date_envoi_prevue, type_rappel, envoye, echec, date_modification) '
+            'VALUES (?, ?, ?, 0, \'\', ?)',
+            [(rdv_id, (date_heure - timedelta(hours=24)).isoformat(), '24h', maintenant),
+             (rdv_id, (date_heure - timedelta(hours=48)).isoformat(), '48h', maintenant)],
+        )
+        cnx.execute('COMMIT')
+
+    def journaliser(self, cnx):
+        cnx.execute(
+            'INSERT INTO rdv_app_log (action, details, table_cible, date) VALUES (?, ?, ?, ?)',
+            ('Création RDV', 'benchmark', 'RendezVous', timezone.now().isoformat()),
+        )
+
+    def afficher(self, nom, pragmas, resultats, duree):
+        latences = sorted(resultats['latences']) or [0]
+        self.stdout.write(f'{nom}: {pragmas}')
+        self.stdout.write(
+            f"  {(resultats['lectures'] + resultats['reservations']) / duree:.0f} op/s "
+            f"({resultats['lectures'] / duree:.0f} lectures/s, {resultats['reservations'] / duree:.0f} réservations/s), "
+            f"erreurs de verrou: {resultats['verrous']}, "
+            f"p50 {latences[len(latences) // 2] * 1000:.1f} ms, p99 {latences[int(len(latences) * 0.99)] * 1000:.1f} ms"
+        )
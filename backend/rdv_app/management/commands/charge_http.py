@@ -0,0 +1,93 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rdv_app.charge import Client, percentile
+
+
+class Command(BaseCommand):
+    help = "Générateur de charge HTTP: débit, latences (p50/p99) et erreurs par URL, sur un serveur lancé à part"
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', help='URLs à charger (http://127.0.0.1:8000/api/...)')
+        parser.add_argument('--concurrence', type=int, default=50, help='Clients simultanés')
+        parser.add_argument('--duree', type=float, default=10, help='Durée en secondes')
+        parser.add_argument('--utilisateur', default='admin')
+        parser.add_argument('--mot-de-passe', default='admin123')
+        parser.add_argument('--host', default='localhost', help='En-tête Host (ALLOWED_HOSTS)')
+        parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+
+    def handle(self, *args, **options):
+        cibles = [urlsplit(url) for url in options['urls']]
+        if len({(cible.hostname, cible.port) for cible in cibles}) != 1:
+            raise CommandError('Toutes les URLs doivent viser le même serveur')
+        resultats = asyncio.run(self.charger(cibles, options))
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultats, indent=2))
+            return
+        for chemin, res in resultats['urls'].items():
+            self.stdout.write(
+                f"{chemin}: {res['debit']:.0f} req/s, p50 {res['p50_ms']:.1f} ms, "
+                f"p99 {res['p99_ms']:.1f} ms, erreurs {res['erreurs']}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultats['requetes']} requêtes en {resultats['duree']:.1f}s: {resultats['debit']:.0f} req/s "
+            f"({options['concurrence']} clients)"
+        ))
+
+    async def charger(self, cibles, options):
+        hote, port = cibles[0].hostname, cibles[0].port or 80
+        entetes = {'Host': options['host'], 'Connection': 'keep-alive'}
+
+        connexion = Client(hote, port, entetes)
+        statut, contenu = await connexion.requete('POST', '/api/auth/login/', {
+            'username': options['utilisateur'], 'password': options['mot_de_passe'],
+        })
+        connexion.fermer()
+        if statut != 200:
+            raise CommandError(f'Connexion impossible ({statut}): {contenu[:200]!r}')
+        entetes['Authorization'] = f"Bearer {json.loads(contenu)['token']}"
+
+        chemins = [cible.path + (f'?{cible.query}' if cible.query else '') for cible in cibles]
+        latences = {chemin: [] for chemin in chemins}
+        erreurs = {chemin: 0 for chemin in chemins}
+        fin = time.perf_counter() + options['duree']
+
+        async def client_virtuel(numero):
+            client = Client(hote, port, entetes)
+            i = numero
+            while time.perf_counter() < fin:
+                chemin = chemins[i % len(chemins)]
+                i += 1
+                debut = time.perf_counter()
+                try:
+                    statut, _ = await client.requete('GET', chemin)
+                except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError):
+                    client.fermer()
+                    statut = 0
+                if statut == 200:
+                    latences[chemin].append(time.perf_counter() - debut)
+                else:
+                    erreurs[chemin] += 1
+            client.fermer()
+
+        debut = time.perf_counter()
+        await asyncio.gather(*(client_virtuel(i) for i in range(options['concurrence'])))
+        duree = time.perf_counter() - debut
+
+        par_url = {}
+        for chemin in chemins:
+            valeurs = sorted(latences[chemin])
+            par_url[chemin] = {
+                'requetes': len(valeurs),
+                'erreurs': erreurs[chemin],
+                'debit': len(valeurs) / duree,
+                'p50_ms': percentile(valeurs, 0.5) * 1000,
+                'p99_ms': percentile(valeurs, 0.99) * 1000,
+            }
+        total = sum(res['requetes'] for res in par_url.values())
+        return {'duree': duree, 'requetes': total, 'debit': total / duree, 'urls': par_url}
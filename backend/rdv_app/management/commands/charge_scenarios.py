@@ -0,0 +1,146 @@
+import asyncio
+import importlib
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from rdv_app import charge
+
+
+def lire_scenarios(texte, disponibles):
+    """'patient:70,praticien:20,admin:10' -> [(nom, poids, coroutine)]"""
+    scenarios = []
+    for element in texte.split(','):
+        nom, _, poids = element.strip().partition(':')
+        if nom not in disponibles:
+            raise CommandError(f"Scénario inconnu: {nom} (disponibles: {', '.join(disponibles)})")
+        try:
+            poids = float(poids or 1)
+        except ValueError:
+            raise CommandError(f'Poids invalide pour {nom}: {poids}')
+        if poids > 0:
+            scenarios.append((nom, poids, disponibles[nom]))
+    if not scenarios:
+        raise CommandError('Aucun scénario à exécuter')
+    return scenarios
+
+
+def commit_git():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Test de charge par scénarios (patient, praticien, admin) sur un serveur lancé à part: "
+            "débit, latences p50/p95/p99 et taux d'erreur par étape, en JSON comparable entre commits")
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', help='Serveur à charger (http://127.0.0.1:8000)')
+        parser.add_argument('--utilisateurs', type=int, default=50, help='Utilisateurs virtuels simultanés')
+        parser.add_argument('--duree', type=float, default=30, help='Durée en secondes (montée comprise)')
+        parser.add_argument('--montee', type=float, default=5, help='Secondes pour démarrer tous les utilisateurs')
+        parser.add_argument('--pause', type=float, default=0.5,
+                            help='Temps de réflexion moyen entre deux étapes, en secondes (0: aucun)')
+        parser.add_argument('--scenarios', default='patient:70,praticien:20,admin:10',
+                            help='Scénarios et poids (nom:poids,...)')
+        parser.add_argument('--module', help='Module Python dont le dict SCENARIOS complète les scénarios intégrés')
+        parser.add_argument('--graine', type=int, help='Graine aléatoire (tirages reproductibles)')
+        parser.add_argument('--host', default='localhost', help='En-tête Host (ALLOWED_HOSTS)')
+        parser.add_argument('--preparer', type=int, metavar='N',
+                            help='Crée N comptes patients charge_patient_* (puis quitte sans URL)')
+        parser.add_argument('--nettoyer', action='store_true',
+                            help='Supprime les comptes et rendez-vous créés par les tests de charge')
+        parser.add_argument('--sortie', help='Écrit les résultats JSON dans ce fichier')
+        parser.add_argument('--comparer', help='Résultats JSON précédents (--sortie) à comparer')
+        parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+
+    def handle(self, *args, **options):
+        if options['preparer'] is not None:
+            try:
+                crees = charge.preparer(options['preparer'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {crees} comptes patients créés ({charge.PREFIXE}0..{options['preparer'] - 1}, "
+                f"mot de passe {charge.MOT_DE_PASSE})"
+            ))
+        if options['url']:
+            self.charger(options)
+        if options['nettoyer']:
+            rdv, objets = charge.nettoyer()
+            self.stdout.write(self.style.SUCCESS(f'✅ Nettoyage: {rdv} rendez-vous et {objets} objets supprimés'))
+        if not options['url'] and options['preparer'] is None and not options['nettoyer']:
+            raise CommandError('Indiquer une URL de serveur, --preparer N ou --nettoyer')
+
+    def charger(self, options):
+        cible = urlsplit(options['url'])
+        if cible.scheme != 'http' or not cible.hostname:
+            raise CommandError(f"URL invalide: {options['url']} (http://hote:port attendu)")
+        disponibles = dict(charge.SCENARIOS)
+        if options['module']:
+            try:
+                disponibles.update(importlib.import_module(options['module']).SCENARIOS)
+            except (ImportError, AttributeError) as e:
+                raise CommandError(f"Module de scénarios {options['module']}: {e}")
+        scenarios = lire_scenarios(options['scenarios'], disponibles)
+
+        precedent = None
+        if options['comparer']:
+            try:
+                precedent = json.loads(Path(options['comparer']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Résultats à comparer illisibles: {e}")
+
+        entetes = {'Host': options['host'], 'Connection': 'keep-alive'}
+        resultats = asyncio.run(charge.executer(
+            scenarios, cible.hostname, cible.port or 80, entetes, options['utilisateurs'],
+            options['duree'], options['montee'], options['pause'], options['graine'],
+        ))
+        resultats = {
+            'commit': commit_git(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'options': {
+                cle: options[cle] for cle in
+                ('url', 'utilisateurs', 'duree', 'montee', 'pause', 'scenarios', 'module', 'graine')
+            },
+            **resultats,
+        }
+        if precedent is not None:
+            resultats['comparaison'] = {
+                'commit': precedent.get('commit'),
+                'etapes': charge.comparer(precedent, resultats),
+            }
+        if options['sortie']:
+            Path(options['sortie']).write_text(json.dumps(resultats, indent=2))
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultats, indent=2))
+            return
+        for etape, res in resultats['etapes'].items():
+            self.stdout.write(
+                f"{etape}: {res['requetes']} requêtes, {res['debit']:.1f} req/s, p50 {res['p50_ms']:.1f} ms, "
+                f"p95 {res['p95_ms']:.1f} ms, p99 {res['p99_ms']:.1f} ms, erreurs {res['taux_erreur']:.1%}"
+            )
+        for etape, ecarts in resultats.get('comparaison', {}).get('etapes', {}).items():
+            variations = ', '.join(
+                f"{cle} {ecart['variation']:+.0%}" for cle, ecart in ecarts.items() if ecart['variation'] is not None
+            )
+            self.stdout.write(f"  {etape} vs {resultats['comparaison']['commit']}: {variations}")
+        message = (
+            f"{resultats['requetes']} requêtes en {resultats['duree']:.1f}s: {resultats['debit']:.0f} req/s, "
+            f"{resultats['taux_erreur']:.1%} d'erreurs ({options['utilisateurs']} utilisateurs)"
+        )
+        if resultats['erreurs']:
+            self.stdout.write(self.style.ERROR(f'❌ {message}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ {message}'))
@@ -0,0 +1,35 @@
+import time
+from datetime import date
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from rdv_app.export_analytique import FORMATS, TAILLE_GROUPE, exporter_rendez_vous
+
+
+class Command(BaseCommand):
+    help = "Exporte l'historique des rendez-vous en Parquet ou Arrow pour l'analyse"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help='Fichier de sortie')
+        parser.add_argument('--format', dest='format_export', choices=list(FORMATS), default='parquet')
+        parser.add_argument('--date-debut', type=date.fromisoformat, help='Rendez-vous à partir de cette date (AAAA-MM-JJ)')
+        parser.add_argument('--date-fin', type=date.fromisoformat, help="Rendez-vous jusqu'à cette date (AAAA-MM-JJ)")
+        parser.add_argument('--taille-groupe', type=int, default=TAILLE_GROUPE, help='Lignes par row group')
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        try:
+            total = exporter_rendez_vous(
+                options['fichier'],
+                format_export=options['format_export'],
+                date_debut=options['date_debut'],
+                date_fin=options['date_fin'],
+                taille_groupe=options['taille_groupe'],
+            )
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} rendez-vous exportés dans {options['fichier']} en {duree:.2f}s"
+        ))
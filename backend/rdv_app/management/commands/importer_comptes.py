@@ -0,0 +1,54 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rdv_app.import_csv import MOTS_DE_PASSE, TYPES, Import, ecrire_rapport_csv
+
+
+class Command(BaseCommand):
+    help = "Importe des patients ou des praticiens depuis un CSV (en-tête: champs de l'API de création)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('type', choices=list(TYPES))
+        parser.add_argument('fichier', help='CSV UTF-8 ("-" pour l\'entrée standard)')
+        parser.add_argument('--mots-de-passe', choices=MOTS_DE_PASSE, default='a_definir',
+                            help="a_definir: comptes sans mot de passe utilisable; csv: colonne password hachée")
+        parser.add_argument('--taille-lot', type=int, help='Comptes insérés par transaction')
+        parser.add_argument('--workers', type=int, help='Processus de hachage (mode csv)')
+        parser.add_argument('--rapport', help="Fichier CSV des lignes rejetées (ligne, champ, message)")
+        parser.add_argument('--simulation', action='store_true', help='Valide sans rien créer')
+
+    def handle(self, *args, **options):
+        debut = time.perf_counter()
+        import_comptes = Import(
+            options['type'],
+            mots_de_passe=options['mots_de_passe'],
+            taille_lot=options['taille_lot'],
+            workers=options['workers'],
+            simulation=options['simulation'],
+        )
+        try:
+            if options['fichier'] == '-':
+                resultat = import_comptes.executer(sys.stdin)
+            else:
+                with open(options['fichier'], newline='', encoding='utf-8-sig') as fichier:
+                    resultat = import_comptes.executer(fichier)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        duree = time.perf_counter() - debut
+
+        erreurs = resultat['erreurs']
+        if options['rapport']:
+            with open(options['rapport'], 'w', newline='', encoding='utf-8') as fichier:
+                ecrire_rapport_csv(erreurs, fichier)
+        else:
+            for erreur in erreurs[:20]:
+                self.stdout.write(self.style.WARNING(f"Ligne {erreur['ligne']} [{erreur['champ']}]: {erreur['message']}"))
+            if len(erreurs) > 20:
+                self.stdout.write(f'... {len(erreurs) - 20} autres erreurs (--rapport pour la liste complète)')
+
+        verbe = 'valides' if options['simulation'] else 'créés'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resultat['crees']} {options['type']}s {verbe} sur {resultat['lues']} lignes "
+            f"en {duree:.1f}s ({resultat['lues'] / duree if duree else 0:.0f} lignes/s), {len(erreurs)} erreurs"
+        ))
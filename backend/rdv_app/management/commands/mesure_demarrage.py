@@ -0,0 +1,129 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Chargement complet d'une application: modules, apps, puis URLconf (sinon importé à la 1re requête)
+CHARGER_APPLICATION = (
+    "from plateforme_rdv.{module} import application\n"
+    "from django.urls import get_resolver\n"
+    "get_resolver().url_patterns\n"
+)
+
+
+def get_budget():
+    budget = {
+        'IMPORT_MS': 1000,
+        'MODULES_DIFFERES': ['reportlab', 'pyarrow', 'pandas'],
+    }
+    budget.update(getattr(settings, 'RDV_BUDGET_DEMARRAGE', {}))
+    return budget
+
+
+def analyser_importtime(sortie):
+    """Lignes de `python -X importtime`: [(module, propre_us, cumule_us)]"""
+    modules = []
+    for ligne in sortie.splitlines():
+        if not ligne.startswith('import time:') or 'self [us]' in ligne:
+            continue
+        propre, cumule, nom = ligne[len('import time:'):].split('|')
+        modules.append((nom.strip(), int(propre), int(cumule)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = ("Démarrage à froid: temps de création des applications WSGI/ASGI et des commandes manage.py "
+            "(interpréteur neuf à chaque mesure), détail des imports et budget RDV_BUDGET_DEMARRAGE")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=5)
+        parser.add_argument('--commandes', nargs='*', default=['check'],
+                            help='Commandes manage.py à chronométrer')
+        parser.add_argument('--top', type=int, default=15, help='Paquets les plus coûteux à afficher')
+        parser.add_argument('--verifier', action='store_true',
+                            help='Échoue si le budget est dépassé (intégration continue)')
+        parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'plateforme_rdv.settings')}
+        scenarios = {
+            'wsgi': [sys.executable, '-c', CHARGER_APPLICATION.format(module='wsgi')],
+            'asgi': [sys.executable, '-c', CHARGER_APPLICATION.format(module='asgi')],
+        }
+        for commande in options['commandes']:
+            scenarios[f'manage.py {commande}'] = [sys.executable, 'manage.py', *commande.split()]
+
+        resultats = {'demarrage_ms': {}, 'budget': get_budget()}
+        for nom, argv in scenarios.items():
+            durees = []
+            for _ in range(options['repetitions']):
+                debut = time.perf_counter()
+                self.executer(argv, env)
+                durees.append((time.perf_counter() - debut) * 1000)
+            resultats['demarrage_ms'][nom] = {
+                'median': statistics.median(durees), 'min': min(durees), 'max': max(durees),
+            }
+
+        # Imports de l'application WSGI, module par module
+        sortie = self.executer([sys.executable, '-X', 'importtime', *scenarios['wsgi'][1:]], env).stderr
+        modules = analyser_importtime(sortie)
+        differes = resultats['budget']['MODULES_DIFFERES']
+        resultats['import_ms'] = sum(propre for _, propre, _ in modules) / 1000
+        # Temps propre regroupé par paquet racine: quelles dépendances coûtent au démarrage
+        par_paquet = {}
+        for nom, propre, _ in modules:
+            racine = nom.split('.')[0]
+            par_paquet[racine] = par_paquet.get(racine, 0) + propre
+        resultats['plus_couteux'] = [
+            {'paquet': racine, 'ms': propre / 1000}
+            for racine, propre in sorted(par_paquet.items(), key=lambda p: -p[1])
+        ][:options['top']]
+        resultats['differes_importes'] = sorted({
+            nom for nom, _, _ in modules if nom.split('.')[0] in differes
+        })
+        violations = self.verifier_budget(resultats)
+
+        if options['json']:
+            self.stdout.write(json.dumps({**resultats, 'violations': violations}, indent=2))
+        else:
+            self.afficher(resultats, violations)
+
+        if options['verifier'] and violations:
+            raise CommandError('Budget de démarrage dépassé: ' + '; '.join(violations))
+
+    def executer(self, argv, env):
+        processus = subprocess.run(argv, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if processus.returncode != 0:
+            raise CommandError(f"Échec de {' '.join(argv[1:])}: {processus.stderr.strip()[-500:]}")
+        return processus
+
+    def verifier_budget(self, resultats):
+        budget = resultats['budget']
+        violations = []
+        if resultats['import_ms'] > budget['IMPORT_MS']:
+            violations.append(f"imports {resultats['import_ms']:.0f} ms > {budget['IMPORT_MS']} ms")
+        racines = sorted({nom.split('.')[0] for nom in resultats['differes_importes']})
+        if racines:
+            violations.append(f"importés au démarrage: {', '.join(racines)}")
+        return violations
+
+    def afficher(self, resultats, violations):
+        for nom, mesure in resultats['demarrage_ms'].items():
+            self.stdout.write(
+                f"{nom}: {mesure['median']:.0f} ms (min {mesure['min']:.0f}, max {mesure['max']:.0f})"
+            )
+        self.stdout.write(f"\nImports de l'application WSGI: {resultats['import_ms']:.0f} ms "
+                          f"(budget {resultats['budget']['IMPORT_MS']} ms)")
+        for module in resultats['plus_couteux']:
+            self.stdout.write(f"  {module['ms']:8.1f} ms  {module['paquet']}")
+
+        if violations:
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(f'❌ {violation}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ Démarrage dans le budget'))
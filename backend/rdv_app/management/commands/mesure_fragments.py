@@ -0,0 +1,155 @@
+import json
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from rdv_app import views
+from rdv_app.models import Patient, Praticien, RendezVous, User
+
+from .mesure_listes import Compteur, creer_donnees, gabarits_de_mesure
+
+# Gabarits de mesure: mêmes données affichées que les pages (noms des patients et praticiens)
+GABARITS = {
+    'rdv_app/dashboard.html': (
+        '{% if praticien %}{% for rdv in rdv_aujourdhui %}{{ rdv.date_heure }} {{ rdv.patient }}\n{% endfor %}'
+        '{% for rdv in rdv_semaine %}{{ rdv.date_heure }} {{ rdv.patient }}\n{% endfor %}'
+        '{% elif patient %}{% for rdv in rdv_futurs %}{{ rdv.date_heure }} {{ rdv.praticien }}\n{% endfor %}'
+        '{% for rdv in rdv_passes %}{{ rdv.date_heure }} {{ rdv.praticien }}\n{% endfor %}'
+        '{% else %}{{ total_rdv }} {{ rdv_aujourdhui }} {{ total_patients }} {{ total_praticiens }} '
+        '{{ annulations_attente }}\n{% for rdv in rdv_recents %}{{ rdv }}\n{% endfor %}{% endif %}'
+    ),
+    'rdv_app/praticiens/planning.html': (
+        '{{ praticien }} {{ week_start }}\n'
+        '{% for rdv in rdv_semaine %}{{ rdv.date_heure }} {{ rdv.patient }} {{ rdv.get_statut_display }}\n{% endfor %}'
+    ),
+    'rdv_app/praticiens/detail.html': (
+        '{{ praticien }}\n{% for horaire in horaires %}{{ horaire.get_jour_semaine_display }} '
+        '{{ horaire.heure_debut }}-{{ horaire.heure_fin }}\n{% endfor %}'
+        '{% for indisponibilite in indisponibilites %}{{ indisponibilite.date_debut }} '
+        '{{ indisponibilite.motif }}\n{% endfor %}'
+    ),
+}
+
+
+class Command(BaseCommand):
+    help = ("Temps de rendu et requêtes SQL du tableau de bord (admin, praticien, patient), du planning "
+            "et du détail praticien: sans cache des fragments, cache chaud, puis après une réservation")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lignes', type=int, default=10000,
+                            help='Rendez-vous (et patients) ajoutés pour la mesure, annulés ensuite')
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--verifier', action='store_true',
+                            help="Échoue si le cache n'évite pas les requêtes ou si une réservation "
+                                 "périme les fragments d'un autre praticien")
+        parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(role='admin', is_active=True).first()
+        praticiens = list(Praticien.objects.select_related('user').order_by('id')[:2])
+        patient = Patient.objects.select_related('user').first()
+        if admin is None or len(praticiens) < 2 or patient is None:
+            raise CommandError('Il faut un admin, deux praticiens et un patient (manage.py create_sample_data)')
+        praticien, autre_praticien = praticiens
+
+        factory = RequestFactory()
+        pages = {
+            'dashboard admin': (views.dashboard_view, admin, {}),
+            'dashboard praticien': (views.dashboard_view, praticien.user, {}),
+            'dashboard patient': (views.dashboard_view, patient.user, {}),
+            'planning': (views.praticien_planning, admin, {'pk': praticien.pk}),
+            'detail praticien': (views.praticien_detail, admin, {'pk': praticien.pk}),
+            'planning autre praticien': (views.praticien_planning, admin, {'pk': autre_praticien.pk}),
+        }
+        requetes = {}
+        for nom, (vue, user, kwargs) in pages.items():
+            requete = factory.get('/')
+            requete.user = user
+            requetes[nom] = (vue, requete, kwargs)
+
+        resultats = {}
+        with gabarits_de_mesure(GABARITS), transaction.atomic():
+            creer_donnees(options['lignes'])
+            cache.clear()
+
+            with override_settings(RDV_FRAGMENTS={'TIMEOUT': 0}):
+                resultats['sans_cache'] = self.mesurer(requetes, options['repetitions'])
+            resultats['cache_chaud'] = self.mesurer(requetes, options['repetitions'])
+
+            # Chaque rendu suit une réservation chez `praticien` pour `patient`: leurs fragments
+            # sont recalculés, ceux de l'autre praticien restent en cache
+            debut = timezone.now() + timedelta(days=1)
+            reservations = iter(range(10 ** 6))
+
+            def reserver():
+                RendezVous.objects.create(
+                    patient=patient, praticien=praticien, motif='Mesure fragments',
+                    date_heure=debut + timedelta(minutes=30 * next(reservations)),
+                )
+            resultats['apres_reservation'] = self.mesurer(requetes, options['repetitions'], avant_rendu=reserver)
+            transaction.set_rollback(True)
+        cache.clear()
+
+        violations = self.verifier(resultats)
+        if options['json']:
+            self.stdout.write(json.dumps({**resultats, 'violations': violations}, indent=2))
+        else:
+            for nom in pages:
+                sans, chaud, apres = (resultats[mode][nom] for mode in ('sans_cache', 'cache_chaud', 'apres_reservation'))
+                self.stdout.write(
+                    f"{nom}: {sans['ms']:.2f} ms / {sans['requetes']} requêtes sans cache, "
+                    f"{chaud['ms']:.2f} ms / {chaud['requetes']} en cache, "
+                    f"{apres['ms']:.2f} ms / {apres['requetes']} après une réservation"
+                )
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(f'❌ {violation}'))
+            if not violations:
+                self.stdout.write(self.style.SUCCESS('✅ Fragments servis en cache et invalidés au plus juste'))
+
+        if options['verifier'] and violations:
+            raise CommandError('Fragments: ' + '; '.join(violations))
+
+    def mesurer(self, requetes, repetitions, avant_rendu=None):
+        resultats = {}
+        for nom, (vue, requete, kwargs) in requetes.items():
+            vue(requete, **kwargs)  # préchauffage (et mise en cache)
+            compteur = Compteur()
+            duree = 0
+            for _ in range(repetitions):
+                if avant_rendu is not None:
+                    avant_rendu()
+                with ExitStack() as pile:
+                    for alias in connections:
+                        pile.enter_context(connections[alias].execute_wrapper(compteur))
+                    debut = time.perf_counter()
+                    reponse = vue(requete, **kwargs)
+                    duree += time.perf_counter() - debut
+                if reponse.status_code != 200:
+                    raise CommandError(f'{nom}: statut {reponse.status_code}')
+            resultats[nom] = {
+                'requetes': compteur.requetes // repetitions,
+                'ms': duree * 1000 / repetitions,
+            }
+        return resultats
+
+    def verifier(self, resultats):
+        violations = []
+        for nom, chaud in resultats['cache_chaud'].items():
+            if chaud['requetes'] >= resultats['sans_cache'][nom]['requetes']:
+                violations.append(f"{nom}: {chaud['requetes']} requêtes en cache, autant que sans cache")
+        # Une réservation ne concerne pas l'autre praticien: sa page reste en cache
+        autre = resultats['apres_reservation']['planning autre praticien']
+        if autre['requetes'] > resultats['cache_chaud']['planning autre praticien']['requetes']:
+            violations.append("planning autre praticien: recalculé après une réservation qui ne le concerne pas")
+        # ... mais celles du praticien et du patient réservés sont recalculées
+        for nom in ('dashboard praticien', 'dashboard patient', 'planning', 'dashboard admin'):
+            if resultats['apres_reservation'][nom]['requetes'] <= resultats['cache_chaud'][nom]['requetes']:
+                violations.append(f"{nom}: pas recalculé après une réservation qui le concerne")
+        return violations
@@ -0,0 +1,189 @@
+import json
+import random
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from rdv_app import views
+from rdv_app.models import Annulation, Patient, Praticien, Rappel, RendezVous, User
+from rdv_app.recherche import texte_recherche
+
+# Gabarits de mesure: chaque ligne affiche ce qu'affiche une liste (patient, praticien...),
+# ce qui déclenche les chargements paresseux s'ils ne sont pas faits par la vue.
+# Les gabarits de l'application, s'ils existent, sont utilisés en priorité.
+GABARITS = {
+    'rdv_app/rendez_vous/list.html': (
+        '{% for rdv in rendez_vous_list %}{{ rdv.date_heure }} {{ rdv.patient }} {{ rdv.praticien }} '
+        '{{ rdv.get_statut_display }}\n{% endfor %}{{ curseur_suivant }}'
+    ),
+    'rdv_app/patients/list.html': (
+        '{% for patient in patients %}{{ patient }} {{ patient.user.email }} {{ patient.telephone }} '
+        '{{ patient.nb_rdv }}\n{% endfor %}{{ curseur_suivant }}'
+    ),
+    'rdv_app/praticiens/list.html': (
+        '{% for praticien in praticiens %}{{ praticien }} {{ praticien.user.email }} {{ praticien.actif }}\n'
+        '{% endfor %}{{ page_obj.number }}/{{ page_obj.paginator.num_pages }}'
+        '{% for specialite in specialites %}{{ specialite }}{% endfor %}'
+    ),
+    'rdv_app/annulations/list.html': (
+        '{% for annulation in annulations %}{{ annulation.date_demande }} {{ annulation.rdv }} '
+        '{{ annulation.get_statut_display }}\n{% endfor %}{{ curseur_suivant }}'
+    ),
+    'rdv_app/rappels/list.html': (
+        '{% for rappel in rappels %}{{ rappel.date_envoi_prevue }} {{ rappel.rdv.patient }} '
+        '{{ rappel.rdv.praticien }} {{ rappel.envoye }}\n{% endfor %}{{ curseur_suivant }}'
+    ),
+}
+
+LISTES = [
+    ('rendez_vous_list', views.rendez_vous_list, {}),
+    ('patients_list', views.patients_list, {}),
+    ('praticiens_list', views.praticiens_list, {}),
+    ('annulations_list', views.annulations_list, {'statut': 'en_attente'}),
+    ('rappels_list', views.rappels_list, {}),
+]
+
+
+def gabarits_de_mesure(gabarits):
+    """Gabarits de l'application s'ils existent, sinon ceux de mesure (override_settings)"""
+    return override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'loaders': [
+            'django.template.loaders.app_directories.Loader',
+            ('django.template.loaders.locmem.Loader', gabarits),
+        ]},
+    }])
+
+
+def creer_donnees(lignes):
+    """Patients, rendez-vous, annulations et rappels synthétiques (bulk_create)"""
+    random.seed(0)
+    maintenant = timezone.now()
+    mot_de_passe = make_password(None)
+    users = User.objects.bulk_create([
+        User(username=f'mesure_listes_{i}', email=f'mesure_listes_{i}@example.com', role='patient',
+             first_name=random.choice(['Marie', 'Jean', 'Sophie', 'Luc']), last_name=f'Mesure{i}',
+             password=mot_de_passe)
+        for i in range(lignes)
+    ], batch_size=1000)
+    patients = [
+        Patient(user=user, telephone='0600000000', adresse='-', date_naissance='1980-01-01')
+        for user in users
+    ]
+    for patient in patients:
+        patient.recherche = texte_recherche(patient)
+    patients = Patient.objects.bulk_create(patients, batch_size=1000)
+
+    praticiens = list(Praticien.objects.values_list('id', flat=True))
+    rdvs = RendezVous.objects.bulk_create([
+        RendezVous(
+            patient=patients[i], praticien_id=random.choice(praticiens), motif='Mesure',
+            date_heure=maintenant + timedelta(minutes=30 * random.randint(-20000, 20000)),
+        )
+        for i in range(lignes)
+    ], batch_size=1000)
+    Annulation.objects.bulk_create([Annulation(rdv=rdv, motif='Mesure') for rdv in rdvs], batch_size=1000)
+    Rappel.objects.bulk_create([
+        Rappel(rdv=rdv, date_envoi_prevue=rdv.date_heure - timedelta(hours=24)) for rdv in rdvs
+    ], batch_size=1000)
+    # Statistiques à jour: sinon le planificateur ignore les index sur ces lignes toutes neuves
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class Compteur:
+    """Requêtes SQL exécutées (connection.execute_wrapper)"""
+
+    def __init__(self):
+        self.requetes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.requetes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = ("Requêtes SQL et temps de rendu des listes HTML (rendez-vous, patients, praticiens, "
+            "annulations, rappels), sur les données actuelles puis avec N lignes de plus (annulées ensuite)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lignes', type=int, default=10000, help='Lignes ajoutées par table')
+        parser.add_argument('--repetitions', type=int, default=5)
+        parser.add_argument('--max-requetes', type=int, default=10, help='Requêtes au plus par page')
+        parser.add_argument('--verifier', action='store_true',
+                            help='Échoue si une page dépasse le budget ou fait plus de requêtes avec plus de lignes')
+        parser.add_argument('--json', action='store_true', help='Résultats en JSON')
+
+    def handle(self, *args, **options):
+        admin = User.objects.filter(role='admin', is_active=True).first()
+        if admin is None or not Praticien.objects.exists():
+            raise CommandError('Il faut un admin et des praticiens (manage.py create_sample_data)')
+
+        resultats = {}
+        with gabarits_de_mesure(GABARITS), transaction.atomic():
+            resultats['avant'] = self.mesurer_listes(admin, options['repetitions'])
+            creer_donnees(options['lignes'])
+            resultats['apres'] = self.mesurer_listes(admin, options['repetitions'])
+            # Données de mesure jamais validées
+            transaction.set_rollback(True)
+
+        violations = []
+        for nom, apres in resultats['apres'].items():
+            avant = resultats['avant'][nom]
+            if apres['requetes'] > options['max_requetes']:
+                violations.append(f"{nom}: {apres['requetes']} requêtes > {options['max_requetes']}")
+            if apres['requetes'] > avant['requetes']:
+                violations.append(f"{nom}: {avant['requetes']} -> {apres['requetes']} requêtes avec "
+                                  f"{options['lignes']} lignes de plus (N+1)")
+
+        if options['json']:
+            self.stdout.write(json.dumps({**resultats, 'violations': violations}, indent=2))
+        else:
+            for nom, apres in resultats['apres'].items():
+                avant = resultats['avant'][nom]
+                self.stdout.write(
+                    f"{nom}: {avant['lignes']} -> {apres['lignes']} lignes affichées, "
+                    f"{avant['requetes']} -> {apres['requetes']} requêtes, "
+                    f"{avant['ms']:.1f} -> {apres['ms']:.1f} ms"
+                )
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(f'❌ {violation}'))
+            if not violations:
+                self.stdout.write(self.style.SUCCESS(
+                    f"✅ Requêtes par page indépendantes de la taille des tables (+{options['lignes']} lignes)"
+                ))
+
+        if options['verifier'] and violations:
+            raise CommandError('Listes HTML: ' + '; '.join(violations))
+
+    def mesurer_listes(self, admin, repetitions):
+        factory = RequestFactory()
+        resultats = {}
+        for nom, vue, parametres in LISTES:
+            requete = factory.get(f'/{nom}/', parametres)
+            requete.user = admin
+            reponse = vue(requete)  # préchauffage
+            if reponse.status_code != 200:
+                raise CommandError(f'{nom}: statut {reponse.status_code}')
+            compteur = Compteur()
+            with ExitStack() as pile:
+                # execute_wrapper plutôt que CaptureQueriesContext, limité à 9000 requêtes
+                for alias in connections:
+                    pile.enter_context(connections[alias].execute_wrapper(compteur))
+                debut = time.perf_counter()
+                for _ in range(repetitions):
+                    reponse = vue(requete)
+                duree = time.perf_counter() - debut
+            resultats[nom] = {
+                'lignes': reponse.content.count(b'\n'),
+                'requetes': compteur.requetes // repetitions,
+                'ms': duree * 1000 / repetitions,
+            }
+        return resultats
@@ -0,0 +1,95 @@
+import logging
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from rdv_app.authentification import JWTCacheAuthentication, ajouter_claims
+from rdv_app.models import Patient, Praticien, User
+
+URLS = [
+    '/api/auth/user/',
+    '/api/praticiens/',
+    '/api/patients/',
+    '/api/rendez-vous/',
+    '/api/rappels/',
+    '/api/statistiques/',
+    '/api/praticiens/{praticien_id}/calendrier/',
+    '/api/patients/{patient_id}/calendrier/',
+]
+
+
+class Command(BaseCommand):
+    help = ("Requêtes SQL et temps par appel API, authentification simplejwt d'origine "
+            "contre JWTCacheAuthentication, pour un admin, un praticien et un patient")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repetitions', type=int, default=20)
+        parser.add_argument('--host', default='localhost', help='Nom d\'hôte (ALLOWED_HOSTS)')
+
+    def handle(self, *args, **options):
+        utilisateurs = [
+            User.objects.filter(role='admin', is_active=True).first(),
+            User.objects.filter(role='praticien', is_active=True, praticien_profile__isnull=False).first(),
+            User.objects.filter(role='patient', is_active=True, patient_profile__isnull=False).first(),
+        ]
+        if None in utilisateurs:
+            raise CommandError('Il faut un admin, un praticien et un patient (manage.py create_sample_data)')
+        ids = {
+            'praticien_id': Praticien.objects.values_list('id', flat=True).first(),
+            'patient_id': Patient.objects.values_list('id', flat=True).first(),
+        }
+
+        # Les 403 attendus (profil d'un autre utilisateur) ne sont pas des erreurs ici
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        total = {'simplejwt': 0, 'cache': 0}
+        for user in utilisateurs:
+            if hasattr(user, 'praticien_profile'):
+                ids_user = {**ids, 'praticien_id': user.praticien_profile.id}
+            elif hasattr(user, 'patient_profile'):
+                ids_user = {**ids, 'patient_id': user.patient_profile.id}
+            else:
+                ids_user = ids
+            client = APIClient(SERVER_NAME=options['host'])
+            jeton = ajouter_claims(RefreshToken.for_user(user), user).access_token
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {jeton}')
+
+            self.stdout.write(f'\n{user.username} ({user.role})')
+            for modele in URLS:
+                url = modele.format(**ids_user)
+                avant = self.mesurer(client, url, options['repetitions'], cache_actif=False)
+                apres = self.mesurer(client, url, options['repetitions'], cache_actif=True)
+                total['simplejwt'] += avant['requetes']
+                total['cache'] += apres['requetes']
+                self.stdout.write(
+                    f"  {url} [{apres['statut']}]: {avant['requetes']:.1f} -> {apres['requetes']:.1f} requêtes, "
+                    f"{avant['ms']:.1f} -> {apres['ms']:.1f} ms"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total['simplejwt'] - total['cache']:.0f} requêtes économisées "
+            f"sur {len(URLS) * len(utilisateurs)} appels ({total['simplejwt']:.0f} -> {total['cache']:.0f})"
+        ))
+
+    def mesurer(self, client, url, repetitions, cache_actif):
+        with ExitStack() as pile:
+            if not cache_actif:
+                # Comportement d'origine: utilisateur relu en base à chaque appel, profils à la demande
+                pile.enter_context(mock.patch.object(JWTCacheAuthentication, 'get_user', JWTAuthentication.get_user))
+            statut = client.get(url).status_code  # préchauffage (cache d'authentification, connexions)
+            contextes = [pile.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            debut = time.perf_counter()
+            for _ in range(repetitions):
+                client.get(url)
+            duree = time.perf_counter() - debut
+        return {
+            'statut': statut,
+            'requetes': sum(len(contexte.captured_queries) for contexte in contextes) / repetitions,
+            'ms': duree * 1000 / repetitions,
+        }
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rdv_app.models import RendezVous
+from rdv_app.rappels import synchroniser_rappels_lot
+
+
+class Command(BaseCommand):
+    help = 'Génère ou répare les rappels des rendez-vous à venir, par lots (reprise avec --depuis-id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rendez-vous traités par lot')
+        parser.add_argument('--depuis-id', type=int, default=0, help='Reprendre après cet id de rendez-vous')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dernier_id = options['depuis_id']
+        maintenant = timezone.now()
+        debut = time.perf_counter()
+        total_rdv = total_ecrits = total_supprimes = 0
+
+        while True:
+            # Parcours par clé primaire: chaque lot est indépendant et la commande
+            # peut être relancée à partir du dernier id affiché
+            rdvs = list(
+                RendezVous.objects.filter(id__gt=dernier_id, date_heure__gt=maintenant)
+                .order_by('id')
+                .only('id', 'date_heure', 'statut')[:batch_size]
+            )
+            if not rdvs:
+                break
+
+            ecrits, supprimes = synchroniser_rappels_lot(rdvs, maintenant)
+            dernier_id = rdvs[-1].id
+            total_rdv += len(rdvs)
+            total_ecrits += len(ecrits)
+            total_supprimes += len(supprimes)
+            self.stdout.write(f'{total_rdv} rendez-vous traités (dernier id: {dernier_id})')
+
+        duree = time.perf_counter() - debut
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total_rdv} rendez-vous en {duree:.2f}s: '
+            f'{total_ecrits} rappels créés ou déplacés, {total_supprimes} supprimés'
+        ))
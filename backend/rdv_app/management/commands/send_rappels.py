@@ -0,0 +1,64 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from rdv_app.notifications import get_backend
+from rdv_app.planificateur import PlanificateurRappels
+from rdv_app.rappels import envoyer_rappels_dus, rappels_dus
+
+
+class Command(BaseCommand):
+    help = 'Envoie les rappels dus (par lots), une fois ou en boucle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rappels réclamés par transaction')
+        parser.add_argument('--boucle', action='store_true', help='Tourner en continu (worker)')
+        parser.add_argument('--intervalle', type=float, default=30, help='Pause en secondes quand il n\'y a plus rien à envoyer')
+        parser.add_argument('--backend', help='Chemin du backend (défaut: RDV_NOTIFICATIONS)')
+        parser.add_argument('--planificateur', action='store_true', help='Envoi à l\'heure via le planificateur en mémoire')
+        parser.add_argument('--fenetre', type=int, default=60, help='Planificateur: fenêtre chargée en minutes')
+        parser.add_argument('--suivi', type=float, default=5,
+                            help='Planificateur: secondes entre deux lectures des rappels créés ou déplacés ailleurs')
+
+    def handle(self, *args, **options):
+        backend = get_backend(options['backend'])
+        batch_size = options['batch_size']
+        total = 0
+        debut = time.perf_counter()
+
+        if options['planificateur']:
+            planificateur = PlanificateurRappels(
+                backend,
+                fenetre=timedelta(minutes=options['fenetre']),
+                batch_size=batch_size,
+                suivi=timedelta(seconds=options['suivi']),
+            )
+            try:
+                planificateur.executer()
+            except KeyboardInterrupt:
+                planificateur.arreter()
+            finally:
+                backend.fermer()
+            self.stdout.write(self.style.SUCCESS(f'✅ {planificateur.envoyes} rappels envoyés'))
+            return
+
+        try:
+            while True:
+                envoyes = envoyer_rappels_dus(backend, batch_size=batch_size)
+                total += envoyes
+                # Un lot incomplet n'indique pas la fin (rappels abandonnés, faute de coordonnées):
+                # s'arrêter quand il ne reste plus rien à réserver
+                if envoyes < batch_size and not rappels_dus().exists():
+                    if not options['boucle']:
+                        break
+                    time.sleep(options['intervalle'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            backend.fermer()
+
+        duree = time.perf_counter() - debut
+        debit = total / duree if duree > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total} rappels envoyés en {duree:.2f}s ({debit:.0f} rappels/s)'
+        ))
@@ -0,0 +1,50 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .routers import activer, desactiver, marquer_ecriture, replica_configuree
+
+METHODES_LECTURE = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaMiddleware:
+    """Route les lectures des vues opt-in vers la réplique (rdv_app.routers)
+
+    Les écritures réussies (POST, PUT, PATCH, DELETE) gardent ensuite
+    l'utilisateur sur le primaire pendant RDV_REPLICA_STICKY secondes.
+    Compatible WSGI et ASGI (pas de bascule de thread pour les vues async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            desactiver()
+        return self.apres_reponse(request, response)
+
+    async def __acall__(self, request):
+        try:
+            response = await self.get_response(request)
+        finally:
+            desactiver()
+        return self.apres_reponse(request, response)
+
+    def apres_reponse(self, request, response):
+        if request.method not in METHODES_LECTURE and response.status_code < 400 and replica_configuree():
+            marquer_ecriture(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or not replica_configuree():
+            return None
+        vue = getattr(view_func, 'cls', view_func)  # ViewSet / APIView: classe portée par as_view()
+        if getattr(view_func, 'lecture_replica', False) or getattr(vue, 'lecture_replica', False):
+            activer(request)
+        return None
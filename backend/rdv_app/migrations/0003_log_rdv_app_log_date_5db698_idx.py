@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0002_alter_log_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='log',
+            index=models.Index(fields=['date'], name='rdv_app_log_date_5db698_idx'),
+        ),
+    ]
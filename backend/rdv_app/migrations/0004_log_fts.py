@@ -0,0 +1,105 @@
+from django.db import migrations
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE rdv_app_log_fts USING fts5(
+        action, details, table_cible, user_nom,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER rdv_app_log_fts_ai AFTER INSERT ON rdv_app_log BEGIN
+        INSERT INTO rdv_app_log_fts(rowid, action, details, table_cible, user_nom)
+        SELECT new.id, new.action, new.details, new.table_cible,
+               COALESCE((SELECT first_name || ' ' || last_name || ' ' || username
+                         FROM rdv_app_user WHERE id = new.user_id), '');
+    END
+    """,
+    """
+    CREATE TRIGGER rdv_app_log_fts_ad AFTER DELETE ON rdv_app_log BEGIN
+        DELETE FROM rdv_app_log_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    INSERT INTO rdv_app_log_fts(rowid, action, details, table_cible, user_nom)
+    SELECT l.id, l.action, l.details, l.table_cible,
+           COALESCE(u.first_name || ' ' || u.last_name || ' ' || u.username, '')
+    FROM rdv_app_log l LEFT JOIN rdv_app_user u ON u.id = l.user_id
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS rdv_app_log_fts_ad",
+    "DROP TRIGGER IF EXISTS rdv_app_log_fts_ai",
+    "DROP TABLE IF EXISTS rdv_app_log_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE TABLE rdv_app_log_fts (
+        log_id bigint PRIMARY KEY REFERENCES rdv_app_log(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL
+    )
+    """,
+    "CREATE INDEX rdv_app_log_fts_document_idx ON rdv_app_log_fts USING GIN (document)",
+    """
+    CREATE FUNCTION rdv_app_log_fts_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO rdv_app_log_fts(log_id, document)
+        SELECT NEW.id,
+               to_tsvector('french', concat_ws(' ', NEW.action, NEW.details, NEW.table_cible,
+                   (SELECT concat_ws(' ', first_name, last_name, username) FROM rdv_app_user WHERE id = NEW.user_id)));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER rdv_app_log_fts_ai AFTER INSERT ON rdv_app_log
+    FOR EACH ROW EXECUTE FUNCTION rdv_app_log_fts_insert()
+    """,
+    """
+    INSERT INTO rdv_app_log_fts(log_id, document)
+    SELECT l.id, to_tsvector('french', concat_ws(' ', l.action, l.details, l.table_cible,
+                                     u.first_name, u.last_name, u.username))
+    FROM rdv_app_log l LEFT JOIN rdv_app_user u ON u.id = l.user_id
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER IF EXISTS rdv_app_log_fts_ai ON rdv_app_log",
+    "DROP FUNCTION IF EXISTS rdv_app_log_fts_insert()",
+    "DROP TABLE IF EXISTS rdv_app_log_fts",
+]
+
+
+def _executer(schema_editor, requetes):
+    for requete in requetes:
+        schema_editor.execute(requete)
+
+
+def creer_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _executer(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'postgresql':
+        _executer(schema_editor, POSTGRESQL_FORWARD)
+
+
+def supprimer_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _executer(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'postgresql':
+        _executer(schema_editor, POSTGRESQL_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0003_log_rdv_app_log_date_5db698_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
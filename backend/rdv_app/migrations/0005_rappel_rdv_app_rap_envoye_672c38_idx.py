@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0004_log_fts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rappel',
+            index=models.Index(fields=['envoye', 'date_envoi_prevue'], name='rdv_app_rap_envoye_672c38_idx'),
+        ),
+    ]
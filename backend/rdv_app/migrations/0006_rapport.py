@@ -0,0 +1,36 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0005_rappel_rdv_app_rap_envoye_672c38_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rapport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cle', models.CharField(db_index=True, help_text='Empreinte des paramètres et des données', max_length=64)),
+                ('parametres', models.JSONField(default=dict)),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('erreur', 'Erreur')], default='en_attente', max_length=20)),
+                ('progression', models.PositiveSmallIntegerField(default=0)),
+                ('nb_lignes', models.IntegerField(default=0)),
+                ('fichier', models.FileField(blank=True, null=True, upload_to='rapports/')),
+                ('erreur', models.TextField(blank=True)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+                ('demandeur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Rapport',
+                'verbose_name_plural': 'Rapports',
+                'ordering': ['-date_creation'],
+            },
+        ),
+    ]
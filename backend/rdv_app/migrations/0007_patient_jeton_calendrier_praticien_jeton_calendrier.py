@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 16:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0006_rapport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='jeton_calendrier',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='praticien',
+            name='jeton_calendrier',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:31
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+TABLES = ['rdv_app_patient', 'rdv_app_praticien']
+
+
+def _sqlite_forward(table):
+    fts = f'{table}_fts'
+    return [
+        # Table externe: le texte reste dans {table}.recherche, FTS5 ne garde que l'index
+        f"""
+        CREATE VIRTUAL TABLE {fts} USING fts5(
+            recherche, content='{table}', content_rowid='id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, recherche) VALUES (new.id, new.recherche);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, recherche) VALUES ('delete', old.id, old.recherche);
+        END
+        """,
+        f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF recherche ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, recherche) VALUES ('delete', old.id, old.recherche);
+            INSERT INTO {fts}(rowid, recherche) VALUES (new.id, new.recherche);
+        END
+        """,
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _sqlite_backward(table):
+    fts = f'{table}_fts'
+    return [
+        f"DROP TRIGGER IF EXISTS {fts}_au",
+        f"DROP TRIGGER IF EXISTS {fts}_ad",
+        f"DROP TRIGGER IF EXISTS {fts}_ai",
+        f"DROP TABLE IF EXISTS {fts}",
+    ]
+
+
+def _postgresql_forward(table):
+    # Configuration 'simple': pas de racinisation ni de mots vides, adaptée aux noms propres
+    return [f"CREATE INDEX {table}_recherche_fts ON {table} USING GIN (to_tsvector('simple', recherche))"]
+
+
+def _postgresql_backward(table):
+    return [f"DROP INDEX IF EXISTS {table}_recherche_fts"]
+
+
+# Copie de rdv_app.recherche au moment de la migration: le module peut évoluer, pas cette migration
+MOT_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def normaliser(texte):
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' '.join(MOT_RE.findall(texte))
+
+
+def texte_recherche(profil):
+    user = profil.user
+    parties = [user.first_name, user.last_name, re.sub(r'\D', '', profil.telephone or '')]
+    specialite = getattr(profil, 'specialite', None)
+    parties.append(user.email if specialite is None else specialite)
+    return normaliser(' '.join(parties))[:255]
+
+
+def remplir(apps, schema_editor):
+    for nom in ('Patient', 'Praticien'):
+        modele = apps.get_model('rdv_app', nom)
+        profils = []
+        for profil in modele.objects.select_related('user').order_by('id').iterator(chunk_size=1000):
+            profil.recherche = texte_recherche(profil)
+            profils.append(profil)
+            if len(profils) >= 1000:
+                modele.objects.bulk_update(profils, ['recherche'])
+                profils = []
+        if profils:
+            modele.objects.bulk_update(profils, ['recherche'])
+
+
+def creer_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'sqlite':
+            requetes = _sqlite_forward(table)
+        elif vendor == 'postgresql':
+            requetes = _postgresql_forward(table)
+        else:
+            requetes = []
+        for requete in requetes:
+            schema_editor.execute(requete)
+
+
+def supprimer_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for table in TABLES:
+        if vendor == 'sqlite':
+            requetes = _sqlite_backward(table)
+        elif vendor == 'postgresql':
+            requetes = _postgresql_backward(table)
+        else:
+            requetes = []
+        for requete in requetes:
+            schema_editor.execute(requete)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0007_patient_jeton_calendrier_praticien_jeton_calendrier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='recherche',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Nom, téléphone et email normalisés (rdv_app.recherche)', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='praticien',
+            name='recherche',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Nom, téléphone et spécialité normalisés (rdv_app.recherche)', max_length=255),
+        ),
+        migrations.RunPython(remplir, migrations.RunPython.noop),
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.1 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('rdv_app', '0008_patient_recherche_praticien_recherche'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='annulation',
+            index=models.Index(fields=['statut', 'date_demande'], name='rdv_app_ann_statut_21d8e2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rappel',
+            index=models.Index(fields=['date_envoi_prevue'], name='rdv_app_rap_date_en_485f7b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['date_heure'], name='rdv_app_ren_date_he_95668d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['praticien', 'date_heure'], name='rdv_app_ren_pratici_69b109_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rendezvous',
+            index=models.Index(fields=['patient', 'date_heure'], name='rdv_app_ren_patient_f86860_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name', 'first_name'], name='rdv_app_use_last_na_987409_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations
+
+# Index des logs PostgreSQL aligné sur SQLite (unicode61 remove_diacritics): configuration
+# 'simple' (ni racinisation ni mots vides) sur le texte sans accents. translate() plutôt que
+# l'extension unaccent, qui n'est pas toujours installée (contrib) ni créable sans superutilisateur.
+ACCENTS = 'àáâãäåāăąçćčďèéêëēėęěìíîïīįłñńňòóôõöøōőŕřśšşťùúûüūůűųýÿźżž'
+SANS_ACCENTS = 'aaaaaaaaacccdeeeeeeeeiiiiiilnnnoooooooorrssstuuuuuuuuyyzzz'
+
+FONCTION = f"""
+    CREATE OR REPLACE FUNCTION rdv_app_sans_accents(texte text) RETURNS text AS $$
+        SELECT translate(replace(replace(lower(texte), 'œ', 'oe'), 'æ', 'ae'), '{ACCENTS}', '{SANS_ACCENTS}')
+    $$ LANGUAGE sql IMMUTABLE
+"""
+
+
+def _insertion(config, texte):
+    return f"""
+    CREATE OR REPLACE FUNCTION rdv_app_log_fts_insert() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO rdv_app_log_fts(log_id, document)
+        SELECT NEW.id,
+               to_tsvector('{config}', {texte.format("concat_ws(' ', NEW.action, NEW.details, NEW.table_cible, "
+                                                    "(SELECT concat_ws(' ', first_name, last_name, username) "
+                                                    "FROM rdv_app_user WHERE id = NEW.user_id))")});
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """
+
+
+def _reindexation(config, texte):
+    return f"""
+    UPDATE rdv_app_log_fts f
+    SET document = to_tsvector('{config}', {texte.format("concat_ws(' ', l.action, l.details, l.table_cible, "
+                                                        "u.first_name, u.last_name, u.username)")})
+    FROM rdv_app_log l LEFT JOIN rdv_app_user u ON u.id = l.user_id
+    WHERE f.log_id = l.id
+    """
+
+
+POSTGRESQL_FORWARD = [
+    FONCTION,
+    _insertion('simple', 'rdv_app_sans_accents({})'),
+    _reindexation('simple', 'rdv_app_sans_accents({})'),
+]
+
+POSTGRESQL_BACKWARD = [
+    _insertion('french', '{}'),
+    _reindexation('french', '{}'),
+    "DROP FUNCTION IF EXISTS rdv_app_sans_accents(text)",
+]
+
+
+def _executer(schema_editor, requetes):
+    if schema_editor.connection.vendor == 'postgresql':
+        for requete in requetes:
+            schema_editor.execute(requete)
+
+
+def creer_index(apps, schema_editor):
+    _executer(schema_editor, POSTGRESQL_FORWARD)
+
+
+def supprimer_index(apps, schema_editor):
+    _executer(schema_editor, POSTGRESQL_BACKWARD)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0009_annulation_rdv_app_ann_statut_21d8e2_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(creer_index, supprimer_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0010_log_fts_sans_accents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rappel',
+            name='echec',
+            field=models.CharField(blank=True, help_text="Raison de l'abandon (rappel non envoyable)", max_length=100),
+        ),
+        migrations.AddField(
+            model_name='rappel',
+            name='reserve_jusqu_a',
+            field=models.DateTimeField(blank=True, help_text="Réservé par un worker d'envoi jusqu'à cette date", null=True),
+        ),
+    ]
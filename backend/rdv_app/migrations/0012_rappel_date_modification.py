@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0011_rappel_reserve_jusqu_a_echec'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rappel',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0012_rappel_date_modification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rapport',
+            name='date_maj',
+            field=models.DateTimeField(auto_now=True, help_text='Dernière nouvelle du worker (statut, progression)'),
+        ),
+    ]
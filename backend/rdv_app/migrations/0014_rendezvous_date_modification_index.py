@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-19 18:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rdv_app', '0013_rapport_date_maj'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rendezvous',
+            name='date_modification',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import secrets
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
@@ -22,6 +24,9 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'Utilisateur'
         verbose_name_plural = 'Utilisateurs'
+        indexes = [
+            models.Index(fields=['last_name', 'first_name']),
+        ]
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.get_role_display()})"
@@ -43,6 +48,9 @@ class Praticien(models.Model):
     telephone = models.CharField(max_length=15)
     photo = models.ImageField(upload_to='praticiens/', blank=True, null=True)
     actif = models.BooleanField(default=True)
+    jeton_calendrier = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)
+    recherche = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                 help_text="Nom, téléphone et spécialité normalisés (rdv_app.recherche)")
     date_creation = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -62,6 +70,13 @@ class Praticien(models.Model):
         ).exists()
         return self.actif and not indispo
 
+    def get_jeton_calendrier(self, regenerer=False):
+        """Jeton secret du flux iCalendar (créé à la première demande)"""
+        if regenerer or not self.jeton_calendrier:
+            self.jeton_calendrier = secrets.token_urlsafe(32)
+            self.save(update_fields=['jeton_calendrier'])
+        return self.jeton_calendrier
+
 
 class HorairePraticien(models.Model):
     """Horaires de consultation"""
@@ -120,6 +135,9 @@ class Patient(models.Model):
     adresse = models.TextField()
     date_naissance = models.DateField()
     photo = models.ImageField(upload_to='patients/', blank=True, null=True)
+    jeton_calendrier = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)
+    recherche = models.CharField(max_length=255, blank=True, default='', editable=False,
+                                 help_text="Nom, téléphone et email normalisés (rdv_app.recherche)")
     date_creation = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -137,6 +155,13 @@ class Patient(models.Model):
             age -= 1
         return age
 
+    def get_jeton_calendrier(self, regenerer=False):
+        """Jeton secret du flux iCalendar (créé à la première demande)"""
+        if regenerer or not self.jeton_calendrier:
+            self.jeton_calendrier = secrets.token_urlsafe(32)
+            self.save(update_fields=['jeton_calendrier'])
+        return self.jeton_calendrier
+
 
 class RendezVous(models.Model):
     """Rendez-vous"""
@@ -154,12 +179,19 @@ class RendezVous(models.Model):
     statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
     notes = models.TextField(blank=True, help_text="Notes internes (praticien/admin)")
     date_creation = models.DateTimeField(auto_now_add=True)
-    date_modification = models.DateTimeField(auto_now=True)
+    # Annulations et reports relus par le planificateur d'envoi (rdv_app.planificateur)
+    date_modification = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = 'Rendez-vous'
         verbose_name_plural = 'Rendez-vous'
         ordering = ['-date_heure']
+        # Listes paginées par curseur sur (date_heure, id), globales ou par praticien/patient
+        indexes = [
+            models.Index(fields=['date_heure']),
+            models.Index(fields=['praticien', 'date_heure']),
+            models.Index(fields=['patient', 'date_heure']),
+        ]
     
     def __str__(self):
         return f"{self.patient.user.get_full_name()} - {self.praticien.user.get_full_name()} - {self.date_heure.strftime('%d/%m/%Y %H:%M')}"
@@ -187,6 +219,9 @@ class Annulation(models.Model):
         verbose_name = 'Annulation'
         verbose_name_plural = 'Annulations'
         ordering = ['-date_demande']
+        indexes = [
+            models.Index(fields=['statut', 'date_demande']),
+        ]
     
     def __str__(self):
         return f"Annulation RDV #{self.rdv.id} - {self.get_statut_display()}"
@@ -204,11 +239,21 @@ class Rappel(models.Model):
     type_rappel = models.CharField(max_length=10, choices=TYPE_CHOICES, default='24h')
     envoye = models.BooleanField(default=False)
     date_envoi_effectif = models.DateTimeField(blank=True, null=True)
+    reserve_jusqu_a = models.DateTimeField(
+        blank=True, null=True, help_text="Réservé par un worker d'envoi jusqu'à cette date"
+    )
+    echec = models.CharField(max_length=100, blank=True, help_text='Raison de l\'abandon (rappel non envoyable)')
+    # Journal des modifications lu par le planificateur d'envoi (rdv_app.planificateur)
+    date_modification = models.DateTimeField(auto_now=True, db_index=True)
     
     class Meta:
         verbose_name = 'Rappel'
         verbose_name_plural = 'Rappels'
         ordering = ['-date_envoi_prevue']
+        indexes = [
+            models.Index(fields=['envoye', 'date_envoi_prevue']),
+            models.Index(fields=['date_envoi_prevue']),
+        ]
     
     def __str__(self):
         return f"Rappel {self.get_type_rappel_display()} - RDV #{self.rdv.id}"
@@ -221,14 +266,47 @@ class Log(models.Model):
     details = models.TextField(blank=True)
     table_cible = models.CharField(max_length=50, blank=True)
     cible_id = models.IntegerField(blank=True, null=True)
-    date = models.DateTimeField(auto_now_add=True)
+    date = models.DateTimeField(default=timezone.now)
     ip_address = models.GenericIPAddressField(blank=True, null=True)
     
     class Meta:
         verbose_name = 'Log'
         verbose_name_plural = 'Logs'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
     
     def __str__(self):
         return f"{self.date.strftime('%d/%m/%Y %H:%M')} - {self.action} - {self.user}"
 
+
+
+class Rapport(models.Model):
+    """Rapports générés en arrière-plan"""
+    STATUT_CHOICES = [
+        ('en_attente', 'En attente'),
+        ('en_cours', 'En cours'),
+        ('termine', 'Terminé'),
+        ('erreur', 'Erreur'),
+    ]
+    
+    cle = models.CharField(max_length=64, db_index=True, help_text="Empreinte des paramètres et des données")
+    parametres = models.JSONField(default=dict)
+    statut = models.CharField(max_length=20, choices=STATUT_CHOICES, default='en_attente')
+    progression = models.PositiveSmallIntegerField(default=0)
+    nb_lignes = models.IntegerField(default=0)
+    fichier = models.FileField(upload_to='rapports/', blank=True, null=True)
+    erreur = models.TextField(blank=True)
+    demandeur = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_maj = models.DateTimeField(auto_now=True, help_text='Dernière nouvelle du worker (statut, progression)')
+    date_fin = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        verbose_name = 'Rapport'
+        verbose_name_plural = 'Rapports'
+        ordering = ['-date_creation']
+    
+    def __str__(self):
+        return f"Rapport #{self.id} - {self.get_statut_display()}"
@@ -0,0 +1,217 @@
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('rdv_app')
+
+
+class Message:
+    """Notification à envoyer à un patient"""
+    __slots__ = ['rappel_id', 'email', 'telephone', 'sujet', 'texte']
+
+    def __init__(self, rappel_id, email, telephone, sujet, texte):
+        self.rappel_id = rappel_id
+        self.email = email
+        self.telephone = telephone
+        self.sujet = sujet
+        self.texte = texte
+
+    def __repr__(self):
+        return f"<Message rappel #{self.rappel_id} -> {self.email or self.telephone}>"
+
+
+class BaseBackend:
+    """Backend d'envoi: envoyer() retourne les messages effectivement envoyés"""
+
+    def envoyer(self, messages):
+        raise NotImplementedError
+
+    def peut_envoyer(self, message):
+        """Le message a une coordonnée utilisable par ce backend"""
+        return bool(message.email or message.telephone)
+
+    def fermer(self):
+        pass
+
+
+class PooledBackend(BaseBackend):
+    """Backend avec pool de connexions, envois par lots et concurrence bornée
+
+    Les messages sont découpés en lots de `taille_lot`; chaque lot est envoyé
+    sur une seule connexion prise dans le pool. Au plus `concurrence`
+    connexions sont ouvertes et utilisées en parallèle.
+    """
+
+    def __init__(self, concurrence=4, taille_lot=100):
+        self.concurrence = concurrence
+        self.taille_lot = taille_lot
+        self._pool = queue.LifoQueue()
+        self._places = threading.BoundedSemaphore(concurrence)
+        self._executor = None
+        self._lock = threading.Lock()
+        self.connexions_ouvertes = 0
+
+    def ouvrir_connexion(self):
+        raise NotImplementedError
+
+    def fermer_connexion(self, connexion):
+        pass
+
+    def envoyer_lot(self, connexion, messages):
+        """Envoie un lot sur une connexion, retourne les messages envoyés"""
+        raise NotImplementedError
+
+    def envoyer(self, messages):
+        messages = list(messages)
+        lots = [messages[i:i + self.taille_lot] for i in range(0, len(messages), self.taille_lot)]
+        if len(lots) <= 1 or self.concurrence <= 1:
+            resultats = [self._envoyer_lot(lot) for lot in lots]
+        else:
+            resultats = list(self._get_executor().map(self._envoyer_lot, lots))
+        return [message for envoyes in resultats for message in envoyes]
+
+    def fermer(self):
+        """Ferme les connexions du pool et les threads d'envoi"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        while True:
+            try:
+                self.fermer_connexion(self._pool.get_nowait())
+            except queue.Empty:
+                break
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.concurrence,
+                        thread_name_prefix=type(self).__name__,
+                    )
+        return self._executor
+
+    def _envoyer_lot(self, lot):
+        with self._places:
+            try:
+                connexion = self._pool.get_nowait()
+            except queue.Empty:
+                connexion = self.ouvrir_connexion()
+                with self._lock:
+                    self.connexions_ouvertes += 1
+            try:
+                envoyes = self.envoyer_lot(connexion, lot)
+            except Exception as e:
+                # Connexion suspecte: on la jette, le lot sera retenté au prochain passage
+                logger.error("Erreur d'envoi (%s, %d messages): %s", type(self).__name__, len(lot), e)
+                self.fermer_connexion(connexion)
+                return []
+            self._pool.put(connexion)
+            return envoyes
+
+
+class MemoireBackend(PooledBackend):
+    """Garde les derniers messages en mémoire (tests, benchmarks)
+
+    `latence_ms` simule l'aller-retour réseau d'un lot. La boîte est bornée: un
+    worker qui tourne longtemps avec ce backend ne retient que les BOITE_MAX derniers.
+    """
+    BOITE_MAX = 10000
+    boite = deque(maxlen=BOITE_MAX)
+    _boite_lock = threading.Lock()
+
+    def __init__(self, latence_ms=0, **kwargs):
+        super().__init__(**kwargs)
+        self.latence = latence_ms / 1000
+
+    def ouvrir_connexion(self):
+        return object()
+
+    def envoyer_lot(self, connexion, messages):
+        if self.latence:
+            time.sleep(self.latence)
+        with MemoireBackend._boite_lock:
+            MemoireBackend.boite.extend(messages)
+        return list(messages)
+
+
+class FichierBackend(PooledBackend):
+    """Écrit les messages en JSON Lines dans un fichier (développement, benchmarks)"""
+
+    def __init__(self, chemin=None, **kwargs):
+        super().__init__(**kwargs)
+        self.chemin = Path(chemin or Path(settings.BASE_DIR) / 'notifications.jsonl')
+        self._fichier_lock = threading.Lock()
+
+    def ouvrir_connexion(self):
+        return None
+
+    def envoyer_lot(self, connexion, messages):
+        lignes = ''.join(
+            json.dumps({champ: getattr(message, champ) for champ in Message.__slots__}, ensure_ascii=False) + '\n'
+            for message in messages
+        )
+        with self._fichier_lock:
+            with open(self.chemin, 'a', encoding='utf-8') as fichier:
+                fichier.write(lignes)
+        return list(messages)
+
+
+class ConsoleBackend(BaseBackend):
+    """Affiche les messages sur la sortie standard (développement)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def envoyer(self, messages):
+        for message in messages:
+            self.stream.write(f"[{message.email or message.telephone}] {message.sujet}\n{message.texte}\n\n")
+        self.stream.flush()
+        return list(messages)
+
+
+class EmailBackend(PooledBackend):
+    """Envoi par email via le backend email de Django (connexions SMTP réutilisées)"""
+
+    def ouvrir_connexion(self):
+        from django.core.mail import get_connection
+        connexion = get_connection()
+        connexion.open()
+        return connexion
+
+    def fermer_connexion(self, connexion):
+        try:
+            connexion.close()
+        except Exception:
+            pass
+
+    def peut_envoyer(self, message):
+        return bool(message.email)
+
+    def envoyer_lot(self, connexion, messages):
+        from django.core.mail import EmailMessage
+
+        avec_email = [message for message in messages if message.email]
+        connexion.send_messages([
+            EmailMessage(message.sujet, message.texte, to=[message.email], connection=connexion)
+            for message in avec_email
+        ])
+        return avec_email
+
+
+def get_backend(chemin=None, **options):
+    """Instancie le backend configuré dans RDV_NOTIFICATIONS (BACKEND, OPTIONS)"""
+    config = getattr(settings, 'RDV_NOTIFICATIONS', {})
+    if chemin is None:
+        chemin = config.get('BACKEND', 'rdv_app.notifications.ConsoleBackend')
+        options = {**config.get('OPTIONS', {}), **options}
+    return import_string(chemin)(**options)
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import json
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+def get_config():
+    config = {
+        'TAILLE_PAGE': 50,
+        'TAILLE_MAX': 200,
+    }
+    config.update(getattr(settings, 'RDV_PAGINATION', {}))
+    return config
+
+
+def taille_page(request):
+    """?taille=, bornée par TAILLE_MAX"""
+    config = get_config()
+    try:
+        taille = int(request.GET.get('taille', config['TAILLE_PAGE']))
+    except ValueError:
+        taille = config['TAILLE_PAGE']
+    return min(max(taille, 1), config['TAILLE_MAX'])
+
+
+def parametres_sans(request, *noms):
+    """Paramètres GET de la page (filtres, recherche) pour les liens de pagination"""
+    parametres = request.GET.copy()
+    for nom in noms:
+        parametres.pop(nom, None)
+    return parametres.urlencode()
+
+
+def paginer(request, queryset):
+    """Pagination par numéro de page (?page=), pour les petites tables"""
+    return Paginator(queryset, taille_page(request)).get_page(request.GET.get('page'))
+
+
+def _valeur(objet, champ):
+    for attribut in champ.split('__'):
+        objet = getattr(objet, attribut)
+    return objet
+
+
+def _serialiser(valeur):
+    # isoformat complet: DjangoJSONEncoder tronque aux millisecondes, la page suivante sauterait des lignes
+    if isinstance(valeur, date):
+        return valeur.isoformat()
+    raise TypeError(f'Valeur de curseur non sérialisable: {valeur!r}')
+
+
+def _encoder_curseur(valeurs):
+    return base64.urlsafe_b64encode(json.dumps(valeurs, default=_serialiser).encode()).decode()
+
+
+def _decoder_curseur(curseur, nombre):
+    if not curseur:
+        return None
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+    except (ValueError, binascii.Error):
+        return None
+    if not isinstance(valeurs, list) or len(valeurs) != nombre:
+        return None
+    return valeurs
+
+
+def paginer_par_curseur(request, queryset, ordre):
+    """Pagination par curseur (?curseur=), pour les grandes tables
+
+    `ordre`: champs de tri non nuls, le dernier unique (ex. ['-date_heure', '-id']).
+    La page suivante reprend après la dernière ligne affichée (WHERE sur les champs
+    de tri) au lieu d'un OFFSET: son coût ne dépend pas de sa position dans la table.
+    Retourne (lignes, curseur_suivant).
+    """
+    taille = taille_page(request)
+    champs = [champ.lstrip('-') for champ in ordre]
+    queryset = queryset.order_by(*ordre)
+
+    valeurs = _decoder_curseur(request.GET.get('curseur'), len(champs))
+    if valeurs is not None:
+        # (a, b, c) "après" (x, y, z): a > x, ou a = x et b > y, ou a = x, b = y et c > z
+        condition = Q()
+        for i, (champ, sens) in enumerate(zip(champs, ordre)):
+            egalites = {champs[j]: valeurs[j] for j in range(i)}
+            lookup = 'lt' if sens.startswith('-') else 'gt'
+            condition |= Q(**egalites, **{f'{champ}__{lookup}': valeurs[i]})
+        try:
+            queryset = queryset.filter(condition)
+        except (ValidationError, ValueError, TypeError):
+            pass  # curseur altéré: première page
+
+    lignes = list(queryset[:taille + 1])
+    curseur_suivant = None
+    if len(lignes) > taille:
+        lignes = lignes[:taille]
+        curseur_suivant = _encoder_curseur([_valeur(lignes[-1], champ) for champ in champs])
+    return lignes, curseur_suivant
@@ -0,0 +1,209 @@
+import heapq
+import logging
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import Rappel, RendezVous
+from .notifications import get_backend
+from .rappels import STATUTS_ACTIFS, envoyer_rappels_dus
+
+logger = logging.getLogger('rdv_app')
+
+# Marge de relecture du journal des modifications: une transaction horodatée avant le
+# passage précédent peut n'avoir été validée qu'après
+MARGE_SUIVI = timedelta(minutes=1)
+
+
+class PlanificateurRappels:
+    """Planificateur en mémoire des rappels proches
+
+    Charge les rappels dus dans la fenêtre à venir (par défaut une heure)
+    dans un tas trié par date d'envoi et les déclenche à l'heure. Les rappels
+    créés ou déplacés par les autres process (réservations, reports) sont
+    relus toutes les `suivi` secondes via Rappel.date_modification (index):
+    un envoi part au plus `suivi` après son heure, quelle que soit la fenêtre.
+    Les rendez-vous modifiés (RendezVous.date_modification) retirent de la
+    mémoire leurs rappels supprimés (annulation, report).
+    """
+
+    def __init__(self, backend=None, fenetre=timedelta(hours=1), batch_size=500, suivi=timedelta(seconds=5)):
+        self.backend = backend or get_backend()
+        self.fenetre = fenetre
+        self.batch_size = batch_size
+        self.suivi = suivi
+        self.tas = []           # (date_envoi_prevue, rappel_id)
+        self.rappels = {}       # rappel_id -> date_envoi_prevue
+        self.rdv_de = {}        # rappel_id -> rdv_id
+        self.date_max = None    # filigrane: fenêtre chargée jusqu'à cette date
+        self.modifies_depuis = None  # filigrane du journal: dernier passage de suivre()
+        self.envoyes = 0
+        self._lock = threading.Lock()
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+
+    # Modifications (réservation, report, annulation)
+
+    def ajouter(self, rappel_id, date_envoi_prevue, rdv_id=None):
+        """Ajoute ou replanifie un rappel s'il tombe dans la fenêtre chargée"""
+        with self._lock:
+            if self.rappels.get(rappel_id) == date_envoi_prevue:
+                return
+            self._retirer(rappel_id)
+            if self.date_max is None or date_envoi_prevue > self.date_max:
+                return
+            self.rappels[rappel_id] = date_envoi_prevue
+            if rdv_id is not None:
+                self.rdv_de[rappel_id] = rdv_id
+            heapq.heappush(self.tas, (date_envoi_prevue, rappel_id))
+        self._reveil.set()
+
+    def retirer(self, rappel_id):
+        with self._lock:
+            self._retirer(rappel_id)
+            self._compacter()
+
+    def _retirer(self, rappel_id):
+        # Retrait paresseux: l'entrée reste dans le tas et sera ignorée
+        self.rappels.pop(rappel_id, None)
+        self.rdv_de.pop(rappel_id, None)
+
+    def _compacter(self):
+        # Reconstruire le tas quand il contient surtout des entrées obsolètes
+        if len(self.tas) > 2 * len(self.rappels) + 64:
+            self.tas = [(date, rappel_id) for rappel_id, date in self.rappels.items()]
+            heapq.heapify(self.tas)
+
+    def suivre(self, maintenant=None):
+        """Rappels créés, déplacés, envoyés ou abandonnés depuis le dernier passage, par tout process
+
+        Les rappels supprimés avec leur rendez-vous (suppression en base, sans
+        annulation) ne sont pas vus: leur entrée est écartée au déclenchement,
+        envoyer_rappels_dus revérifiant chaque rappel en base.
+        """
+        maintenant = maintenant or timezone.now()
+        depuis = self.modifies_depuis - MARGE_SUIVI
+        self.modifies_depuis = maintenant
+        modifies = Rappel.objects.filter(date_modification__gt=depuis).values_list(
+            'id', 'date_envoi_prevue', 'envoye', 'echec', 'rdv_id'
+        )
+        for rappel_id, date_envoi_prevue, envoye, echec, rdv_id in modifies:
+            if envoye or echec:
+                self.retirer(rappel_id)
+            else:
+                self.ajouter(rappel_id, date_envoi_prevue, rdv_id)
+        self._suivre_rdv(depuis)
+
+    def _suivre_rdv(self, depuis):
+        # Annulation ou report: synchroniser_rappels supprime des rappels, invisibles dans leur
+        # journal. Pour chaque rendez-vous modifié dont des rappels sont en mémoire, seuls
+        # restent ceux qui existent encore (non envoyés, rendez-vous actif).
+        rdv_ids = set(RendezVous.objects.filter(date_modification__gt=depuis).values_list('id', flat=True))
+        with self._lock:
+            en_memoire = {}
+            for rappel_id, rdv_id in self.rdv_de.items():
+                if rdv_id in rdv_ids:
+                    en_memoire.setdefault(rdv_id, set()).add(rappel_id)
+        if not en_memoire:
+            return
+        restants = set(Rappel.objects.filter(
+            rdv_id__in=en_memoire,
+            envoye=False,
+            echec='',
+            rdv__statut__in=STATUTS_ACTIFS,
+        ).values_list('id', flat=True))
+        for rappel_ids in en_memoire.values():
+            for rappel_id in rappel_ids - restants:
+                self.retirer(rappel_id)
+
+    # Chargement
+
+    def charger(self, maintenant=None):
+        """Recharge la fenêtre qui avance (le journal couvre la fenêtre déjà chargée)"""
+        maintenant = maintenant or timezone.now()
+        borne = maintenant + self.fenetre
+        rappels = Rappel.objects.filter(
+            envoye=False,
+            echec='',
+            rdv__date_heure__gt=maintenant,
+            rdv__statut__in=STATUTS_ACTIFS,
+        )
+        if self.date_max is None:
+            # Le journal part du premier chargement
+            self.modifies_depuis = maintenant
+            requetes = [rappels.filter(date_envoi_prevue__lte=borne)]
+        else:
+            requetes = [
+                rappels.filter(date_envoi_prevue__gt=self.date_max, date_envoi_prevue__lte=borne),
+                # Rappels en retard (envoi échoué): petit ensemble grâce à l'index (envoye, date)
+                rappels.filter(date_envoi_prevue__lte=maintenant),
+            ]
+
+        with self._lock:
+            self.date_max = borne
+        for requete in requetes:
+            for rappel_id, date_envoi_prevue, rdv_id in requete.values_list('id', 'date_envoi_prevue', 'rdv_id'):
+                self.ajouter(rappel_id, date_envoi_prevue, rdv_id)
+
+    # Déclenchement
+
+    def declencher(self, maintenant=None):
+        """Envoie les rappels arrivés à échéance, retourne leur nombre"""
+        maintenant = maintenant or timezone.now()
+        dus = []
+        with self._lock:
+            while self.tas and self.tas[0][0] <= maintenant:
+                date, rappel_id = heapq.heappop(self.tas)
+                if self.rappels.get(rappel_id) != date:
+                    continue  # retiré ou replanifié entre temps
+                self._retirer(rappel_id)
+                dus.append(rappel_id)
+
+        envoyes = 0
+        for i in range(0, len(dus), self.batch_size):
+            envoyes += envoyer_rappels_dus(
+                self.backend,
+                batch_size=self.batch_size,
+                maintenant=maintenant,
+                ids=dus[i:i + self.batch_size],
+            )
+        self.envoyes += envoyes
+        return envoyes
+
+    def prochaine_echeance(self):
+        with self._lock:
+            while self.tas and self.tas[0][1] not in self.rappels:
+                heapq.heappop(self.tas)
+            return self.tas[0][0] if self.tas else None
+
+    def executer(self):
+        """Boucle principale: dort jusqu'au prochain rappel, au prochain suivi ou rechargement"""
+        prochain_chargement = prochain_suivi = timezone.now()
+        while not self._arret.is_set():
+            maintenant = timezone.now()
+            try:
+                if maintenant >= prochain_chargement:
+                    close_old_connections()
+                    self.charger(maintenant)
+                    prochain_chargement = maintenant + self.fenetre / 2
+                if maintenant >= prochain_suivi:
+                    close_old_connections()
+                    self.suivre(maintenant)
+                    prochain_suivi = maintenant + self.suivi
+                self.declencher(maintenant)
+            except Exception as e:
+                logger.error("Erreur lors de l'envoi des rappels: %s", e)
+
+            echeances = [prochain_chargement, prochain_suivi]
+            prochaine = self.prochaine_echeance()
+            if prochaine is not None:
+                echeances.append(prochaine)
+            attente = (min(echeances) - timezone.now()).total_seconds()
+            self._reveil.wait(max(0, attente))
+            self._reveil.clear()
+
+    def arreter(self):
+        self._arret.set()
+        self._reveil.set()
@@ -0,0 +1,198 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Rappel
+from .notifications import Message, get_backend
+
+STATUTS_ACTIFS = ['en_attente', 'confirme']
+
+# Durée de réservation d'un lot par un worker: doit dépasser le temps d'envoi d'un lot,
+# sinon un autre worker le reprend et les rappels partent deux fois
+BAIL = timedelta(minutes=5)
+
+CHAMPS_MESSAGE = [
+    'id', 'rdv__date_heure', 'rdv__motif',
+    'rdv__patient__telephone', 'rdv__patient__user__email',
+    'rdv__patient__user__first_name', 'rdv__patient__user__last_name',
+    'rdv__praticien__civilite',
+    'rdv__praticien__user__first_name', 'rdv__praticien__user__last_name',
+]
+
+
+def construire_message(rappel):
+    """Message de rappel pour un patient"""
+    rdv = rappel.rdv
+    patient = rdv.patient
+    date_locale = timezone.localtime(rdv.date_heure)
+    return Message(
+        rappel_id=rappel.id,
+        email=patient.user.email,
+        telephone=patient.telephone,
+        sujet=f"Rappel: rendez-vous le {date_locale.strftime('%d/%m/%Y à %H:%M')}",
+        texte=(
+            f"Bonjour {patient.user.get_full_name()},\n\n"
+            f"Nous vous rappelons votre rendez-vous avec "
+            f"{rdv.praticien.get_civilite_display()} {rdv.praticien.user.get_full_name()} "
+            f"le {date_locale.strftime('%d/%m/%Y à %H:%M')}.\n"
+            f"Motif: {rdv.motif}"
+        ),
+    )
+
+
+def rappels_dus(maintenant=None):
+    """Rappels non envoyés dont la date d'envoi est passée, pour des RDV encore actifs
+
+    Sont exclus les rappels abandonnés (`echec`) et ceux réservés par un autre worker.
+    """
+    maintenant = maintenant or timezone.now()
+    return Rappel.objects.filter(
+        Q(reserve_jusqu_a__isnull=True) | Q(reserve_jusqu_a__lte=maintenant),
+        envoye=False,
+        echec='',
+        date_envoi_prevue__lte=maintenant,
+        rdv__date_heure__gt=maintenant,
+        rdv__statut__in=STATUTS_ACTIFS,
+    ).order_by('date_envoi_prevue')
+
+
+def _reclamer(limit, maintenant, ids=None):
+    rappels = rappels_dus(maintenant)
+    if ids is not None:
+        rappels = rappels.filter(id__in=ids)
+    features = connection.features
+    if features.has_select_for_update_skip_locked:
+        # PostgreSQL/MySQL/Oracle: chaque worker saute les lignes verrouillées par les autres
+        of = ('self',) if features.has_select_for_update_of else ()
+        rappels = rappels.select_for_update(skip_locked=True, of=of)
+    elif connection.vendor == 'sqlite':
+        # SQLite n'a qu'un seul écrivain: prendre le verrou d'écriture avant de lire
+        # sérialise les workers, le temps de réserver le lot
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {Rappel._meta.db_table} SET envoye = envoye WHERE 0')
+    # Coordonnées et noms chargés pour tout le lot en une requête
+    rappels = rappels.select_related('rdv__patient__user', 'rdv__praticien__user').only(*CHAMPS_MESSAGE)
+    return list(rappels[:limit])
+
+
+def envoyer_rappels_dus(backend=None, batch_size=500, maintenant=None, ids=None, bail=BAIL):
+    """Réserve un lot de rappels dus, les envoie et les marque envoyés (un seul UPDATE)
+
+    La réservation (`reserve_jusqu_a`) est validée avant l'envoi: aucun verrou n'est
+    tenu pendant les échanges réseau. Un rappel dont l'envoi échoue est retenté à
+    l'expiration du bail; un rappel sans coordonnée utilisable par le backend est
+    abandonné (`echec`) pour ne pas occuper les lots suivants.
+    `ids` restreint le lot à des rappels précis (planificateur).
+    Retourne le nombre de rappels envoyés.
+    """
+    backend = backend or get_backend()
+    maintenant = maintenant or timezone.now()
+
+    with transaction.atomic():
+        rappels = _reclamer(batch_size, maintenant, ids)
+        if not rappels:
+            return 0
+        messages = [construire_message(rappel) for rappel in rappels]
+        sans_coordonnees = [message.rappel_id for message in messages if not backend.peut_envoyer(message)]
+        messages = [message for message in messages if backend.peut_envoyer(message)]
+        if sans_coordonnees:
+            # update() ne touche pas auto_now: date_modification posée pour le planificateur (suivre)
+            Rappel.objects.filter(id__in=sans_coordonnees).update(
+                echec='Aucune coordonnée pour ce canal',
+                date_modification=maintenant,
+            )
+        Rappel.objects.filter(id__in=[message.rappel_id for message in messages]).update(
+            reserve_jusqu_a=maintenant + bail,
+        )
+
+    envoyes = backend.envoyer(messages) if messages else []
+    ids_envoyes = [message.rappel_id for message in envoyes]
+    if ids_envoyes:
+        Rappel.objects.filter(id__in=ids_envoyes).update(
+            envoye=True,
+            date_envoi_effectif=timezone.now(),
+            reserve_jusqu_a=None,
+            date_modification=timezone.now(),
+        )
+    return len(ids_envoyes)
+
+
+def get_politique():
+    """Politique de rappels: type de rappel -> délai avant le rendez-vous"""
+    return getattr(settings, 'RDV_POLITIQUE_RAPPELS', {
+        '24h': timedelta(hours=24),
+        '48h': timedelta(hours=48),
+    })
+
+
+def synchroniser_rappels_lot(rdvs, maintenant=None):
+    """Crée, déplace ou supprime les rappels non envoyés d'un lot de rendez-vous
+
+    Idempotent: sert à la création, au report et à l'annulation d'un
+    rendez-vous, ainsi qu'à la reconstruction en masse (rebuild_rappels).
+    Les rappels déjà envoyés ne sont jamais modifiés; si le rendez-vous a été
+    reporté depuis, un nouveau rappel est planifié pour la nouvelle date.
+    Retourne (rappels créés ou déplacés, ids des rappels supprimés).
+    """
+    maintenant = maintenant or timezone.now()
+    politique = get_politique()
+    rdvs = list(rdvs)
+    if not rdvs:
+        return [], []
+
+    envoyes = {}        # (rdv_id, type) -> dates d'envoi prévues des rappels déjà partis
+    existants = {}      # (rdv_id, type) -> rappel non envoyé
+    a_supprimer = []
+    for rappel in Rappel.objects.filter(rdv_id__in=[rdv.id for rdv in rdvs]).only(
+        'id', 'rdv_id', 'type_rappel', 'date_envoi_prevue', 'envoye', 'date_modification'
+    ).order_by('id'):
+        cle = (rappel.rdv_id, rappel.type_rappel)
+        if rappel.envoye:
+            envoyes.setdefault(cle, set()).add(rappel.date_envoi_prevue)
+        elif cle in existants or rappel.type_rappel not in politique:
+            # Doublon ou type retiré de la politique
+            a_supprimer.append(rappel.id)
+        else:
+            existants[cle] = rappel
+
+    a_creer = []
+    a_modifier = []
+    for rdv in rdvs:
+        actif = rdv.statut in STATUTS_ACTIFS
+        for type_rappel, delai in politique.items():
+            prevue = rdv.date_heure - delai
+            rappel = existants.get((rdv.id, type_rappel))
+            if prevue in envoyes.get((rdv.id, type_rappel), ()):
+                # Déjà envoyé pour cette date (un rappel en attente serait un doublon)
+                if rappel is not None:
+                    a_supprimer.append(rappel.id)
+                continue
+            if rappel is not None and (not actif or (rappel.date_envoi_prevue != prevue and prevue <= maintenant)):
+                a_supprimer.append(rappel.id)
+            elif not actif or prevue <= maintenant:
+                # Pas de rappel dont l'échéance est déjà passée
+                continue
+            elif rappel is None:
+                a_creer.append(Rappel(rdv=rdv, type_rappel=type_rappel, date_envoi_prevue=prevue))
+            elif rappel.date_envoi_prevue != prevue:
+                rappel.date_envoi_prevue = prevue
+                rappel.date_modification = timezone.now()
+                a_modifier.append(rappel)
+
+    with transaction.atomic():
+        if a_supprimer:
+            Rappel.objects.filter(id__in=a_supprimer).delete()
+        if a_creer:
+            Rappel.objects.bulk_create(a_creer, batch_size=500)
+        if a_modifier:
+            # bulk_update n'applique pas auto_now: date_modification est fixée ci-dessus
+            Rappel.objects.bulk_update(a_modifier, ['date_envoi_prevue', 'date_modification'], batch_size=500)
+    return a_creer + a_modifier, a_supprimer
+
+
+def synchroniser_rappels(rdv, maintenant=None):
+    """Met les rappels d'un rendez-vous en accord avec sa date et son statut"""
+    return synchroniser_rappels_lot([rdv], maintenant)
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Rapport, RendezVous
+from .utils import requetes_longues
+
+logger = logging.getLogger('rdv_app')
+
+LIGNES_PAR_TABLE = 200
+CHUNK_SIZE = 2000
+
+
+def _style_table():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'RDV_RAPPORTS_WORKERS', 2),
+            thread_name_prefix='rdv-rapports',
+        )
+    return _executor
+
+
+def filtrer_rdv(parametres):
+    """Rendez-vous couverts par un rapport"""
+    rdv_list = RendezVous.objects.all()
+    if parametres.get('date_debut'):
+        rdv_list = rdv_list.filter(date_heure__gte=parametres['date_debut'])
+    if parametres.get('date_fin'):
+        rdv_list = rdv_list.filter(date_heure__lte=parametres['date_fin'])
+    return rdv_list
+
+
+def calculer_cle(parametres):
+    """Empreinte des paramètres et de l'état des données (nombre, dernière modification)"""
+    etat = filtrer_rdv(parametres).aggregate(nb=Count('id'), maj=Max('date_modification'))
+    contenu = json.dumps({
+        'parametres': parametres,
+        'nb': etat['nb'],
+        'maj': etat['maj'].isoformat() if etat['maj'] else None,
+    }, sort_keys=True)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+
+def demander_rapport(parametres, demandeur=None):
+    """Retourne un rapport identique existant, ou lance sa génération en arrière-plan
+
+    Un rapport en attente ou en cours dont le worker ne donne plus de nouvelles
+    (process redémarré: le pool est en mémoire) est abandonné et relancé.
+    """
+    parametres = {cle: valeur for cle, valeur in parametres.items() if valeur}
+    cle = calculer_cle(parametres)
+
+    existant = Rapport.objects.filter(
+        cle=cle,
+        statut__in=['en_attente', 'en_cours', 'termine'],
+    ).order_by('-date_creation').first()
+    if existant is not None and existant.statut == 'termine' and existant.fichier:
+        return existant
+    if existant is not None and existant.statut != 'termine':
+        expiration = getattr(settings, 'RDV_RAPPORTS_EXPIRATION', timedelta(minutes=15))
+        if existant.date_maj > timezone.now() - expiration:
+            return existant
+        _mettre_a_jour(
+            existant.id, statut='erreur', erreur='Génération interrompue (worker arrêté), relancée',
+            date_fin=timezone.now(),
+        )
+
+    rapport = Rapport.objects.create(
+        cle=cle,
+        parametres=parametres,
+        demandeur=demandeur,
+    )
+    # Après validation: le worker doit voir la ligne
+    transaction.on_commit(lambda: _get_executor().submit(generer_rapport, rapport.id))
+    return rapport
+
+
+def _mettre_a_jour(rapport_id, **champs):
+    # update() n'applique pas auto_now: date_maj sert de battement de cœur
+    return Rapport.objects.filter(id=rapport_id).update(date_maj=timezone.now(), **champs)
+
+
+def construire_pdf(fichier, lignes, total, progression=None):
+    """PDF complet: le tableau est découpé en tables de LIGNES_PAR_TABLE lignes
+    qui se répartissent sur les pages (en-tête répété)"""
+    # reportlab (~70 ms d'import) chargé au premier rapport, pas au démarrage des workers
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Spacer, Paragraph, Table
+
+    styles = getSampleStyleSheet()
+    elements = [
+        Paragraph(f"<b>Rapport des Rendez-vous - {timezone.now().strftime('%d/%m/%Y')}</b>", styles['Title']),
+        Spacer(1, 0.5*cm),
+    ]
+    entete = ['ID', 'Patient', 'Praticien', 'Date et Heure', 'Statut']
+    statuts = dict(RendezVous.STATUT_CHOICES)
+
+    tables = []
+    data = [entete]
+    lues = 0
+    for (rdv_id, patient_prenom, patient_nom, praticien_prenom, praticien_nom, date_heure, statut) in lignes:
+        data.append([
+            str(rdv_id),
+            f'{patient_prenom} {patient_nom}'.strip(),
+            f'{praticien_prenom} {praticien_nom}'.strip(),
+            timezone.localtime(date_heure).strftime('%d/%m/%Y %H:%M'),
+            statuts.get(statut, statut),
+        ])
+        lues += 1
+        if len(data) > LIGNES_PAR_TABLE:
+            tables.append(data)
+            data = [entete]
+            if progression and total:
+                progression(lues * 50 // total)
+    if len(data) > 1 or not tables:
+        tables.append(data)
+
+    style = _style_table()
+    for data in tables:
+        table = Table(data, colWidths=[2*cm, 5*cm, 5*cm, 4*cm, 3*cm], repeatRows=1, splitByRow=1)
+        table.setStyle(style)
+        elements.append(table)
+
+    # Progression de la mise en page (50 -> 100 %)
+    construites = [0]
+
+    def apres_element(element):
+        if isinstance(element, Table) and progression:
+            construites[0] += 1
+            progression(50 + construites[0] * 50 // len(tables))
+
+    doc = SimpleDocTemplate(fichier, pagesize=landscape(A4))
+    doc.afterFlowable = apres_element
+    doc.build(elements)
+    return lues
+
+
+def generer_rapport(rapport_id):
+    """Génère le fichier d'un rapport (thread de fond)"""
+    try:
+        # Rapport abandonné entre-temps (jugé expiré et relancé): ne pas le générer deux fois
+        if not Rapport.objects.filter(id=rapport_id, statut='en_attente').update(
+            statut='en_cours', date_maj=timezone.now(),
+        ):
+            return
+        rapport = Rapport.objects.get(id=rapport_id)
+
+        rdv_list = filtrer_rdv(rapport.parametres)
+        with requetes_longues(rdv_list.db):
+            total = rdv_list.count()
+        requete = rdv_list.values_list(
+            'id',
+            'patient__user__first_name', 'patient__user__last_name',
+            'praticien__user__first_name', 'praticien__user__last_name',
+            'date_heure', 'statut',
+        )
+
+        derniere = [0]
+
+        def progression(pourcentage):
+            # Une écriture en base tous les 5 %
+            if pourcentage >= derniere[0] + 5:
+                derniere[0] = pourcentage
+                _mettre_a_jour(rapport_id, progression=min(pourcentage, 99))
+
+        with tempfile.TemporaryFile() as tmp, requetes_longues(requete.db):
+            nb_lignes = construire_pdf(tmp, requete.iterator(chunk_size=CHUNK_SIZE), total, progression)
+            tmp.seek(0)
+            rapport.fichier.save(f'rapport_rdv_{rapport.cle[:12]}.pdf', File(tmp), save=False)
+
+        _mettre_a_jour(
+            rapport_id,
+            fichier=rapport.fichier.name,
+            statut='termine',
+            progression=100,
+            nb_lignes=nb_lignes,
+            date_fin=timezone.now(),
+        )
+    except Exception as e:
+        logger.exception("Erreur lors de la génération du rapport #%s", rapport_id)
+        _mettre_a_jour(rapport_id, statut='erreur', erreur=str(e), date_fin=timezone.now())
+    finally:
+        connection.close()
@@ -0,0 +1,121 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Patient, Praticien
+
+# Colonne `recherche` des profils: nom, prénom, téléphone (chiffres)... en minuscules, sans accents.
+# Indexée par FTS5 (SQLite) ou par un index GIN sur to_tsvector('simple', recherche) (PostgreSQL),
+# voir la migration 0008.
+MOT_RE = re.compile(r'\w+', re.UNICODE)
+TAILLE_MAX = 255
+
+FTS_TABLES = {
+    Patient: 'rdv_app_patient_fts',
+    Praticien: 'rdv_app_praticien_fts',
+}
+# Expression identique à celle de l'index PostgreSQL, sinon il n'est pas utilisé
+TSVECTOR = "to_tsvector('simple', recherche)"
+
+
+def normaliser(texte):
+    """Minuscules, sans accents ni ponctuation: 'Hélène  O'Brien' -> 'helene o brien'"""
+    texte = unicodedata.normalize('NFKD', texte or '')
+    texte = ''.join(c for c in texte if not unicodedata.combining(c)).lower()
+    return ' '.join(MOT_RE.findall(texte))
+
+
+def _chiffres(telephone):
+    return re.sub(r'\D', '', telephone or '')
+
+
+def texte_recherche(profil, user=None):
+    """Valeur de la colonne `recherche` d'un Patient ou d'un Praticien"""
+    user = user or profil.user
+    parties = [user.first_name, user.last_name, _chiffres(profil.telephone)]
+    # Praticien: spécialité; Patient: email
+    specialite = getattr(profil, 'specialite', None)
+    parties.append(user.email if specialite is None else specialite)
+    return normaliser(' '.join(parties))[:TAILLE_MAX]
+
+
+def mots_requete(q):
+    """Mots recherchés; un numéro saisi par groupes ("06 12 34") devient un seul mot"""
+    mots = normaliser(q).split()
+    if len(mots) > 1 and all(mot.isdigit() for mot in mots):
+        return [''.join(mots)]
+    return mots
+
+
+def _expression_fts(mots):
+    # Chaque mot est une recherche par préfixe, les mots sont combinés en ET
+    if connection.vendor == 'postgresql':
+        return ' & '.join(f'{mot}:*' for mot in mots)
+    return ' '.join('"{}"*'.format(mot) for mot in mots)
+
+
+def filtrer(queryset, q):
+    """Restreint un queryset de Patient ou de Praticien aux profils correspondant à `q` (préfixes)"""
+    mots = mots_requete(q)
+    if not mots:
+        return queryset
+    modele = queryset.model
+    if connection.vendor == 'sqlite':
+        table = FTS_TABLES[modele]
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s', [_expression_fts(mots)]
+        ))
+    if connection.vendor == 'postgresql':
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM {modele._meta.db_table} WHERE {TSVECTOR} @@ to_tsquery('simple', %s)",
+            [_expression_fts(mots)],
+        ))
+    for mot in mots:
+        queryset = queryset.filter(Q(recherche__startswith=mot) | Q(recherche__contains=f' {mot}'))
+    return queryset
+
+
+def _rechercher_sqlite(modele, mots, limite, decalage):
+    table = FTS_TABLES[modele]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {table} WHERE {table} MATCH %s ORDER BY rank, rowid LIMIT %s OFFSET %s',
+            [_expression_fts(mots), limite, decalage],
+        )
+        ids = [ligne[0] for ligne in cursor.fetchall()]
+        cursor.execute(f'SELECT count(*) FROM {table} WHERE {table} MATCH %s', [_expression_fts(mots)])
+        total = cursor.fetchone()[0]
+    return ids, total
+
+
+def _rechercher_postgresql(modele, mots, limite, decalage):
+    table = modele._meta.db_table
+    requete = f"FROM {table}, to_tsquery('simple', %s) q WHERE {TSVECTOR} @@ q"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id {requete} ORDER BY ts_rank({TSVECTOR}, q) DESC, id LIMIT %s OFFSET %s',
+            [_expression_fts(mots), limite, decalage],
+        )
+        ids = [ligne[0] for ligne in cursor.fetchall()]
+        cursor.execute(f'SELECT count(*) {requete}', [_expression_fts(mots)])
+        total = cursor.fetchone()[0]
+    return ids, total
+
+
+def rechercher(modele, q, limite=20, decalage=0):
+    """Profils correspondant à `q`, du plus pertinent au moins pertinent
+
+    Retourne (ids de la page, nombre total de résultats).
+    """
+    mots = mots_requete(q)
+    if not mots:
+        return [], 0
+    if connection.vendor == 'sqlite':
+        return _rechercher_sqlite(modele, mots, limite, decalage)
+    if connection.vendor == 'postgresql':
+        return _rechercher_postgresql(modele, mots, limite, decalage)
+    resultats = filtrer(modele.objects.all(), q)
+    return list(resultats.order_by('id').values_list('id', flat=True)[decalage:decalage + limite]), resultats.count()
@@ -0,0 +1,135 @@
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+REPLICA = 'replica'
+COOKIE_PRIMAIRE = 'rdv_primaire'
+
+_requete = contextvars.ContextVar('rdv_requete_replica', default=None)
+
+
+def lecture_replica(vue):
+    """Autorise une vue (fonction ou ViewSet) à lire sur la réplique pour GET/HEAD"""
+    vue.lecture_replica = True
+    return vue
+
+
+def get_delai_primaire():
+    """Secondes pendant lesquelles un utilisateur qui vient d'écrire lit sur le primaire"""
+    return getattr(settings, 'RDV_REPLICA_STICKY', 5)
+
+
+def replica_configuree():
+    return REPLICA in settings.DATABASES
+
+
+def _cle_primaire(user_id):
+    return f'replica:primaire:{user_id}'
+
+
+def marquer_ecriture(request, response):
+    """Après une écriture: cookie et marque en cache pour lire sur le primaire un moment"""
+    delai = get_delai_primaire()
+    response.set_cookie(COOKIE_PRIMAIRE, '1', max_age=delai, httponly=True, samesite='Lax')
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        cache.set(_cle_primaire(user.pk), True, delai)
+
+
+class EtatRequete:
+    """Décision de routage d'une requête, prise à la première lecture"""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = None     # None: pas encore décidé
+        self.ecriture = False   # lecture après écriture dans la même requête
+
+    def utiliser_replica(self):
+        if self.ecriture or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return False
+        if self.replica is None:
+            # Les requêtes faites pendant la décision (session, utilisateur) vont au primaire
+            self.replica = False
+            self.replica = not self._collant()
+        return self.replica
+
+    def _collant(self):
+        if self.request.COOKIES.get(COOKIE_PRIMAIRE):
+            return True
+        user_id = _user_id_jeton(self.request)
+        if user_id is None:
+            user = getattr(self.request, 'user', None)
+            user_id = user.pk if user is not None and user.is_authenticated else None
+        return bool(user_id is not None and cache.get(_cle_primaire(user_id)))
+
+
+def _user_id_jeton(request):
+    """Id utilisateur du jeton JWT (signature vérifiée, sans requête)
+
+    La décision se prend à la première lecture, pour les clients JWT la recherche
+    de l'utilisateur par DRF: request.user n'est pas encore authentifié.
+    """
+    authentification = JWTAuthentication()
+    entete = authentification.get_header(request)
+    if entete is None:
+        return None
+    try:
+        jeton = authentification.get_raw_token(entete)
+        if jeton is None:
+            return None
+        return authentification.get_validated_token(jeton).get(jwt_settings.USER_ID_CLAIM)
+    except (AuthenticationFailed, TokenError):
+        return None
+
+
+def activer(request):
+    """Active la lecture sur réplique pour la requête en cours"""
+    _requete.set(EtatRequete(request))
+
+
+def desactiver():
+    _requete.set(None)
+
+
+@contextmanager
+def lecture_primaire():
+    """Lectures du bloc sur le primaire, même dans une vue @lecture_replica"""
+    jeton = _requete.set(None)
+    try:
+        yield
+    finally:
+        _requete.reset(jeton)
+
+
+class ReplicaRouter:
+    """Lectures des vues opt-in (lecture_replica) sur la réplique, tout le reste sur le primaire
+
+    Une écriture dans la requête, une transaction ouverte ou une écriture
+    récente du même utilisateur (RDV_REPLICA_STICKY secondes) ramènent les
+    lectures sur le primaire.
+    """
+
+    def db_for_read(self, model, **hints):
+        etat = _requete.get()
+        if etat is not None and etat.utiliser_replica():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        etat = _requete.get()
+        if etat is not None:
+            etat.ecriture = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données des deux côtés
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import (
     User, Praticien, Patient, RendezVous, Annulation, 
-    Rappel, Log, HorairePraticien, Indisponibilite
+    Rappel, Log, HorairePraticien, Indisponibilite, Rapport
 )
 
 
@@ -156,6 +156,19 @@ class LogSerializer(serializers.ModelSerializer):
         return "Système"
 
 
+class RapportSerializer(serializers.ModelSerializer):
+    """Serializer pour le modèle Rapport"""
+    statut_display = serializers.CharField(source='get_statut_display', read_only=True)
+    
+    class Meta:
+        model = Rapport
+        fields = [
+            'id', 'parametres', 'statut', 'statut_display', 'progression',
+            'nb_lignes', 'erreur', 'date_creation', 'date_fin'
+        ]
+        read_only_fields = fields
+
+
 class PraticienCreateSerializer(serializers.Serializer):
     """Serializer pour la création d'un praticien"""
     username = serializers.CharField(max_length=150)
@@ -241,6 +254,22 @@ class PatientCreateSerializer(serializers.Serializer):
         return patient
 
 
+class PraticienImportSerializer(PraticienCreateSerializer):
+    """Ligne d'import CSV: l'unicité est vérifiée en masse par rdv_app.import_csv"""
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+
+    def validate(self, data):
+        return data
+
+
+class PatientImportSerializer(PatientCreateSerializer):
+    """Ligne d'import CSV: l'unicité est vérifiée en masse par rdv_app.import_csv"""
+    password = serializers.CharField(write_only=True, required=False, allow_blank=True)
+
+    def validate(self, data):
+        return data
+
+
 class PatientRegistrationSerializer(serializers.Serializer):
     """Serializer pour l'inscription d'un patient"""
     username = serializers.CharField(max_length=150)
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import authentification, calendrier, fragments
+from .autocompletion import publier_profil
+from .evenements import publier_rdv
+from .recherche import texte_recherche
+from .models import (
+    Annulation, HorairePraticien, Indisponibilite, Patient, Praticien, RendezVous, User
+)
+from .rappels import synchroniser_rappels
+from .sqlite import configurer_connexion
+
+
+@receiver(connection_created)
+def connexion_creee(sender, connection, **kwargs):
+    """WAL, busy timeout et cache sur chaque nouvelle connexion SQLite"""
+    configurer_connexion(connection)
+
+
+@receiver(pre_save, sender=RendezVous)
+def rdv_avant_enregistrement(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Retenir l'ancien praticien/patient: leurs flux iCalendar sont aussi à invalider"""
+    instance._anciens_ids_calendrier = None
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not {'praticien', 'patient'} & set(update_fields):
+        return
+    instance._anciens_ids_calendrier = RendezVous.objects.filter(pk=instance.pk).values_list(
+        'praticien_id', 'patient_id'
+    ).first()
+
+
+@receiver(post_save, sender=RendezVous)
+def rdv_enregistre(sender, instance, raw=False, created=False, **kwargs):
+    """Générer, déplacer ou retirer les rappels à chaque création, report ou annulation"""
+    calendrier.invalider(instance.praticien_id, instance.patient_id)
+    # Fragments du praticien et du patient (tableaux de bord, planning) et statistiques globales
+    fragments.invalider(instance.praticien_id, instance.patient_id, globale=True)
+    # Écrans abonnés (SSE), seulement une fois la transaction validée
+    transaction.on_commit(lambda: publier_rdv('rdv_cree' if created else 'rdv_modifie', instance))
+    anciens = getattr(instance, '_anciens_ids_calendrier', None)
+    if anciens is not None and anciens != (instance.praticien_id, instance.patient_id):
+        calendrier.invalider(*anciens)
+        fragments.invalider(*anciens)
+    if raw:
+        return
+    # Le planificateur d'envoi (autre process) les relit via Rappel.date_modification
+    synchroniser_rappels(instance)
+
+
+@receiver(post_delete, sender=RendezVous)
+def rdv_supprime(sender, instance, **kwargs):
+    calendrier.invalider(instance.praticien_id, instance.patient_id)
+    fragments.invalider(instance.praticien_id, instance.patient_id, globale=True)
+    transaction.on_commit(lambda: publier_rdv('rdv_supprime', instance))
+
+
+@receiver([post_save, post_delete], sender=User)
+def utilisateur_modifie(sender, instance, **kwargs):
+    """Rôle, activation ou suppression: l'utilisateur en cache d'authentification est périmé"""
+    authentification.invalider(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Praticien)
+@receiver([post_save, post_delete], sender=Patient)
+def profil_modifie(sender, instance, signal=None, **kwargs):
+    authentification.invalider(instance.user_id)
+    # Compteurs du tableau de bord admin et pages du profil
+    if sender is Praticien:
+        fragments.invalider(praticien_id=instance.pk, globale=True)
+    else:
+        fragments.invalider(patient_id=instance.pk, globale=True)
+    # Index d'autocomplétion des process, une fois la transaction validée
+    type_profil = 'praticien' if sender is Praticien else 'patient'
+    supprime = signal is post_delete
+    transaction.on_commit(lambda: publier_profil(type_profil, instance, supprime=supprime))
+
+
+@receiver(pre_save, sender=Praticien)
+@receiver(pre_save, sender=Patient)
+def profil_avant_enregistrement(sender, instance, raw=False, **kwargs):
+    """Colonne de recherche (nom, téléphone...) recalculée à chaque enregistrement du profil"""
+    if not raw:
+        instance.recherche = texte_recherche(instance)
+
+
+@receiver(post_save, sender=User)
+def utilisateur_enregistre(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Nom ou email modifié: colonne de recherche du profil mise à jour"""
+    if created or raw:
+        return
+    if update_fields is not None and not {'first_name', 'last_name', 'email'} & set(update_fields):
+        return
+    modele = {'praticien': Praticien, 'patient': Patient}.get(instance.role)
+    profil = modele.objects.filter(user=instance).first() if modele else None
+    if profil is not None:
+        modele.objects.filter(pk=profil.pk).update(recherche=texte_recherche(profil, instance))
+        transaction.on_commit(lambda: publier_profil(instance.role, profil, instance))
+        fragments.invalider(**{f'{instance.role}_id': profil.pk})
+
+
+@receiver([post_save, post_delete], sender=HorairePraticien)
+@receiver([post_save, post_delete], sender=Indisponibilite)
+def disponibilites_modifiees(sender, instance, **kwargs):
+    """Horaires et indisponibilités: page de détail du praticien"""
+    fragments.invalider(praticien_id=instance.praticien_id)
+
+
+@receiver([post_save, post_delete], sender=Annulation)
+def annulation_modifiee(sender, instance, **kwargs):
+    """Demandes d'annulation en attente: tableau de bord admin (l'acceptation enregistre le rendez-vous)"""
+    fragments.invalider(globale=True)
@@ -0,0 +1,45 @@
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger('rdv_app')
+
+PRAGMAS_DEFAUT = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 134217728,
+    'temp_store': 'memory',
+}
+
+
+def get_pragmas():
+    """Pragmas SQLite configurés dans RDV_SQLITE_PRAGMAS (None ou {} pour n'en appliquer aucun)"""
+    pragmas = getattr(settings, 'RDV_SQLITE_PRAGMAS', PRAGMAS_DEFAUT)
+    return dict(pragmas or {})
+
+
+def appliquer_pragmas(cursor, pragmas):
+    """Applique les pragmas sur une connexion (curseur DB-API)"""
+    for nom, valeur in pragmas.items():
+        cursor.execute(f'PRAGMA {nom} = {valeur}')
+        if nom == 'journal_mode':
+            mode = cursor.fetchone()[0]
+            if mode.lower() != str(valeur).lower():
+                # Base en mémoire ou système de fichiers sans mémoire partagée
+                logger.warning("SQLite: journal_mode=%s refusé, mode actuel: %s", valeur, mode)
+
+
+def configurer_connexion(connection):
+    """Pragmas appliqués à chaque nouvelle connexion SQLite (signal connection_created)"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas()
+    if connection.is_in_memory_db():
+        # Base de test en mémoire: ni WAL ni mmap
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    if pragmas:
+        with connection.cursor() as cursor:
+            appliquer_pragmas(cursor, pragmas)
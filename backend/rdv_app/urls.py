@@ -44,6 +44,7 @@ urlpatterns = [
     # Statistiques
     path('statistiques/', views.statistiques_view, name='statistiques'),
     path('statistiques/export/', views.rapport_export, name='rapport_export'),
+    path('statistiques/rapports/<int:pk>/', views.rapport_detail, name='rapport_detail'),
     
     # Logs
     path('logs/', views.logs_view, name='logs'),
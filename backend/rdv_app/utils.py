@@ -1,12 +1,12 @@
 import csv
-from django.http import HttpResponse
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib import colors
-from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 from .models import Log
+from .log_writer import get_log_writer
 
 
 def get_client_ip(request):
@@ -25,7 +25,7 @@ def log_action(request, action, details='', table_cible='', cible_id=None):
         user = request.user if request.user.is_authenticated else None
         ip_address = get_client_ip(request)
         
-        Log.objects.create(
+        log = Log(
             user=user,
             action=action,
             details=details,
@@ -33,6 +33,13 @@ def log_action(request, action, details='', table_cible='', cible_id=None):
             cible_id=cible_id,
             ip_address=ip_address
         )
+        
+        # Écriture différée par lots, sauf en mode synchrone
+        writer = get_log_writer()
+        if writer is None:
+            log.save()
+        else:
+            writer.write(log)
     except Exception as e:
         print(f"Erreur lors de l'enregistrement du log: {e}")
 
@@ -48,124 +55,173 @@ def check_permission(user, allowed_roles):
     return user.role in allowed_roles
 
 
-def generer_rapport_csv(rdv_list):
-    """Export CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="rapport_rdv_{timezone.now().strftime("%Y%m%d")}.csv"'
-    response.write('\ufeff')  # BOM UTF-8 pour Excel
-    
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['ID', 'Patient', 'Praticien', 'Date et Heure', 'Motif', 'Statut', 'Date de création'])
-    
-    for rdv in rdv_list:
-        writer.writerow([
-            rdv.id,
-            rdv.patient.user.get_full_name(),
-            rdv.praticien.user.get_full_name(),
-            rdv.date_heure.strftime('%d/%m/%Y %H:%M'),
-            rdv.motif,
-            rdv.get_statut_display(),
-            rdv.date_creation.strftime('%d/%m/%Y %H:%M')
-        ])
-    
-    return response
+class Echo:
+    """Pseudo-fichier: write() retourne la ligne au lieu de la stocker"""
+    def write(self, value):
+        return value
 
 
-def generer_rapport_pdf(rdv_list):
-    """Export PDF"""
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="rapport_rdv_{timezone.now().strftime("%Y%m%d")}.pdf"'
-    
-    doc = SimpleDocTemplate(response, pagesize=landscape(A4))
-    elements = []
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    
-    # Titre
-    titre = Paragraph(f"<b>Rapport des Rendez-vous - {timezone.now().strftime('%d/%m/%Y')}</b>", styles['Title'])
-    elements.append(titre)
-    elements.append(Spacer(1, 0.5*cm))
-    
-    # Données du tableau
-    data = [['ID', 'Patient', 'Praticien', 'Date et Heure', 'Statut']]
-    
-    for rdv in rdv_list[:50]:  # Limiter à 50 pour la lisibilité
-        data.append([
-            str(rdv.id),
-            rdv.patient.user.get_full_name(),
-            rdv.praticien.user.get_full_name(),
-            rdv.date_heure.strftime('%d/%m/%Y %H:%M'),
-            rdv.get_statut_display()
-        ])
-    
-    # Créer le tableau
-    table = Table(data, colWidths=[2*cm, 5*cm, 5*cm, 4*cm, 3*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    
-    # Construire le PDF
-    doc.build(elements)
+@contextmanager
+def requetes_longues(using):
+    """Relève le statement_timeout (RDV_DB_STATEMENT_TIMEOUT) le temps d'un export ou d'un rapport
+
+    Derrière PgBouncer (mode transaction), SET LOCAL dans une transaction: un SET de session
+    resterait sur une connexion serveur partagée.
+    """
+    connexion = connections[using]
+    if connexion.vendor != 'postgresql':
+        yield
+        return
+    delai = getattr(settings, 'RDV_DB_EXPORT_STATEMENT_TIMEOUT', 0)
+    if connexion.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        with transaction.atomic(using=using):
+            with connexion.cursor() as cursor:
+                cursor.execute('SET LOCAL statement_timeout = %s', [delai])
+            yield
+        return
+    with connexion.cursor() as cursor:
+        cursor.execute('SET statement_timeout = %s', [delai])
+    try:
+        yield
+    finally:
+        # Retour à la valeur de connexion (options -c statement_timeout)
+        with connexion.cursor() as cursor:
+            cursor.execute('RESET statement_timeout')
+
+
+def generer_rapport_csv(rdv_list, chunk_size=2000):
+    """Export CSV en streaming (mémoire constante)"""
+    statuts = dict(rdv_list.model.STATUT_CHOICES)
+    requete = rdv_list.values_list(
+        'id',
+        'patient__user__first_name', 'patient__user__last_name',
+        'praticien__user__first_name', 'praticien__user__last_name',
+        'date_heure', 'motif', 'statut', 'date_creation',
+    )
     
+    def contenu():
+        writer = csv.writer(Echo(), delimiter=';')
+        yield '\ufeff'  # BOM UTF-8 pour Excel
+        yield writer.writerow(['ID', 'Patient', 'Praticien', 'Date et Heure', 'Motif', 'Statut', 'Date de création'])
+        with requetes_longues(requete.db):
+            for (rdv_id, patient_prenom, patient_nom, praticien_prenom, praticien_nom,
+                 date_heure, motif, statut, date_creation) in requete.iterator(chunk_size=chunk_size):
+                yield writer.writerow([
+                    rdv_id,
+                    f'{patient_prenom} {patient_nom}'.strip(),
+                    f'{praticien_prenom} {praticien_nom}'.strip(),
+                    timezone.localtime(date_heure).strftime('%d/%m/%Y %H:%M'),
+                    motif,
+                    statuts.get(statut, statut),
+                    timezone.localtime(date_creation).strftime('%d/%m/%Y %H:%M'),
+                ])
+    
+    response = StreamingHttpResponse(contenu(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="rapport_rdv_{timezone.now().strftime("%Y%m%d")}.csv"'
     return response
 
 
-def get_creneaux_disponibles(praticien, date_cible):
-    """Obtenir les créneaux disponibles pour un praticien à une date donnée"""
-    from datetime import datetime, timedelta
+def calculer_creneaux(date_cible, horaires, pris, pas=timedelta(minutes=30)):
+    """Créneaux libres d'une journée: plages horaires (début, fin) découpées, moins les créneaux pris"""
+    creneaux = []
+    for heure_debut, heure_fin in horaires:
+        heure_courante = timezone.make_aware(datetime.combine(date_cible, heure_debut))
+        fin = timezone.make_aware(datetime.combine(date_cible, heure_fin))
+        while heure_courante < fin:
+            if heure_courante not in pris:
+                creneaux.append(heure_courante)
+            heure_courante += pas
+    return creneaux
+
+
+def requetes_creneaux(praticien_id, date_cible):
+    """Requêtes indépendantes nécessaires au calcul des créneaux (horaires, indisponibilité, RDV pris)"""
     from .models import RendezVous, Indisponibilite, HorairePraticien
     
-    # Récupérer le jour de la semaine (1=Lundi, 7=Dimanche)
-    jour_semaine = date_cible.isoweekday()
-    
-    # Vérifier si le praticien travaille ce jour
-    horaires = HorairePraticien.objects.filter(
-        praticien=praticien,
-        jour_semaine=jour_semaine
+    debut_jour = timezone.make_aware(datetime.combine(date_cible, datetime.min.time()))
+    return (
+        HorairePraticien.objects.filter(
+            praticien_id=praticien_id,
+            jour_semaine=date_cible.isoweekday()
+        ).order_by('heure_debut').values_list('heure_debut', 'heure_fin'),
+        Indisponibilite.objects.filter(
+            praticien_id=praticien_id,
+            date_debut__lte=date_cible,
+            date_fin__gte=date_cible
+        ),
+        RendezVous.objects.filter(
+            praticien_id=praticien_id,
+            date_heure__gte=debut_jour,
+            date_heure__lt=debut_jour + timedelta(days=1),
+            statut__in=['en_attente', 'confirme']
+        ).values_list('date_heure', flat=True),
     )
+
+
+def get_creneaux_disponibles(praticien, date_cible):
+    """Obtenir les créneaux disponibles pour un praticien à une date donnée"""
+    horaires, indisponibilites, rdv_pris = requetes_creneaux(praticien.id, date_cible)
     
-    if not horaires.exists():
+    horaires = list(horaires)
+    if not horaires or indisponibilites.exists():
         return []
     
-    # Vérifier les indisponibilités
-    indisponible = Indisponibilite.objects.filter(
-        praticien=praticien,
-        date_debut__lte=date_cible,
-        date_fin__gte=date_cible
-    ).exists()
-    
-    if indisponible:
-        return []
+    # Créneaux de 30 minutes, un seul aller-retour pour les créneaux déjà pris
+    return calculer_creneaux(date_cible, horaires, set(rdv_pris))
+
+
+def calculer_heatmap(specialite=None, praticien_id=None, date_debut=None, date_fin=None):
+    """Heatmaps jour de semaine x demi-heure (réservations, annulations, absences)
+
+    `praticien_id` entier et dates (date) déjà validés par l'appelant.
+    """
+    from django.core.cache import cache
+    from django.conf import settings
+    from django.db.models import Count, Q, Case, When, Value, IntegerField
+    from django.db.models.functions import ExtractIsoWeekDay, ExtractHour
+    from .models import RendezVous
+    
+    cache_key = f'heatmap:{specialite or "*"}:{praticien_id or "*"}:{date_debut or "*"}:{date_fin or "*"}'
+    heatmap = cache.get(cache_key)
+    if heatmap is not None:
+        return heatmap
+    
+    rdv_list = RendezVous.objects.all()
+    if specialite:
+        rdv_list = rdv_list.filter(praticien__specialite=specialite)
+    if praticien_id:
+        rdv_list = rdv_list.filter(praticien_id=praticien_id)
+    # Jours entiers en intervalle [début, lendemain de la fin[ sur la colonne brute: un filtre
+    # date_heure__date convertirait chaque ligne et se priverait de l'index sur date_heure
+    if date_debut:
+        rdv_list = rdv_list.filter(date_heure__gte=timezone.make_aware(datetime.combine(date_debut, time.min)))
+    if date_fin:
+        rdv_list = rdv_list.filter(
+            date_heure__lt=timezone.make_aware(datetime.combine(date_fin + timedelta(days=1), time.min))
+        )
     
-    # Générer les créneaux (par exemple, toutes les 30 minutes)
-    creneaux = []
-    for horaire in horaires:
-        heure_debut = datetime.combine(date_cible, horaire.heure_debut)
-        heure_fin = datetime.combine(date_cible, horaire.heure_fin)
-        
-        heure_courante = heure_debut
-        while heure_courante < heure_fin:
-            # Vérifier si le créneau est déjà pris
-            rdv_existant = RendezVous.objects.filter(
-                praticien=praticien,
-                date_heure=heure_courante,
-                statut__in=['en_attente', 'confirme']
-            ).exists()
-            
-            if not rdv_existant:
-                creneaux.append(heure_courante)
-            
-            heure_courante += timedelta(minutes=30)
+    # Agrégation côté base : au plus 7 x 48 lignes remontent, quel que soit l'historique
+    cellules = rdv_list.annotate(
+        jour=ExtractIsoWeekDay('date_heure'),
+        heure=ExtractHour('date_heure'),
+        demi=Case(When(date_heure__minute__gte=30, then=Value(1)), default=Value(0), output_field=IntegerField()),
+    ).order_by().values('jour', 'heure', 'demi').annotate(
+        reservations=Count('id'),
+        annulations=Count('id', filter=Q(statut='annule')),
+        absences=Count('id', filter=Q(statut='absence')),
+    )
     
-    return creneaux
-
+    # Lignes = lundi..dimanche, colonnes = 00:00, 00:30, ..., 23:30
+    heatmap = {
+        'reservations': [[0] * 48 for _ in range(7)],
+        'annulations': [[0] * 48 for _ in range(7)],
+        'absences': [[0] * 48 for _ in range(7)],
+    }
+    for cellule in cellules:
+        ligne = cellule['jour'] - 1
+        colonne = cellule['heure'] * 2 + cellule['demi']
+        for cle in heatmap:
+            heatmap[cle][ligne][colonne] = cellule[cle]
+    
+    cache.set(cache_key, heatmap, getattr(settings, 'RDV_HEATMAP_CACHE_TIMEOUT', 300))
+    return heatmap
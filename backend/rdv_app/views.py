@@ -2,20 +2,27 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse
 from django.utils import timezone
 from datetime import datetime, timedelta, date
 from .models import (
     User, Praticien, HorairePraticien, Indisponibilite,
-    Patient, RendezVous, Annulation, Rappel, Log
+    Patient, RendezVous, Annulation, Rappel, Log, Rapport
 )
 from .forms import (
     LoginForm, PatientRegistrationForm, PraticienForm, PatientForm,
     HorairePraticienForm, IndisponibiliteForm, RendezVousForm,
     AnnulationForm, RendezVousAdminForm, SearchForm, DateRangeForm
 )
-from .utils import log_action, check_permission, generer_rapport_csv, generer_rapport_pdf
+from .utils import log_action, check_permission, generer_rapport_csv
+from .rapports import demander_rapport
+from .routers import lecture_replica
+from .fragments import fragment
+from .log_search import CurseurInvalide, rechercher_logs
+from .pagination import paginer, paginer_par_curseur, parametres_sans
+from .recherche import filtrer as filtrer_recherche
 
 
 # Auth
@@ -83,63 +90,84 @@ def register_view(request):
 
 # Dashboard
 
+@lecture_replica
 @login_required
 def dashboard_view(request):
     """Tableau de bord principal"""
     context = {}
     user = request.user
     
+    # Blocs mis en cache (rdv_app.fragments), périmés par les signaux à chaque réservation,
+    # modification ou annulation qui les concerne
     if user.role == 'admin':
-        # Statistiques admin
-        context['total_rdv'] = RendezVous.objects.count()
-        context['rdv_aujourdhui'] = RendezVous.objects.filter(
-            date_heure__date=date.today(),
-            statut__in=['en_attente', 'confirme']
-        ).count()
-        context['total_patients'] = Patient.objects.count()
-        context['total_praticiens'] = Praticien.objects.filter(actif=True).count()
-        context['annulations_attente'] = Annulation.objects.filter(statut='en_attente').count()
+        def statistiques_admin():
+            return {
+                'total_rdv': RendezVous.objects.count(),
+                'rdv_aujourdhui': RendezVous.objects.filter(
+                    date_heure__date=date.today(),
+                    statut__in=['en_attente', 'confirme']
+                ).count(),
+                'total_patients': Patient.objects.count(),
+                'total_praticiens': Praticien.objects.filter(actif=True).count(),
+                'annulations_attente': Annulation.objects.filter(statut='en_attente').count(),
+                # Rendez-vous récents
+                'rdv_recents': list(RendezVous.objects.select_related('patient__user', 'praticien__user')[:10]),
+            }
         
-        # Rendez-vous récents
-        context['rdv_recents'] = RendezVous.objects.all()[:10]
+        context.update(fragment('dashboard_admin', statistiques_admin, user.role, globale=True, cles=[date.today()]))
         
     elif user.role == 'praticien' and hasattr(user, 'praticien_profile'):
         praticien = user.praticien_profile
-        today = timezone.now()
+        maintenant = timezone.now()
+        jour = timezone.localdate(maintenant)
+        debut_jour = timezone.make_aware(datetime.combine(jour, datetime.min.time()))
         
-        # Rendez-vous du jour
-        context['rdv_aujourdhui'] = RendezVous.objects.filter(
-            praticien=praticien,
-            date_heure__date=today.date(),
-            statut__in=['en_attente', 'confirme']
-        ).order_by('date_heure')
+        # En cache: les rendez-vous du jour et des 7 suivants (clé par jour); le filtre par
+        # rapport à l'heure courante est appliqué à chaque affichage
+        def rdv_praticien():
+            return {'rdv_jours': list(RendezVous.objects.filter(
+                praticien=praticien,
+                statut__in=['en_attente', 'confirme'],
+                date_heure__gte=debut_jour,
+                date_heure__lt=debut_jour + timedelta(days=8),
+            ).select_related('patient__user').order_by('date_heure'))}
         
+        rdv_jours = fragment(
+            'dashboard_praticien', rdv_praticien, user.role, praticien_id=praticien.id, cles=[jour]
+        )['rdv_jours']
+        # Rendez-vous du jour
+        context['rdv_aujourdhui'] = [rdv for rdv in rdv_jours if rdv.date_heure < debut_jour + timedelta(days=1)]
         # Rendez-vous à venir (7 prochains jours)
-        context['rdv_semaine'] = RendezVous.objects.filter(
-            praticien=praticien,
-            date_heure__gte=today,
-            date_heure__lte=today + timedelta(days=7),
-            statut__in=['en_attente', 'confirme']
-        ).order_by('date_heure')
-        
+        context['rdv_semaine'] = [
+            rdv for rdv in rdv_jours if maintenant <= rdv.date_heure <= maintenant + timedelta(days=7)
+        ]
         context['praticien'] = praticien
         
     elif user.role == 'patient' and hasattr(user, 'patient_profile'):
         patient = user.patient_profile
+        maintenant = timezone.now()
+        jour = timezone.localdate(maintenant)
+        debut_jour = timezone.make_aware(datetime.combine(jour, datetime.min.time()))
         
-        # Prochains rendez-vous
-        context['rdv_futurs'] = RendezVous.objects.filter(
-            patient=patient,
-            date_heure__gte=timezone.now(),
-            statut__in=['en_attente', 'confirme']
-        ).order_by('date_heure')
+        # En cache: les rendez-vous à partir du jour et les 5 derniers d'avant (clé par jour);
+        # passés et futurs sont séparés à l'heure courante à chaque affichage
+        def rdv_patient():
+            rdv = RendezVous.objects.filter(patient=patient).select_related('praticien__user')
+            return {
+                'a_partir_du_jour': list(rdv.filter(date_heure__gte=debut_jour).order_by('date_heure')),
+                'avant_le_jour': list(rdv.filter(date_heure__lt=debut_jour).order_by('-date_heure')[:5]),
+            }
         
+        rdv = fragment('dashboard_patient', rdv_patient, user.role, patient_id=patient.id, cles=[jour])
+        # Prochains rendez-vous
+        context['rdv_futurs'] = [
+            r for r in rdv['a_partir_du_jour']
+            if r.date_heure >= maintenant and r.statut in ('en_attente', 'confirme')
+        ]
         # Historique
-        context['rdv_passes'] = RendezVous.objects.filter(
-            patient=patient,
-            date_heure__lt=timezone.now()
-        ).order_by('-date_heure')[:5]
-        
+        context['rdv_passes'] = (
+            [r for r in reversed(rdv['a_partir_du_jour']) if r.date_heure < maintenant] + rdv['avant_le_jour']
+        )[:5]
         context['patient'] = patient
     
     return render(request, 'rdv_app/dashboard.html', context)
@@ -147,6 +175,7 @@ def dashboard_view(request):
 
 # Praticiens
 
+@lecture_replica
 @login_required
 def praticiens_list(request):
     """Liste des praticiens"""
@@ -154,16 +183,12 @@ def praticiens_list(request):
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
-    praticiens = Praticien.objects.all()
+    praticiens = Praticien.objects.select_related('user').order_by('user__last_name', 'user__first_name', 'id')
     
     # Recherche
     search_query = request.GET.get('q', '')
     if search_query:
-        praticiens = praticiens.filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(specialite__icontains=search_query)
-        )
+        praticiens = filtrer_recherche(praticiens, search_query)
     
     # Filtre par spécialité
     specialite = request.GET.get('specialite', '')
@@ -175,10 +200,14 @@ def praticiens_list(request):
     if actif:
         praticiens = praticiens.filter(actif=(actif == 'true'))
     
+    page_obj = paginer(request, praticiens)
+    
     context = {
-        'praticiens': praticiens,
+        'praticiens': page_obj.object_list,
+        'page_obj': page_obj,
+        'parametres': parametres_sans(request, 'page'),
         'search_query': search_query,
-        'specialites': Praticien.objects.values_list('specialite', flat=True).distinct()
+        'specialites': Praticien.objects.order_by('specialite').values_list('specialite', flat=True).distinct()
     }
     
     return render(request, 'rdv_app/praticiens/list.html', context)
@@ -252,6 +281,7 @@ def praticien_edit(request, pk):
     return render(request, 'rdv_app/praticiens/form.html', {'form': form, 'action': 'Modifier', 'praticien': praticien})
 
 
+@lecture_replica
 @login_required
 def praticien_detail(request, pk):
     """Détail d'un praticien"""
@@ -264,13 +294,18 @@ def praticien_detail(request, pk):
     
     context = {
         'praticien': praticien,
-        'horaires': praticien.horaires.all().order_by('jour_semaine', 'heure_debut'),
-        'indisponibilites': praticien.indisponibilites.filter(date_fin__gte=date.today()).order_by('date_debut'),
+        **fragment('praticien_detail', lambda: {
+            'horaires': list(praticien.horaires.all().order_by('jour_semaine', 'heure_debut')),
+            'indisponibilites': list(
+                praticien.indisponibilites.filter(date_fin__gte=date.today()).order_by('date_debut')
+            ),
+        }, request.user.role, praticien_id=praticien.id, cles=[date.today()]),
     }
     
     return render(request, 'rdv_app/praticiens/detail.html', context)
 
 
+@lecture_replica
 @login_required
 def praticien_planning(request, pk):
     """Planning d'un praticien"""
@@ -287,11 +322,12 @@ def praticien_planning(request, pk):
     week_start = today - timedelta(days=today.weekday())
     
     # Rendez-vous de la semaine
-    rdv_semaine = RendezVous.objects.filter(
+    rdv_semaine = fragment('planning_semaine', lambda: list(RendezVous.objects.filter(
         praticien=praticien,
         date_heure__date__gte=week_start,
         date_heure__date__lt=week_start + timedelta(days=7)
-    ).order_by('date_heure')
+    ).select_related('patient__user').order_by('date_heure')),
+        request.user.role, praticien_id=praticien.id, cles=[week_start])
     
     context = {
         'praticien': praticien,
@@ -356,6 +392,7 @@ def indisponibilite_create(request, praticien_id):
 
 # Patients
 
+@lecture_replica
 @login_required
 def patients_list(request):
     """Liste des patients"""
@@ -363,23 +400,27 @@ def patients_list(request):
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
-    patients = Patient.objects.all()
+    patients = Patient.objects.select_related('user')
     
     # Recherche
     search_query = request.GET.get('q', '')
     if search_query:
-        patients = patients.filter(
-            Q(user__first_name__icontains=search_query) |
-            Q(user__last_name__icontains=search_query) |
-            Q(telephone__icontains=search_query) |
-            Q(user__email__icontains=search_query)
-        )
-    
-    # Ajouter le nombre de RDV pour chaque patient
-    patients = patients.annotate(nb_rdv=Count('rendez_vous'))
+        patients = filtrer_recherche(patients, search_query)
+    
+    # Nombre de RDV pour chaque patient: sous-requête évaluée pour les seules lignes de la page
+    # (Count('rendez_vous') regroupait toute la table avant de trier)
+    patients = patients.annotate(nb_rdv=Coalesce(Subquery(
+        RendezVous.objects.filter(patient=OuterRef('pk')).order_by().values('patient')
+        .annotate(total=Count('id')).values('total')
+    ), 0))
+    patients, curseur_suivant = paginer_par_curseur(
+        request, patients, ['user__last_name', 'user__first_name', 'id']
+    )
     
     context = {
         'patients': patients,
+        'curseur_suivant': curseur_suivant,
+        'parametres': parametres_sans(request, 'curseur'),
         'search_query': search_query,
     }
     
@@ -456,6 +497,7 @@ def patient_edit(request, pk):
     return render(request, 'rdv_app/patients/form.html', {'form': form, 'action': 'Modifier', 'patient': patient})
 
 
+@lecture_replica
 @login_required
 def patient_detail(request, pk):
     """Détail d'un patient"""
@@ -493,19 +535,7 @@ def rendez_vous_create(request):
             rdv = form.save(commit=False)
             rdv.patient = request.user.patient_profile
             rdv.date_heure = form.cleaned_data['date_heure']
-            rdv.save()
-            
-            # Créer les rappels automatiques
-            Rappel.objects.create(
-                rdv=rdv,
-                type_rappel='24h',
-                date_envoi_prevue=rdv.date_heure - timedelta(hours=24)
-            )
-            Rappel.objects.create(
-                rdv=rdv,
-                type_rappel='48h',
-                date_envoi_prevue=rdv.date_heure - timedelta(hours=48)
-            )
+            rdv.save()  # Les rappels sont générés par rdv_app.signals
             
             log_action(request, 'Création RDV', f'RDV créé par patient {request.user.get_full_name()}', 'RendezVous', rdv.id)
             messages.success(request, 'Votre rendez-vous a été créé avec succès ! Vous recevrez des rappels automatiques.')
@@ -516,18 +546,19 @@ def rendez_vous_create(request):
     return render(request, 'rdv_app/rendez_vous/form.html', {'form': form})
 
 
+@lecture_replica
 @login_required
 def rendez_vous_list(request):
     """Liste des rendez-vous"""
     user = request.user
     
-    if user.role == 'admin':
-        rdv_list = RendezVous.objects.all()
-    elif user.role == 'praticien' and hasattr(user, 'praticien_profile'):
-        rdv_list = RendezVous.objects.filter(praticien=user.praticien_profile)
+    # Patient et praticien affichés sur chaque ligne: chargés par jointure
+    rdv_list = RendezVous.objects.select_related('patient__user', 'praticien__user')
+    if user.role == 'praticien' and hasattr(user, 'praticien_profile'):
+        rdv_list = rdv_list.filter(praticien=user.praticien_profile)
     elif user.role == 'patient' and hasattr(user, 'patient_profile'):
-        rdv_list = RendezVous.objects.filter(patient=user.patient_profile)
-    else:
+        rdv_list = rdv_list.filter(patient=user.patient_profile)
+    elif user.role != 'admin':
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
@@ -543,16 +574,19 @@ def rendez_vous_list(request):
     if date_fin:
         rdv_list = rdv_list.filter(date_heure__lte=date_fin)
     
-    rdv_list = rdv_list.order_by('-date_heure')
+    rdv_list, curseur_suivant = paginer_par_curseur(request, rdv_list, ['-date_heure', '-id'])
     
     context = {
         'rendez_vous_list': rdv_list,
+        'curseur_suivant': curseur_suivant,
+        'parametres': parametres_sans(request, 'curseur'),
         'statut_choices': RendezVous.STATUT_CHOICES,
     }
     
     return render(request, 'rdv_app/rendez_vous/list.html', context)
 
 
+@lecture_replica
 @login_required
 def rdv_detail(request, pk):
     """Détail d'un rendez-vous"""
@@ -598,6 +632,7 @@ def rdv_confirmer(request, pk):
     return redirect('rdv_detail', pk=rdv.id)
 
 
+@lecture_replica
 @login_required
 def rdv_calendrier(request):
     """Calendrier des rendez-vous"""
@@ -666,6 +701,7 @@ def annulation_create(request, rdv_id):
     return render(request, 'rdv_app/annulations/form.html', {'form': form, 'rdv': rdv})
 
 
+@lecture_replica
 @login_required
 def annulations_list(request):
     """Liste des demandes d'annulation"""
@@ -673,7 +709,7 @@ def annulations_list(request):
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
-    annulations = Annulation.objects.all()
+    annulations = Annulation.objects.select_related('rdv__patient__user', 'rdv__praticien__user')
     
     if request.user.role == 'praticien' and hasattr(request.user, 'praticien_profile'):
         annulations = annulations.filter(rdv__praticien=request.user.praticien_profile)
@@ -683,10 +719,12 @@ def annulations_list(request):
     if statut:
         annulations = annulations.filter(statut=statut)
     
-    annulations = annulations.order_by('-date_demande')
+    annulations, curseur_suivant = paginer_par_curseur(request, annulations, ['-date_demande', '-id'])
     
     context = {
         'annulations': annulations,
+        'curseur_suivant': curseur_suivant,
+        'parametres': parametres_sans(request, 'curseur'),
         'statut_filter': statut,
     }
     
@@ -721,6 +759,7 @@ def annulation_traiter(request, pk, action):
 
 # Rappels
 
+@lecture_replica
 @login_required
 def rappels_list(request):
     """Liste des rappels"""
@@ -728,15 +767,19 @@ def rappels_list(request):
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
-    rappels = Rappel.objects.all().order_by('-date_envoi_prevue')
+    rappels = Rappel.objects.select_related('rdv__patient__user', 'rdv__praticien__user')
     
     # Filtre par statut d'envoi
     envoye = request.GET.get('envoye', '')
     if envoye:
         rappels = rappels.filter(envoye=(envoye == 'true'))
     
+    rappels, curseur_suivant = paginer_par_curseur(request, rappels, ['-date_envoi_prevue', '-id'])
+    
     context = {
         'rappels': rappels,
+        'curseur_suivant': curseur_suivant,
+        'parametres': parametres_sans(request, 'curseur'),
     }
     
     return render(request, 'rdv_app/rappels/list.html', context)
@@ -744,6 +787,7 @@ def rappels_list(request):
 
 # Stats et rapports
 
+@lecture_replica
 @login_required
 def statistiques_view(request):
     """Tableau de bord des statistiques"""
@@ -818,14 +862,41 @@ def rapport_export(request):
     if format_export == 'csv':
         return generer_rapport_csv(rdv_list)
     elif format_export == 'pdf':
-        return generer_rapport_pdf(rdv_list)
+        # Généré en arrière-plan; un rapport identique déjà produit est réutilisé
+        rapport = demander_rapport({'date_debut': date_debut, 'date_fin': date_fin}, request.user)
+        log_action(request, 'Export PDF', f'Rapport #{rapport.id} demandé', 'Rapport', rapport.id)
+        return redirect('rapport_detail', pk=rapport.id)
     
     messages.error(request, 'Format d\'export non supporté.')
     return redirect('statistiques')
 
 
+@login_required
+def rapport_detail(request, pk):
+    """Statut d'un rapport, ou le fichier s'il est prêt"""
+    if not check_permission(request.user, ['admin']):
+        messages.error(request, 'Accès non autorisé.')
+        return redirect('dashboard')
+    
+    rapport = get_object_or_404(Rapport, pk=pk)
+    
+    if rapport.statut == 'termine' and rapport.fichier:
+        return FileResponse(
+            rapport.fichier.open('rb'),
+            as_attachment=True,
+            filename=f'rapport_rdv_{rapport.date_creation.strftime("%Y%m%d")}.pdf',
+        )
+    
+    response = render(request, 'rdv_app/rapports/detail.html', {'rapport': rapport})
+    if rapport.statut in ('en_attente', 'en_cours'):
+        # Page rechargée jusqu'à ce que le fichier soit prêt
+        response['Refresh'] = '3'
+    return response
+
+
 # Logs
 
+@lecture_replica
 @login_required
 def logs_view(request):
     """Consulter les logs"""
@@ -833,15 +904,28 @@ def logs_view(request):
         messages.error(request, 'Accès non autorisé.')
         return redirect('dashboard')
     
-    logs = Log.objects.all().order_by('-date')[:100]
-    
-    # Filtres
-    action = request.GET.get('action', '')
-    if action:
-        logs = logs.filter(action__icontains=action)
+    curseur_suivant = None
+    search = request.GET.get('q', '')
+    if search:
+        # Recherche plein texte (action, détails, table, utilisateur)
+        try:
+            logs, curseur_suivant = rechercher_logs(search, limit=100, curseur=request.GET.get('curseur'))
+        except CurseurInvalide:
+            messages.error(request, 'Curseur invalide, retour à la première page.')
+            logs, curseur_suivant = rechercher_logs(search, limit=100)
+    else:
+        logs = Log.objects.select_related('user').order_by('-date')
+        
+        # Filtres
+        action = request.GET.get('action', '')
+        if action:
+            logs = logs.filter(action__icontains=action)
+        logs = logs[:100]
     
     context = {
         'logs': logs,
+        'search_query': search,
+        'curseur_suivant': curseur_suivant,
     }
     
     return render(request, 'rdv_app/logs/list.html', context)
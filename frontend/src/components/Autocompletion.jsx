@@ -0,0 +1,73 @@
+import React, { useState, useEffect, useRef } from 'react';
+import { autocompleteAPI } from '../services/api';
+
+// Champ de saisie avec suggestions (/api/autocomplete/), à la place d'une liste complète
+const Autocompletion = ({ type, onSelect, placeholder, className = '' }) => {
+  const [saisie, setSaisie] = useState('');
+  const [suggestions, setSuggestions] = useState([]);
+  const [ouvert, setOuvert] = useState(false);
+  const requete = useRef(0);
+
+  useEffect(() => {
+    if (!saisie.trim()) {
+      setSuggestions([]);
+      return undefined;
+    }
+    // Petit délai: une requête par pause de frappe, réponses obsolètes ignorées
+    const numero = ++requete.current;
+    const minuteur = setTimeout(async () => {
+      try {
+        const response = await autocompleteAPI.get(type, saisie);
+        if (numero === requete.current) {
+          setSuggestions(response.data);
+        }
+      } catch (error) {
+        console.error('Error fetching suggestions:', error);
+      }
+    }, 150);
+    return () => clearTimeout(minuteur);
+  }, [saisie, type]);
+
+  const choisir = (suggestion) => {
+    setSaisie(suggestion.specialite ? `${suggestion.libelle} - ${suggestion.specialite}` : suggestion.libelle);
+    setOuvert(false);
+    onSelect(suggestion);
+  };
+
+  return (
+    <div className="relative">
+      <input
+        type="text"
+        value={saisie}
+        onChange={(e) => {
+          setSaisie(e.target.value);
+          setOuvert(true);
+          onSelect(null);
+        }}
+        onFocus={() => setOuvert(true)}
+        onBlur={() => setTimeout(() => setOuvert(false), 150)}
+        className={`input ${className}`}
+        placeholder={placeholder}
+        autoComplete="off"
+      />
+      {ouvert && suggestions.length > 0 && (
+        <ul className="absolute z-10 mt-1 w-full bg-white border border-gray-200 rounded-md shadow-lg max-h-60 overflow-auto">
+          {suggestions.map((suggestion) => (
+            <li
+              key={suggestion.id}
+              onMouseDown={() => choisir(suggestion)}
+              className="px-4 py-2 cursor-pointer hover:bg-primary-50"
+            >
+              {suggestion.libelle}
+              {suggestion.specialite && (
+                <span className="text-sm text-gray-500"> - {suggestion.specialite}</span>
+              )}
+            </li>
+          ))}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+export default Autocompletion;
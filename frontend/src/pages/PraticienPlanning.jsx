@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, useNavigate, Link } from 'react-router-dom';
-import { praticiensAPI, rdvAPI } from '../services/api';
+import { praticiensAPI, rdvAPI, evenementsAPI } from '../services/api';
 import { FaArrowLeft, FaEdit, FaUserMd, FaCalendarAlt, FaClock } from 'react-icons/fa';
 import { format } from 'date-fns';
 import { fr } from 'date-fns/locale';
@@ -17,6 +17,16 @@ const PraticienPlanning = () => {
     fetchPraticienRdv();
   }, [id]);
 
+  // Mises à jour en direct: recharge le planning à chaque changement de rendez-vous
+  useEffect(() => {
+    if (!evenementsAPI.actif) return undefined;
+    const source = evenementsAPI.praticien(id);
+    ['rdv_cree', 'rdv_modifie', 'rdv_supprime', 'resync'].forEach((type) => {
+      source.addEventListener(type, fetchPraticienRdv);
+    });
+    return () => source.close();
+  }, [id]);
+
   const fetchPraticienDetail = async () => {
     try {
       setLoading(true);
@@ -1,7 +1,8 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useAuth } from '../contexts/AuthContext';
-import { rdvAPI, praticiensAPI, patientsAPI } from '../services/api';
+import { rdvAPI } from '../services/api';
+import Autocompletion from '../components/Autocompletion';
 import { FaCalendarPlus, FaArrowLeft, FaSave } from 'react-icons/fa';
 
 const RendezVousCreate = () => {
@@ -16,37 +17,20 @@ const RendezVousCreate = () => {
     notes: ''
   });
   
-  const [praticiens, setPraticiens] = useState([]);
-  const [patients, setPatients] = useState([]);
   const [loading, setLoading] = useState(false);
   const [errors, setErrors] = useState({});
 
-  useEffect(() => {
-    fetchPraticiens();
-    if (!isPatient) {
-      fetchPatients();
-    }
-  }, [isPatient]);
-
-  const fetchPraticiens = async () => {
-    try {
-      const response = await praticiensAPI.getAll({ actif: true });
-      const data = Array.isArray(response.data) ? response.data : (response.data.results || []);
-      setPraticiens(data);
-    } catch (error) {
-      console.error('Error fetching praticiens:', error);
-      setPraticiens([]);
-    }
-  };
-
-  const fetchPatients = async () => {
-    try {
-      const response = await patientsAPI.getAll();
-      const data = Array.isArray(response.data) ? response.data : (response.data.results || []);
-      setPatients(data);
-    } catch (error) {
-      console.error('Error fetching patients:', error);
-      setPatients([]);
+  // Praticien et patient choisis par saisie semi-automatique (liste complète trop longue)
+  const handleSelect = (name) => (suggestion) => {
+    setFormData(prev => ({
+      ...prev,
+      [name]: suggestion ? suggestion.id : ''
+    }));
+    if (suggestion && errors[name]) {
+      setErrors(prev => ({
+        ...prev,
+        [name]: ''
+      }));
     }
   };
 
@@ -149,20 +133,12 @@ const RendezVousCreate = () => {
             <label className="block text-sm font-medium text-gray-700 mb-2">
               Praticien *
             </label>
-            <select
-              name="praticien_id"
-              value={formData.praticien_id}
-              onChange={handleChange}
-              className={`input ${errors.praticien_id ? 'border-red-500' : ''}`}
-              required
-            >
-              <option value="">Sélectionnez un praticien</option>
-              {praticiens.map((praticien) => (
-                <option key={praticien.id} value={praticien.id}>
-                  {praticien.civilite} {praticien.user.first_name} {praticien.user.last_name} - {praticien.specialite}
-                </option>
-              ))}
-            </select>
+            <Autocompletion
+              type="praticien"
+              onSelect={handleSelect('praticien_id')}
+              className={errors.praticien_id ? 'border-red-500' : ''}
+              placeholder="Nom ou spécialité du praticien..."
+            />
             {errors.praticien_id && (
               <p className="mt-1 text-sm text-red-600">{errors.praticien_id}</p>
             )}
@@ -174,20 +150,12 @@ const RendezVousCreate = () => {
               <label className="block text-sm font-medium text-gray-700 mb-2">
                 Patient *
               </label>
-              <select
-                name="patient_id"
-                value={formData.patient_id}
-                onChange={handleChange}
-                className={`input ${errors.patient_id ? 'border-red-500' : ''}`}
-                required
-              >
-                <option value="">Sélectionnez un patient</option>
-                {patients.map((patient) => (
-                  <option key={patient.id} value={patient.id}>
-                    {patient.civilite} {patient.user.first_name} {patient.user.last_name}
-                  </option>
-                ))}
-              </select>
+              <Autocompletion
+                type="patient"
+                onSelect={handleSelect('patient_id')}
+                className={errors.patient_id ? 'border-red-500' : ''}
+                placeholder="Nom du patient..."
+              />
               {errors.patient_id && (
                 <p className="mt-1 text-sm text-red-600">{errors.patient_id}</p>
               )}
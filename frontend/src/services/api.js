@@ -74,6 +74,9 @@ export const praticiensAPI = {
   createHoraire: (id, data) => api.post(`/praticiens/${id}/horaires/`, data),
   getIndisponibilites: (id) => api.get(`/praticiens/${id}/indisponibilites/`),
   createIndisponibilite: (id, data) => api.post(`/praticiens/${id}/indisponibilites/`, data),
+  getCalendrier: (id) => api.get(`/praticiens/${id}/calendrier/`),
+  regenererCalendrier: (id) => api.post(`/praticiens/${id}/calendrier/`),
+  importer: (formData) => api.post('/praticiens/import/', formData, { headers: { 'Content-Type': 'multipart/form-data' } }),
 };
 
 // Patients
@@ -83,6 +86,9 @@ export const patientsAPI = {
   create: (data) => api.post('/patients/', data),
   update: (id, data) => api.put(`/patients/${id}/`, data),
   delete: (id) => api.delete(`/patients/${id}/`),
+  getCalendrier: (id) => api.get(`/patients/${id}/calendrier/`),
+  regenererCalendrier: (id) => api.post(`/patients/${id}/calendrier/`),
+  importer: (formData) => api.post('/patients/import/', formData, { headers: { 'Content-Type': 'multipart/form-data' } }),
 };
 
 // Rendez-vous
@@ -109,14 +115,55 @@ export const rappelsAPI = {
   getAll: (params) => api.get('/rappels/', { params }),
 };
 
+// Recherche (préfixes, classée par pertinence)
+export const rechercheAPI = {
+  patients: (q, params) => api.get('/recherche/', { params: { ...params, q, type: 'patient' } }),
+  praticiens: (q, params) => api.get('/recherche/', { params: { ...params, q, type: 'praticien' } }),
+};
+
+// Autocomplétion (index en mémoire côté serveur)
+export const autocompleteAPI = {
+  get: (type, q, limite) => api.get('/autocomplete/', { params: { type, q, limite } }),
+};
+
 // Statistiques
 export const statistiquesAPI = {
   getDashboard: () => api.get('/statistiques/'),
+  getHeatmap: (params) => api.get('/statistiques/heatmap/', { params }),
+  exportAnalytique: (params) => api.get('/statistiques/export/', { params, responseType: 'blob' }),
 };
 
 // Logs
 export const logsAPI = {
   getAll: (params) => api.get('/logs/', { params }),
+  search: (search, params) => api.get('/logs/', { params: { ...params, search } }),
+};
+
+// Lectures asynchrones (déploiement ASGI)
+export const asyncAPI = {
+  getCreneaux: (praticienId, date) => api.get(`/async/praticiens/${praticienId}/creneaux/`, { params: { date } }),
+  getCalendrier: (params) => api.get('/async/rendez-vous/calendrier/', { params }),
+  getDashboard: () => api.get('/async/dashboard/'),
+  getStatistiques: () => api.get('/async/statistiques/'),
+};
+
+// Événements en direct (SSE): EventSource n'envoie pas d'en-têtes, le jeton passe dans l'URL.
+// Servis en ASGI uniquement: VITE_EVENEMENTS=1 quand le backend tourne sous uvicorn.
+export const evenementsAPI = {
+  actif: import.meta.env.VITE_EVENEMENTS === '1',
+  ouvrir: (chemin) => new EventSource(
+    `${API_BASE_URL}/evenements/${chemin}?token=${encodeURIComponent(localStorage.getItem('token') || '')}`
+  ),
+  praticien: (praticienId) => evenementsAPI.ouvrir(`praticien/${praticienId}/`),
+  patient: (patientId) => evenementsAPI.ouvrir(`patient/${patientId}/`),
+  admin: () => evenementsAPI.ouvrir(''),
+};
+
+// Rapports
+export const rapportsAPI = {
+  create: (data) => api.post('/rapports/', data),
+  getById: (id) => api.get(`/rapports/${id}/`),
+  download: (id) => api.get(`/rapports/${id}/telecharger/`, { responseType: 'blob' }),
 };
 
 export default api;
\ No newline at end of file